@@ -1,10 +1,15 @@
+import threading
+
 import streamlit as st
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
+from brocc_li.meal_plan import day_markdown
+from brocc_li.report_render import shared_renderer
 from brocc_li.schemas import AgentState
 from brocc_li.tools import (
     make_calculate_bmi_tool,
@@ -38,6 +43,7 @@ def initialize_agent(api_key: str):
         web_tools['search_nearby_stores'],
         web_tools['search_product_prices'],
         web_tools['search_coupons'],
+        web_tools['match_coupons_to_shopping_list'],
         web_tools['search_recipes'],
         web_tools['scrape_store_website'],
         web_tools['get_store_hours_and_location'],
@@ -59,20 +65,31 @@ def initialize_agent(api_key: str):
         plan_diet(preferences: dict) -> str:
             Plan a diet based on user preferences.
 
-        search_nearby_stores(location: str, store_types: List[str] = None) -> List[Dict]:
-            Search for nearby grocery stores using free mapping services.
+        search_nearby_stores(location: str, store_types: List[str] = None, max_distance_km: float = None) -> List[Dict]:
+            Search for nearby grocery stores using free mapping services, nearest first within the distance limit.
 
         search_product_prices(product_name: str, location: str = None) -> List[Dict]:
-            Search for product prices across different stores (Rewe, Aldi, Lidl, Edeka).
+            Search for product prices across different stores (Rewe, Aldi, Lidl, Edeka) concurrently.
+            Known prices come from the local price store; "observed_at" tells when a price was seen.
+            Stores that did not answer in time are listed with status "timeout", "error" or "circuit_open"
+            (the store site failed repeatedly and is skipped for a while), plus its "breaker" state.
 
         search_coupons(store_name: str = None, category: str = None) -> List[Dict]:
-            Search for available coupons and deals from various coupon websites.
+            Search the local coupon index (refreshed from various coupon websites in the background).
+            Categories: proteins, vegetables, fruits, grains, dairy, pantry.
+            Sites whose last refresh failed are listed with "site", "status", "error" and "breaker" state.
+
+        match_coupons_to_shopping_list(items: List[str], store_names: List[str] = None) -> Dict[str, List[Dict]]:
+            Find the coupons that apply to each shopping list item, matched by product or product category.
 
-        search_recipes(query: str, dietary_restrictions: List[str] = None, max_time: int = None) -> List[Dict]:
-            Search for recipes from popular cooking websites including German sites.
+        search_recipes(query: str, dietary_restrictions: List[str] = None, max_time: int = None, max_results: int = 10) -> Dict:
+            Search for recipes in the local recipe index, then popular cooking websites including German sites.
+            Dietary restrictions and max_time (total minutes) are applied as filters.
+            Returns {"recipes": [...], "sites": [...], "local": n} with the search status of each site
+            and the number of recipes that came from the local index.
 
-        scrape_store_website(store_url: str, product_search: str = None) -> Dict:
-            Scrape product information from a specific store website using Selenium.
+        scrape_store_website(store_url: str, product_search: str = None, backend: str = None) -> Dict:
+            Scrape product information from a specific store website using Selenium or Playwright.
 
         get_store_hours_and_location(store_name: str, location: str) -> Dict:
             Get detailed store information including hours and exact location.
@@ -82,12 +99,14 @@ def initialize_agent(api_key: str):
 
         generate_diet_report(user_preferences: dict, location: str = "Germany") -> Dict:
             Generate a comprehensive diet report with meal plan, nutritional breakdown, costs, and shopping list.
+            The meal plan is shown to the user day by day while it is being generated.
 
         generate_shopping_list(meal_plan: List[Dict], location: str = "Germany") -> Dict:
             Generate a detailed shopping list from a meal plan with prices and store recommendations.
 
         generate_nutritional_analysis(meal_plan: List[Dict]) -> Dict:
             Generate detailed nutritional analysis of a meal plan.
+            Nutrition is computed from the ingredient quantities ("60 g oats"), so meals need only ingredients.
         """
 
         sys_msg = SystemMessage(
@@ -135,12 +154,36 @@ def process_agent_response(user_input: str, state_graph: CompiledStateGraph) ->
         # Create a placeholder for streaming updates
         response_placeholder = st.empty()
 
+        # Meal plan days are shown as soon as generate_diet_report has streamed them
+        plan_placeholder = st.empty()
+        # Day name -> (position in the week, markdown); a repaired day replaces its first version
+        streamed_days = {}
+        script_ctx = get_script_run_ctx()
+
+        def show_meal_plan_day(day, index):
+            # Tools can run on a worker thread, which needs the script context to update the page
+            add_script_run_ctx(threading.current_thread(), script_ctx)
+            streamed_days[str(day.get("day", index)).lower()] = (index, day_markdown(day))
+            plan_placeholder.markdown(
+                "\n\n".join(markdown for _, markdown in sorted(streamed_days.values(), key=lambda shown: shown[0]))
+            )
+
+        # Reports are rendered while the agent writes its answer
+        render_jobs = []
+
+        def render_report(report):
+            render_jobs.append(shared_renderer().submit(report))
+
         with st.spinner("🤖 Agent is processing..."):
             # Stream the agent execution
             current_responses = []
 
             result = state_graph.invoke(
-                {"messages": st.session_state.agent_messages, "input_file": None}
+                {"messages": st.session_state.agent_messages, "input_file": None},
+                config={"configurable": {
+                    "on_meal_plan_day": show_meal_plan_day,
+                    "on_diet_report": render_report,
+                }},
             )
 
             # Get all new messages
@@ -166,6 +209,8 @@ def process_agent_response(user_input: str, state_graph: CompiledStateGraph) ->
                         current_responses.append("💰 Checking product prices...")
                     elif "search_coupons" in str(msg):
                         current_responses.append("🎫 Looking for coupons and deals...")
+                    elif "match_coupons_to_shopping_list" in str(msg):
+                        current_responses.append("🎫 Matching coupons to your shopping list...")
                     elif "search_recipes" in str(msg):
                         current_responses.append("👨‍🍳 Finding recipes...")
                     elif "scrape_store_website" in str(msg):
@@ -191,6 +236,11 @@ def process_agent_response(user_input: str, state_graph: CompiledStateGraph) ->
                 if current_responses:
                     response_placeholder.markdown("\n\n".join(current_responses))
 
+        if render_jobs:
+            # The sidebar collects the files when they are done, so the answer isn't held up
+            st.session_state.setdefault("report_jobs", []).extend(render_jobs)
+            current_responses.append("📄 Your report will be ready to download from the sidebar in a moment.")
+
         # Final response
         if current_responses:
             final_response = "\n\n".join(current_responses)
@@ -202,8 +252,9 @@ def process_agent_response(user_input: str, state_graph: CompiledStateGraph) ->
                 else "No response generated"
             )
 
-        # Clear placeholder and add to chat
+        # Clear placeholders and add to chat
         response_placeholder.empty()
+        plan_placeholder.empty()
 
         st.session_state["chat"].append(
             {
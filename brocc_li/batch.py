@@ -0,0 +1,284 @@
+"""Headless batch generation of diet reports for a JSONL file of user profiles.
+
+    python -m brocc_li.batch run profiles.jsonl --output reports.jsonl
+
+Each input line is a profile, either ``{"id": ..., "preferences": {...},
+"location": ...}`` or the preferences themselves with an optional ``id``.
+A bounded pool of workers drives ``generate_diet_report`` for the profiles;
+every LLM call of every worker goes through one shared concurrency cap and
+rate limiter. Results are appended to the output as they finish, one JSON
+line per profile, and the output doubles as the checkpoint: running the
+same command again skips the profiles that already have a report and
+retries the ones that failed; input lines that are not valid profiles are
+reported once.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from brocc_li.plan_cache import shared_plan_cache
+from brocc_li.tools import PLAN_CACHE_ENABLED, make_report_generation_tool
+
+BATCH_WORKERS = 8
+# Limits shared by all workers, including the per-day threads of the parallel meal plan mode
+LLM_CONCURRENCY = 4
+LLM_REQUESTS_PER_MINUTE = 60
+# Profiles read ahead of the workers; the rest of the input stays on disk
+QUEUE_FACTOR = 2
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+class RateLimiter:
+    """Token bucket shared by threads: ``rate`` calls per second, bursts of up to ``burst`` calls."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call may start; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMLimits:
+    """Concurrency cap and rate limit shared by every :class:`ThrottledLLM` of a run."""
+
+    def __init__(self, max_concurrency: int = LLM_CONCURRENCY,
+                 requests_per_minute: Optional[float] = LLM_REQUESTS_PER_MINUTE):
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.limiter = RateLimiter(requests_per_minute / 60, burst=max_concurrency) if requests_per_minute else None
+        self.calls = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        start = time.monotonic()
+        with self._slots:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            with self._lock:
+                self.calls += 1
+                self.waited += time.monotonic() - start
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'llm_calls': self.calls, 'llm_wait_seconds': round(self.waited, 2)}
+
+
+class ThrottledLLM:
+    """Chat model proxy whose calls (``invoke``, ``stream`` and structured output) go through shared limits.
+
+    A streamed call keeps its slot until the stream is consumed.
+    """
+
+    def __init__(self, llm, limits: LLMLimits):
+        self.llm = llm
+        self.limits = limits
+
+    def invoke(self, *args, **kwargs):
+        with self.limits.slot():
+            return self.llm.invoke(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        with self.limits.slot():
+            yield from self.llm.stream(*args, **kwargs)
+
+    def with_structured_output(self, *args, **kwargs) -> 'ThrottledLLM':
+        return ThrottledLLM(self.llm.with_structured_output(*args, **kwargs), self.limits)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+
+def _profile(line_number: int, value: Any) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    """``(id, preferences, location)`` of one input record."""
+    if not isinstance(value, dict):
+        raise ValueError("a profile must be a JSON object")
+    profile_id = str(value.get('id') or f"line-{line_number}")
+    if isinstance(value.get('preferences'), dict):
+        preferences = value['preferences']
+    else:
+        preferences = {key: item for key, item in value.items() if key not in ('id', 'location')}
+    location = value.get('location') or preferences.get('location')
+    return profile_id, preferences, location
+
+
+def read_profiles(path: Union[str, Path]) -> Iterator[Tuple[str, Any]]:
+    """``(id, profile)`` per input line, read lazily; a line that is not a valid profile yields its error instead."""
+    with open(path, encoding='utf-8') as lines:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                profile = _profile(line_number, json.loads(line))
+            except (json.JSONDecodeError, ValueError) as e:
+                yield f"line-{line_number}", e
+            else:
+                yield profile[0], profile
+
+
+def completed_ids(path: Union[str, Path]) -> Set[str]:
+    """Ids that already have a report or an invalid input record in the output, read line by line.
+
+    A line cut off by an interrupted run is dropped from the end of the file.
+    """
+    path = Path(path)
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path, 'rb+') as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # A line that is not a valid profile fails the same way on every run
+            if isinstance(record, dict) and (record.get('status') == 'ok' or record.get('invalid_input')):
+                done.add(str(record.get('id')))
+        if end < f.seek(0, os.SEEK_END):
+            f.truncate(end)
+    return done
+
+
+def run_batch(input_path: Union[str, Path], output_path: Union[str, Path], llm,
+              workers: int = BATCH_WORKERS, location: str = "Germany",
+              progress_every: int = 100) -> Dict[str, Any]:
+    """Generate a report per profile of ``input_path`` and append them to ``output_path``.
+
+    ``llm`` should be a :class:`ThrottledLLM` so that all workers share its
+    limits. Returns counts of generated, failed and skipped profiles, with
+    the LLM and plan cache statistics of the run.
+    """
+    generate_report = make_report_generation_tool(llm)['generate_diet_report']
+    done = completed_ids(output_path)
+    counts = {'generated': 0, 'failed': 0, 'skipped': 0}
+    start = time.monotonic()
+
+    def generate(profile_id: str, preferences: Dict[str, Any], profile_location: Optional[str]) -> Dict[str, Any]:
+        began = time.monotonic()
+        try:
+            report = generate_report.invoke({
+                'user_preferences': preferences,
+                'location': profile_location or location,
+            })
+        except Exception as e:
+            report = {'error': str(e)}
+        record = {'id': profile_id, 'seconds': round(time.monotonic() - began, 2)}
+        if not isinstance(report, dict) or 'error' in report:
+            error = report.get('error') if isinstance(report, dict) else f"unexpected result {type(report).__name__}"
+            return {**record, 'status': 'error', 'error': error}
+        return {**record, 'status': 'ok', 'report': report}
+
+    with open(output_path, 'a', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="brocc-li-batch") as executor:
+
+        def write(record: Dict[str, Any]) -> None:
+            output.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            output.flush()
+            counts['generated' if record['status'] == 'ok' else 'failed'] += 1
+            finished = counts['generated'] + counts['failed']
+            if progress_every and finished % progress_every == 0:
+                elapsed = time.monotonic() - start
+                print(f"{finished} profiles in {elapsed:.0f}s ({finished / elapsed:.2f}/s), "
+                      f"{counts['failed']} failed", file=sys.stderr)
+
+        def drain(pending: Set, limit: int) -> Set:
+            while len(pending) > limit:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(future.result())
+            return pending
+
+        pending: Set = set()
+        try:
+            for profile_id, profile in read_profiles(input_path):
+                if profile_id in done:
+                    counts['skipped'] += 1
+                    continue
+                done.add(profile_id)
+                if isinstance(profile, Exception):
+                    write({'id': profile_id, 'status': 'error', 'error': str(profile), 'invalid_input': True})
+                    continue
+                pending.add(executor.submit(generate, *profile))
+                pending = drain(pending, max(1, workers) * QUEUE_FACTOR)
+            drain(pending, 0)
+        except KeyboardInterrupt:
+            # Reports that are already written stay; the next run picks up from there
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    stats = getattr(getattr(llm, 'limits', None), 'stats', None)
+    summary = {**counts, 'seconds': round(time.monotonic() - start, 2), **(stats() if stats else {})}
+    if PLAN_CACHE_ENABLED:
+        summary['plan_cache'] = shared_plan_cache().stats()
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate diet reports for a file of user profiles.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Generate a report per profile, resuming an earlier run")
+    run.add_argument('input', help="JSONL file with one user profile per line")
+    run.add_argument('--output', required=True, help="JSONL file the reports are appended to")
+    run.add_argument('--workers', type=int, default=BATCH_WORKERS, help="Profiles processed at once")
+    run.add_argument('--llm-concurrency', type=int, default=LLM_CONCURRENCY, help="LLM calls in flight at once")
+    run.add_argument('--rpm', type=float, default=LLM_REQUESTS_PER_MINUTE,
+                     help="LLM calls per minute (0 for no limit)")
+    run.add_argument('--location', default="Germany", help="Location of profiles that have none")
+    run.add_argument('--model', default=DEFAULT_MODEL)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        api_key = os.getenv('GOOGLE_API_KEY')
+        if not api_key:
+            parser.error("GOOGLE_API_KEY is not set")
+        llm = ThrottledLLM(
+            ChatGoogleGenerativeAI(model=args.model, temperature=0.1, api_key=api_key),
+            LLMLimits(args.llm_concurrency, args.rpm or None),
+        )
+        summary = run_batch(args.input, args.output, llm, workers=args.workers, location=args.location)
+        print(
+            f"Generated {summary['generated']} reports ({summary['failed']} failed, "
+            f"{summary['skipped']} already done) into {args.output} in {summary['seconds']:.0f}s"
+        )
+        if 'plan_cache' in summary:
+            plan_cache = summary['plan_cache']
+            print(
+                f"Plan cache: {plan_cache['hits']} hits, {plan_cache['misses']} misses "
+                f"({plan_cache['hit_rate']:.0%} hit rate, {plan_cache['entries']} plans stored)"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no browser could be checked out in time."""
+
+
+class _PooledDriver:
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.pages = 0
+        self.last_used = time.monotonic()
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {'count': 0, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'avg': sum(ordered) / len(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+class DriverPool:
+    """Bounded pool of pre-warmed headless browser drivers.
+
+    Drivers are checked out for one scrape at a time, recycled after
+    ``max_pages`` pages or when a scrape raises, and reaped after sitting idle
+    for ``idle_timeout`` seconds (keeping ``min_idle`` warm). At most
+    ``max_size`` drivers exist at once, which caps scraping concurrency.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 2,
+        min_idle: int = 1,
+        max_pages: int = 50,
+        idle_timeout: float = 300,
+        checkout_timeout: float = 30,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.min_idle = min(min_idle, max_size)
+        self.max_pages = max_pages
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+
+        self._idle: List[_PooledDriver] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._page_loads: Deque[float] = deque(maxlen=1000)
+        self._counters = {'created': 0, 'recycled': 0, 'crashed': 0, 'reaped': 0}
+
+        self._reaper = threading.Thread(target=self._reap_forever, daemon=True)
+        self._reaper.start()
+
+    def prewarm(self) -> None:
+        """Start ``min_idle`` drivers in the background so the first scrape skips the cold start."""
+        threading.Thread(target=self._fill_idle, daemon=True).start()
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Borrow a driver; it is returned to the pool afterwards, or discarded if the block raised."""
+        pooled = self._acquire(self.checkout_timeout if timeout is None else timeout)
+        try:
+            yield pooled.driver
+        except Exception:
+            with self._condition:
+                self._counters['crashed'] += 1
+            self._discard(pooled)
+            raise
+        else:
+            self._release(pooled)
+
+    def record_page_load(self, seconds: float) -> None:
+        with self._condition:
+            self._page_loads.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+                'wait_time': _summary(self._wait_times),
+                'page_load_time': _summary(self._page_loads),
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        """Quit every idle driver; drivers still checked out are quit when returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+
+    def _acquire(self, timeout: float) -> _PooledDriver:
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot, then start the browser outside the lock
+                    self._size += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No browser available within {timeout}s")
+                self._condition.wait(remaining)
+
+        if pooled is None:
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+        with self._condition:
+            self._wait_times.append(time.monotonic() - started)
+        return pooled
+
+    def _release(self, pooled: _PooledDriver) -> None:
+        pooled.pages += 1
+        pooled.last_used = time.monotonic()
+        if pooled.pages >= self.max_pages:
+            with self._condition:
+                self._counters['recycled'] += 1
+            self._discard(pooled)
+            return
+
+        with self._condition:
+            if not self._closed:
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+            self._size -= 1
+        self._quit(pooled)
+
+    def _discard(self, pooled: _PooledDriver) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._quit(pooled)
+
+    def _create(self) -> _PooledDriver:
+        pooled = _PooledDriver(self.factory())
+        with self._condition:
+            self._counters['created'] += 1
+        return pooled
+
+    @staticmethod
+    def _quit(pooled: _PooledDriver) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _fill_idle(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed or len(self._idle) >= self.min_idle or self._size >= self.max_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._create()
+            except Exception:
+                # The first checkout will surface the error
+                with self._condition:
+                    self._size -= 1
+                return
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def _reap_forever(self) -> None:
+        interval = max(self.idle_timeout / 2, 1)
+        while True:
+            time.sleep(interval)
+            with self._condition:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                expired = [
+                    pooled for pooled in self._idle
+                    if now - pooled.last_used > self.idle_timeout
+                ][: max(len(self._idle) - self.min_idle, 0)]
+                for pooled in expired:
+                    self._idle.remove(pooled)
+                self._size -= len(expired)
+                self._counters['reaped'] += len(expired)
+            for pooled in expired:
+                self._quit(pooled)
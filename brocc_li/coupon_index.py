@@ -0,0 +1,294 @@
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from brocc_li.ingredients import categories
+from brocc_li.utils import get_cache_dir
+
+# Coupons without a readable expiry date are dropped this long after they were last seen
+DEFAULT_COUPON_LIFETIME = 14 * 24 * 3600
+
+_STOPWORDS = {
+    'and', 'the', 'for', 'all', 'off', 'with', 'your', 'order', 'und', 'der', 'die', 'das', 'auf',
+    'für', 'alle', 'mit', 'ihre', 'ihren', 'einkauf', 'bestellung', 'rabatt', 'gutschein', 'sparen',
+}
+
+_ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_GERMAN_DATE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{2,4})?")
+
+
+def normalize_store(store: str) -> str:
+    return " ".join(re.findall(r"\w+", store.lower()))
+
+
+def _store_filter(stores: List[str]) -> Tuple[str, List[str]]:
+    """SQL condition on ``c.store_key`` for any of ``stores``, and its parameters.
+
+    A store matches every coupon store name that contains it ("REWE" matches
+    "REWE Lieferservice"), so the same chain is found however a site spells it.
+    """
+    condition = " OR ".join("c.store_key LIKE ?" for _ in stores)
+    return f"({condition})", [f"%{normalize_store(store)}%" for store in stores]
+
+
+def terms(text: str) -> Set[str]:
+    """Index terms of a coupon description or shopping list item."""
+    words = {word for word in re.findall(r"\w+", text.lower()) if len(word) > 2}
+    return words - _STOPWORDS
+
+
+def parse_expiry(text: Optional[str], today: Optional[date] = None) -> Optional[float]:
+    """Timestamp of the end of the expiry day in ``text`` ("2025-12-31", "31.12.2025", "bis 31.12."), or None."""
+    if not text:
+        return None
+    today = today or date.today()
+    try:
+        match = _ISO_DATE.search(text)
+        if match:
+            day = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        else:
+            match = _GERMAN_DATE.search(text)
+            if not match:
+                return None
+            year = match.group(3)
+            if year is None:
+                day = date(today.year, int(match.group(2)), int(match.group(1)))
+                # "bis 05.01." read in December means next January
+                if day < today:
+                    day = day.replace(year=today.year + 1)
+            else:
+                year = int(year)
+                day = date(year + 2000 if year < 100 else year, int(match.group(2)), int(match.group(1)))
+    except ValueError:
+        return None
+    return datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class CouponIndex:
+    """Local index of coupons by store, product category and product term.
+
+    Coupons are written by background refreshes of the coupon sites and
+    deleted as soon as they expire, so queries never see expired coupons and
+    never touch the network. Shopping lists are matched with one indexed join.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else get_cache_dir() / "coupons.sqlite3"
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS coupons (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                code TEXT NOT NULL,
+                description TEXT NOT NULL,
+                discount TEXT NOT NULL,
+                expiry_date TEXT,
+                store TEXT NOT NULL,
+                store_key TEXT NOT NULL,
+                conditions TEXT,
+                expires_at REAL NOT NULL,
+                seen_at REAL NOT NULL,
+                UNIQUE (source, code, description)
+            );
+            CREATE INDEX IF NOT EXISTS coupons_store ON coupons (store_key, expires_at);
+            CREATE INDEX IF NOT EXISTS coupons_expiry ON coupons (expires_at);
+            CREATE TABLE IF NOT EXISTS coupon_terms (
+                term TEXT NOT NULL,
+                coupon_id INTEGER NOT NULL REFERENCES coupons (id) ON DELETE CASCADE,
+                PRIMARY KEY (term, coupon_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coupon_categories (
+                category TEXT NOT NULL,
+                coupon_id INTEGER NOT NULL REFERENCES coupons (id) ON DELETE CASCADE,
+                PRIMARY KEY (category, coupon_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS coupon_terms_coupon ON coupon_terms (coupon_id);
+            CREATE INDEX IF NOT EXISTS coupon_categories_coupon ON coupon_categories (coupon_id);
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                refreshed_at REAL NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                coupons INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def add(self, source: str, coupons: Iterable[Dict[str, Any]]) -> int:
+        """Index ``coupons`` (CouponInfo dicts) scraped from ``source``; returns how many are live."""
+        now = time.time()
+        added = 0
+        with self._lock:
+            for coupon in coupons:
+                expires_at = parse_expiry(coupon.get('expiry_date')) or now + DEFAULT_COUPON_LIFETIME
+                if expires_at <= now:
+                    continue
+                text = f"{coupon['description']} {coupon.get('conditions') or ''}"
+                coupon_id = self._conn.execute(
+                    """
+                    INSERT INTO coupons (source, code, description, discount, expiry_date, store,
+                                         store_key, conditions, expires_at, seen_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (source, code, description) DO UPDATE SET
+                        discount = excluded.discount, expiry_date = excluded.expiry_date,
+                        store = excluded.store, store_key = excluded.store_key,
+                        conditions = excluded.conditions, expires_at = excluded.expires_at,
+                        seen_at = excluded.seen_at
+                    RETURNING id
+                    """,
+                    (
+                        source, coupon.get('code') or '', coupon['description'], coupon.get('discount') or '',
+                        coupon.get('expiry_date'), coupon.get('store') or '',
+                        normalize_store(coupon.get('store') or ''), coupon.get('conditions'),
+                        expires_at, now,
+                    ),
+                ).fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO coupon_terms VALUES (?, ?)",
+                    [(term, coupon_id) for term in terms(text)],
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO coupon_categories VALUES (?, ?)",
+                    [(category, coupon_id) for category in categories(text)],
+                )
+                added += 1
+            self._evict(now)
+            self._conn.commit()
+        return added
+
+    def record_refresh(self, source: str, status: str, error: Optional[str] = None, coupons: int = 0) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (source, time.time(), status, error, coupons),
+            )
+            self._conn.commit()
+
+    def sources(self) -> Dict[str, Dict[str, Any]]:
+        """Last refresh of every coupon site: ``{"refreshed_at", "status", "error", "coupons"}``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM sources").fetchall()
+        return {
+            source: {'refreshed_at': refreshed_at, 'status': status, 'error': error, 'coupons': coupons}
+            for source, refreshed_at, status, error, coupons in rows
+        }
+
+    def search(self, store: Optional[str] = None, category: Optional[str] = None,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        """Live coupons, optionally for one store and/or one product category, expiring soonest first."""
+        query = "SELECT c.* FROM coupons c"
+        conditions = ["c.expires_at > ?"]
+        params: List[Any] = [time.time()]
+        if category:
+            query += " JOIN coupon_categories k ON k.coupon_id = c.id AND k.category = ?"
+            params.insert(0, category.lower())
+        if store:
+            condition, store_params = _store_filter([store])
+            conditions.append(condition)
+            params.extend(store_params)
+        query += f" WHERE {' AND '.join(conditions)} ORDER BY c.expires_at LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._coupon(row) for row in rows]
+
+    def match_shopping_list(self, items: List[str], stores: Optional[List[str]] = None,
+                            per_item: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """Up to ``per_item`` coupons applicable to each shopping list item, in one indexed join.
+
+        A coupon matches an item when they share a product term ("match":
+        "product") or a product category ("match": "category"); product
+        matches come first, then the coupons expiring soonest. ``stores``
+        restricts the result to coupons of those stores, matched like in :meth:`search`.
+        """
+        pairs = []
+        for item in items:
+            pairs.extend((item, 'term', term) for term in terms(item))
+            pairs.extend((item, 'category', category) for category in categories(item))
+        if not pairs:
+            return {item: [] for item in items}
+
+        values = ", ".join("(?, ?, ?)" for _ in pairs)
+        store_filter = ""
+        params: List[Any] = [value for pair in pairs for value in pair]
+        params.append(time.time())
+        if stores:
+            condition, store_params = _store_filter(stores)
+            store_filter = f" AND {condition}"
+            params.extend(store_params)
+        params.append(per_item)
+
+        query = f"""
+            WITH wanted (item, kind, key) AS (VALUES {values}),
+            matches AS (
+                SELECT w.item, t.coupon_id, 'product' AS match FROM wanted w
+                JOIN coupon_terms t ON w.kind = 'term' AND t.term = w.key
+                UNION
+                SELECT w.item, k.coupon_id, 'category' AS match FROM wanted w
+                JOIN coupon_categories k ON w.kind = 'category' AND k.category = w.key
+            ),
+            ranked AS (
+                SELECT m.item, m.coupon_id, MAX(m.match) AS match,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY m.item ORDER BY MAX(m.match) DESC, c.expires_at
+                       ) AS rank
+                -- CROSS JOIN keeps the planner from scanning every live coupon per match
+                FROM matches m
+                CROSS JOIN coupons c ON c.id = m.coupon_id
+                WHERE c.expires_at > ?{store_filter}
+                GROUP BY m.item, m.coupon_id
+            )
+            SELECT r.item, r.match, c.* FROM ranked r
+            JOIN coupons c ON c.id = r.coupon_id
+            WHERE r.rank <= ?
+            ORDER BY r.item, r.rank
+        """
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        matched: Dict[str, List[Dict[str, Any]]] = {item: [] for item in items}
+        for item, match, *coupon in rows:
+            matched[item].append({**self._coupon(coupon), 'match': match})
+        return matched
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            deleted = self._evict(time.time())
+            self._conn.commit()
+        return deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM coupons WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'coupons': len(self), 'sources': self.sources()}
+
+    def _evict(self, now: float) -> int:
+        return self._conn.execute("DELETE FROM coupons WHERE expires_at <= ?", (now,)).rowcount
+
+    @staticmethod
+    def _coupon(row) -> Dict[str, Any]:
+        (_, source, code, description, discount, expiry_date, store, _, conditions, _, _) = row
+        return {
+            'code': code,
+            'description': description,
+            'discount': discount,
+            'expiry_date': expiry_date,
+            'store': store,
+            'conditions': conditions,
+            'source': source,
+        }
@@ -0,0 +1,344 @@
+"""Background crawler that keeps the local price, coupon and recipe stores warm.
+
+Run it as a separate worker process next to the app:
+
+    python -m brocc_li.crawler run
+
+and set BROCC_LI_BACKGROUND_REFRESH=0 for the app, so that tool calls only
+read the stores. Every round queues coupon sites that are due, stale prices
+and a set of recipe queries by priority; a fixed number of workers takes
+them off the queue while honouring each domain's robots.txt, crawl delay and
+concurrency cap.
+"""
+
+import argparse
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urlparse
+
+import requests
+
+from brocc_li.price_store import normalize_product
+from brocc_li.tools import (
+    PRICE_REFRESH_AFTER,
+    RECIPE_SITES,
+    STORE_SEARCH_URLS,
+    WebSearchTools,
+)
+
+# Lower runs first
+PRIORITY_COUPONS = 0
+PRIORITY_PRICES = 1
+PRIORITY_RECIPES = 2
+
+# Politeness per domain: seconds between requests (robots.txt Crawl-delay can raise it)
+# and requests in flight at once
+DOMAIN_INTERVAL = 2.0
+DOMAIN_CONCURRENCY = 2
+
+# The crawler identifies itself instead of posing as a browser; robots.txt rules are
+# looked up for this agent ("User-agent: Brocc-Li" applies to it)
+CRAWLER_USER_AGENT = os.getenv(
+    "BROCC_LI_CRAWLER_USER_AGENT",
+    "Brocc-Li Diet Assistant/1.0 (+https://github.com/The-Doraemonians/Brocc_Li)",
+)
+
+CRAWL_WORKERS = 4
+CRAWL_ROUND_INTERVAL = 15 * 60
+STALE_PRICES_PER_ROUND = 500
+
+ROBOTS_TTL = 24 * 3600
+# robots.txt that could not be fetched (5xx, network error) blocks the domain for this long
+ROBOTS_RETRY_AFTER = 10 * 60
+
+DEFAULT_RECIPE_QUERIES = [
+    'breakfast', 'salad', 'soup', 'pasta', 'chicken', 'vegetarian', 'vegan', 'curry',
+    'quick dinner', 'meal prep', 'high protein', 'low carb',
+]
+
+
+@dataclass(order=True)
+class CrawlTask:
+    priority: int
+    seq: int
+    url: str = field(compare=False)
+    label: str = field(compare=False)
+    action: Callable[[], Any] = field(compare=False)
+
+
+class RobotsCache:
+    """robots.txt rules per domain, fetched through the shared session and cached."""
+
+    def __init__(self, session: requests.Session, user_agent: str):
+        self.session = session
+        self.user_agent = user_agent
+        self._parsers: Dict[str, Tuple[Optional[robotparser.RobotFileParser], float]] = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, url: str) -> Optional[robotparser.RobotFileParser]:
+        """Parser for the domain of ``url``; None means the whole domain is off limits for now."""
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            cached = self._parsers.get(origin)
+            if cached and cached[1] > time.time():
+                return cached[0]
+
+        parser: Optional[robotparser.RobotFileParser] = robotparser.RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = self.session.get(f"{origin}/robots.txt", timeout=10)
+            if response.status_code >= 500:
+                parser, expires = None, time.time() + ROBOTS_RETRY_AFTER
+            elif response.status_code >= 400:
+                # No robots.txt: everything is allowed
+                parser.parse([])
+                expires = time.time() + ROBOTS_TTL
+            else:
+                parser.parse(response.text.splitlines())
+                expires = time.time() + ROBOTS_TTL
+        except requests.RequestException:
+            parser, expires = None, time.time() + ROBOTS_RETRY_AFTER
+
+        with self._lock:
+            self._parsers[origin] = (parser, expires)
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        parser = self._parser(url)
+        return parser is not None and parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        parser = self._parser(url)
+        if parser is None:
+            return None
+        delay = parser.crawl_delay(self.user_agent)
+        rate = parser.request_rate(self.user_agent)
+        if rate is not None and rate.requests:
+            delay = max(float(delay or 0), rate.seconds / rate.requests)
+        return float(delay) if delay is not None else None
+
+
+class CrawlScheduler:
+    """Priority queue of crawl tasks with a per-domain rate limit and concurrency cap."""
+
+    def __init__(self, robots: RobotsCache, workers: int = CRAWL_WORKERS,
+                 domain_interval: float = DOMAIN_INTERVAL, domain_concurrency: int = DOMAIN_CONCURRENCY):
+        self.robots = robots
+        self.workers = workers
+        self.domain_interval = domain_interval
+        self.domain_concurrency = domain_concurrency
+
+        self._queue: List[CrawlTask] = []
+        self._queued: set = set()
+        self._seq = itertools.count()
+        self._in_flight: Dict[str, int] = {}
+        self._next_at: Dict[str, float] = {}
+        self._running = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.counters = {'done': 0, 'failed': 0, 'disallowed': 0}
+
+    def submit(self, url: str, label: str, action: Callable[[], Any], priority: int) -> bool:
+        """Queue ``action`` (which fetches ``url``); tasks already queued under ``label`` are skipped."""
+        with self._condition:
+            if label in self._queued:
+                return False
+            self._queued.add(label)
+            heapq.heappush(self._queue, CrawlTask(priority, next(self._seq), url, label, action))
+            self._condition.notify()
+        return True
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._queue) + self._running
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def start(self) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=self._work, name=f"brocc-li-crawl-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def wait_idle(self) -> None:
+        with self._condition:
+            while (self._queue or self._running) and not self._stopped:
+                self._condition.wait(1)
+
+    def _take(self) -> Optional[CrawlTask]:
+        """Highest-priority task whose domain is below its cap and past its delay; blocks until one is."""
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                wake_at = None
+                skipped = []
+                task = None
+                while self._queue:
+                    candidate = heapq.heappop(self._queue)
+                    domain = urlparse(candidate.url).hostname or ''
+                    ready_at = self._next_at.get(domain, 0)
+                    if self._in_flight.get(domain, 0) < self.domain_concurrency and ready_at <= now:
+                        task = candidate
+                        break
+                    skipped.append(candidate)
+                    if ready_at > now:
+                        wake_at = ready_at if wake_at is None else min(wake_at, ready_at)
+                for candidate in skipped:
+                    heapq.heappush(self._queue, candidate)
+
+                if task is not None:
+                    domain = urlparse(task.url).hostname or ''
+                    self._in_flight[domain] = self._in_flight.get(domain, 0) + 1
+                    # Reserve the next slot now so concurrent workers keep the spacing
+                    self._next_at[domain] = now + self.domain_interval
+                    self._queued.discard(task.label)
+                    self._running += 1
+                    return task
+                self._condition.wait(None if wake_at is None else max(wake_at - now, 0.01))
+        return None
+
+    def _work(self) -> None:
+        while True:
+            task = self._take()
+            if task is None:
+                return
+            domain = urlparse(task.url).hostname or ''
+            outcome = 'done'
+            try:
+                if not self.robots.allowed(task.url):
+                    outcome = 'disallowed'
+                else:
+                    delay = self.robots.crawl_delay(task.url)
+                    if delay and delay > self.domain_interval:
+                        with self._condition:
+                            self._next_at[domain] = max(self._next_at.get(domain, 0), time.monotonic() + delay)
+                    task.action()
+            except Exception:
+                outcome = 'failed'
+            with self._condition:
+                self.counters[outcome] += 1
+                self._in_flight[domain] -= 1
+                self._running -= 1
+                self._condition.notify_all()
+
+
+class Crawler:
+    """Plans crawl rounds over the stores that ``WebSearchTools`` reads from."""
+
+    def __init__(self, web_tools: Optional[WebSearchTools] = None, workers: int = CRAWL_WORKERS,
+                 recipe_queries: Optional[List[str]] = None, products: Optional[List[str]] = None,
+                 user_agent: str = CRAWLER_USER_AGENT):
+        self.web_tools = web_tools or WebSearchTools(background_refresh=False, prewarm_browsers=False)
+        self.recipe_queries = recipe_queries or DEFAULT_RECIPE_QUERIES
+        self.products = products or []
+        # Every crawl request, robots.txt included, is sent as the crawler
+        self.web_tools.session.headers['User-Agent'] = user_agent
+        self.scheduler = CrawlScheduler(RobotsCache(self.web_tools.session, user_agent), workers=workers)
+
+    def plan_round(self) -> int:
+        """Queue everything that is due; returns the number of tasks added."""
+        tools = self.web_tools
+        added = 0
+
+        for site in tools.due_coupon_sites():
+            added += self.scheduler.submit(
+                site, f"coupons:{site}", lambda site=site: tools.refresh_coupon_site(site), PRIORITY_COUPONS
+            )
+
+        # Stale prices oldest first, then seed products never priced before; older stores may
+        # hold rows keyed by a website hostname, which has no search URL to refresh from
+        pairs = [
+            (chain, product) for chain, product in tools.prices.stale(PRICE_REFRESH_AFTER, limit=STALE_PRICES_PER_ROUND)
+            if chain in STORE_SEARCH_URLS
+        ]
+        known = tools.prices.bulk_latest(self.products, STORE_SEARCH_URLS)
+        pairs += [
+            (chain, product) for product in self.products for chain in STORE_SEARCH_URLS
+            if (normalize_product(product), chain) not in known
+        ]
+        for chain, product in pairs:
+            added += self.scheduler.submit(
+                tools.product_search_url(chain, product),
+                f"price:{chain}:{product}",
+                lambda chain=chain, product=product: tools.refresh_price(chain, product),
+                PRIORITY_PRICES,
+            )
+
+        for query in self.recipe_queries:
+            for site in RECIPE_SITES:
+                added += self.scheduler.submit(
+                    tools.recipe_search_url(site, query),
+                    f"recipes:{site}:{query}",
+                    lambda site=site, query=query: tools.refresh_recipes(site, query),
+                    PRIORITY_RECIPES,
+                )
+
+        tools.coupons.evict_expired()
+        return added
+
+    def run(self, once: bool = False, round_interval: float = CRAWL_ROUND_INTERVAL) -> None:
+        self.scheduler.start()
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    added = self.plan_round()
+                    print(f"Queued {added} crawl tasks ({self.scheduler.pending()} pending)", flush=True)
+                except Exception as e:
+                    # A broken round must not stop the worker; the next round plans from scratch
+                    print(f"Planning the crawl round failed: {e}", flush=True)
+                if once:
+                    self.scheduler.wait_idle()
+                    break
+                time.sleep(max(round_interval - (time.monotonic() - started), 0))
+                print(f"Crawl counters: {self.stats()}", flush=True)
+        finally:
+            self.scheduler.stop()
+        print(f"Crawl counters: {self.stats()}", flush=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.scheduler.counters,
+            'pending': self.scheduler.pending(),
+            'prices': self.web_tools.prices.stats(),
+            'coupons': len(self.web_tools.coupons),
+            'recipes': len(self.web_tools.recipe_index),
+            'breakers': self.web_tools.breaker_stats(),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Crawl store, coupon and recipe sites into the local stores.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Run the crawler worker")
+    run.add_argument('--once', action='store_true', help="Crawl one round and exit")
+    run.add_argument('--workers', type=int, default=CRAWL_WORKERS)
+    run.add_argument('--interval', type=float, default=CRAWL_ROUND_INTERVAL, help="Seconds between rounds")
+    run.add_argument('--products', help="File with one product per line to keep priced")
+    run.add_argument('--recipe-queries', nargs='*', help="Recipe searches to keep indexed")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        products = []
+        if args.products:
+            with open(args.products, encoding='utf-8') as lines:
+                products = [line.strip() for line in lines if line.strip()]
+        crawler = Crawler(workers=args.workers, recipe_queries=args.recipe_queries, products=products)
+        crawler.run(once=args.once, round_interval=args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+"""Per-domain extraction plugins for store, recipe and coupon pages.
+
+Each plugin parses only the containers it needs (a ``SoupStrainer`` on the
+lxml parser) and queries them with CSS selectors compiled once per class.
+Plugins register themselves for their domains; ``get_extractor`` picks the
+plugin for a URL. Recipe and product pages that embed schema.org JSON-LD
+are handled without any site-specific selectors.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Type
+from urllib.parse import urljoin, urlparse
+
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
+
+from brocc_li.schemas import CouponInfo, ProductInfo, RecipeInfo
+
+_PRICE_PATTERN = re.compile(r"(\d+(?:[.,]\d{3})*(?:[.,]\d{1,2})?)")
+# Quantity a unit price refers to, as in "1 kg = 1,38 €"
+_QUANTITY_PATTERN = re.compile(r"\d+(?:[.,]\d+)?\s*[^\W\d]*\s*=")
+_DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+_JSON_LD = SoupStrainer('script', attrs={'type': 'application/ld+json'})
+
+_REGISTRY: Dict[str, 'Extractor'] = {}
+
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """Parse prices like "1,99 €", "€2.49", "1.299,00" or "1 kg = 1,38 €" into a float."""
+    if not text:
+        return None
+    match = _PRICE_PATTERN.search(_QUANTITY_PATTERN.sub(' ', text.replace('\xa0', ' ')))
+    if not match:
+        return None
+    number = match.group(1)
+    if ',' in number and (number.rfind(',') > number.rfind('.')):
+        # German format: thousands "." and decimals ","
+        number = number.replace('.', '').replace(',', '.')
+    else:
+        number = number.replace(',', '')
+    return float(number)
+
+
+def parse_duration(value: Optional[str]) -> Optional[str]:
+    """Turn an ISO 8601 duration (e.g. "PT1H15M") into "75 minutes"."""
+    if not value:
+        return None
+    match = _DURATION_PATTERN.fullmatch(value.strip())
+    if not match or not any(match.groups()):
+        return value
+    days, hours, minutes = (int(part) if part else 0 for part in match.groups())
+    return f"{days * 1440 + hours * 60 + minutes} minutes"
+
+
+def _text(node) -> Optional[str]:
+    return " ".join(node.get_text(" ").split()) if node is not None else None
+
+
+def _iter_json_ld(soup: BeautifulSoup) -> Iterator[Dict[str, Any]]:
+    """Yield every JSON-LD object, flattening lists and ``@graph`` containers."""
+    for script in soup.find_all('script'):
+        try:
+            data = json.loads(script.string or '')
+        except json.JSONDecodeError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            item = stack.pop(0)
+            if not isinstance(item, dict):
+                continue
+            if '@graph' in item:
+                stack.extend(item['@graph'])
+            yield item
+
+
+def _has_type(item: Dict[str, Any], type_name: str) -> bool:
+    types = item.get('@type')
+    return type_name in (types if isinstance(types, list) else [types])
+
+
+class Extractor:
+    """Base class for extraction plugins.
+
+    Subclasses set ``domains`` to register, ``container`` to the strainer
+    for partial parsing, and ``selectors`` to CSS selectors that are compiled
+    once when the class is defined.
+    """
+
+    domains: tuple = ()
+    container: Optional[SoupStrainer] = None
+    selectors: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.compiled = {name: sv.compile(selector) for name, selector in cls.selectors.items()}
+
+    def parse(self, content: bytes, strainer: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        return BeautifulSoup(content, 'lxml', parse_only=strainer or self.container)
+
+    def select(self, name: str, node) -> list:
+        return self.compiled[name].select(node) if name in self.compiled else []
+
+    def select_one(self, name: str, node):
+        return self.compiled[name].select_one(node) if name in self.compiled else None
+
+
+class ProductExtractor(Extractor):
+    """Products from a store search page: JSON-LD first, then product tiles."""
+
+    def extract(self, content: bytes, url: str, store: str) -> List[Dict[str, Any]]:
+        products = self._from_json_ld(self.parse(content, _JSON_LD), store)
+        if products or self.container is None:
+            return products
+
+        soup = self.parse(content)
+        for tile in self.select('item', soup):
+            name = _text(self.select_one('name', tile))
+            price = parse_price(_text(self.select_one('price', tile)))
+            if not name or price is None:
+                continue
+            products.append(ProductInfo(
+                name=name,
+                price=price,
+                store=store,
+                availability=self.select_one('unavailable', tile) is None,
+                unit=_text(self.select_one('unit', tile)) or "piece",
+                brand=_text(self.select_one('brand', tile)),
+            ).__dict__)
+        return products
+
+    @staticmethod
+    def _from_json_ld(soup: BeautifulSoup, store: str) -> List[Dict[str, Any]]:
+        products = []
+        for item in _iter_json_ld(soup):
+            if _has_type(item, 'ItemList'):
+                items = [entry.get('item', entry) for entry in item.get('itemListElement', [])]
+            else:
+                items = [item]
+            for product in items:
+                if not isinstance(product, dict) or not _has_type(product, 'Product'):
+                    continue
+                offers = product.get('offers') or {}
+                offer = offers[0] if isinstance(offers, list) and offers else offers
+                price = parse_price(str(offer.get('price', ''))) if isinstance(offer, dict) else None
+                if price is None:
+                    continue
+                brand = product.get('brand')
+                products.append(ProductInfo(
+                    name=product.get('name', ''),
+                    price=price,
+                    store=store,
+                    availability='OutOfStock' not in str(offer.get('availability', '')),
+                    unit=str(offer.get('priceSpecification', {}).get('unitText', 'piece'))
+                    if isinstance(offer.get('priceSpecification'), dict) else "piece",
+                    brand=brand.get('name') if isinstance(brand, dict) else brand,
+                ).__dict__)
+        return products
+
+
+class RecipeExtractor(Extractor):
+    """Recipes from schema.org JSON-LD, with result cards as a fallback for search pages."""
+
+    def extract(self, content: bytes, url: str, source: str) -> List[Dict[str, Any]]:
+        recipes = self._from_json_ld(self.parse(content, _JSON_LD), url, source)
+        if recipes or self.container is None:
+            return recipes
+
+        soup = self.parse(content)
+        for card in self.select('item', soup):
+            title = _text(self.select_one('title', card))
+            link = self.select_one('link', card)
+            if link is None and card.get('href'):
+                # The card itself is the link
+                link = card
+            if not title:
+                continue
+            recipes.append(RecipeInfo(
+                title=title,
+                ingredients=[],
+                instructions=[],
+                prep_time=None,
+                cook_time=_text(self.select_one('time', card)),
+                servings=None,
+                source=source,
+                url=urljoin(url, link.get('href')) if link is not None and link.get('href') else url,
+            ).__dict__)
+        return recipes
+
+    @staticmethod
+    def _from_json_ld(soup: BeautifulSoup, url: str, source: str) -> List[Dict[str, Any]]:
+        recipes = []
+        for item in _iter_json_ld(soup):
+            if _has_type(item, 'Recipe'):
+                instructions = []
+                for step in item.get('recipeInstructions') or []:
+                    if isinstance(step, dict):
+                        instructions.append(step.get('text', ''))
+                    else:
+                        instructions.append(str(step))
+                servings = item.get('recipeYield')
+                if isinstance(servings, list):
+                    servings = servings[0] if servings else None
+                servings_match = re.search(r"\d+", str(servings)) if servings else None
+                recipes.append(RecipeInfo(
+                    title=item.get('name', ''),
+                    ingredients=list(item.get('recipeIngredient') or []),
+                    instructions=instructions,
+                    prep_time=parse_duration(item.get('prepTime')),
+                    cook_time=parse_duration(item.get('cookTime') or item.get('totalTime')),
+                    servings=int(servings_match.group()) if servings_match else None,
+                    source=source,
+                    url=item.get('url') or url,
+                ).__dict__)
+            elif _has_type(item, 'ItemList'):
+                for entry in item.get('itemListElement', []):
+                    if isinstance(entry, dict) and entry.get('url'):
+                        recipes.append(RecipeInfo(
+                            title=entry.get('name', ''),
+                            ingredients=[],
+                            instructions=[],
+                            prep_time=None,
+                            cook_time=None,
+                            servings=None,
+                            source=source,
+                            url=entry['url'],
+                        ).__dict__)
+        return recipes
+
+
+class CouponExtractor(Extractor):
+    """Voucher cards from a coupon site."""
+
+    def extract(self, content: bytes, url: str) -> List[Dict[str, Any]]:
+        coupons = []
+        soup = self.parse(content)
+        for card in self.select('item', soup):
+            description = _text(self.select_one('description', card))
+            if not description:
+                continue
+            code = self.select_one('code', card)
+            coupons.append(CouponInfo(
+                code=(code.get('data-code') or _text(code)) if code is not None else "",
+                description=description,
+                discount=_text(self.select_one('discount', card)) or "",
+                expiry_date=_text(self.select_one('expiry', card)),
+                store=_text(self.select_one('store', card)) or "",
+                conditions=_text(self.select_one('conditions', card)),
+            ).__dict__)
+        return coupons
+
+
+def register(cls: Type[Extractor]) -> Type[Extractor]:
+    """Class decorator that registers a plugin for its ``domains``."""
+    instance = cls()
+    for domain in cls.domains:
+        _REGISTRY[domain] = instance
+    return cls
+
+
+def get_extractor(url: str) -> Optional[Extractor]:
+    host = (urlparse(url).hostname or '').lower()
+    for domain, extractor in _REGISTRY.items():
+        if host == domain or host.endswith('.' + domain):
+            return extractor
+    return None
+
+
+def extract_products(url: str, content: bytes, store: str) -> List[Dict[str, Any]]:
+    extractor = get_extractor(url)
+    if not isinstance(extractor, ProductExtractor):
+        extractor = ProductExtractor()
+    return extractor.extract(content, url, store)
+
+
+def extract_recipes(url: str, content: bytes, source: str) -> List[Dict[str, Any]]:
+    extractor = get_extractor(url)
+    if not isinstance(extractor, RecipeExtractor):
+        extractor = RecipeExtractor()
+    return extractor.extract(content, url, source)
+
+
+def extract_coupons(url: str, content: bytes) -> List[Dict[str, Any]]:
+    extractor = get_extractor(url)
+    if not isinstance(extractor, CouponExtractor):
+        return []
+    return extractor.extract(content, url)
+
+
+# Store plugins
+
+
+@register
+class ReweExtractor(ProductExtractor):
+    domains = ('shop.rewe.de', 'rewe.de')
+    container = SoupStrainer(attrs={'data-testid': 'product-tile'})
+    selectors = {
+        'item': '[data-testid="product-tile"]',
+        'name': '[data-testid="product-title"]',
+        'price': '[data-testid="current-price-id"], [class*="Price"]',
+        'unit': '[data-testid="product-grammage"]',
+        'unavailable': '[data-testid="product-not-available"]',
+    }
+
+
+@register
+class AldiExtractor(ProductExtractor):
+    domains = ('aldi-sued.de', 'aldi-nord.de')
+    container = SoupStrainer(class_=re.compile(r'\bproduct-tile\b'))
+    selectors = {
+        'item': '.product-tile',
+        'name': '.product-tile__name, .product-title',
+        'price': '.base-price__regular, .price',
+        'unit': '.product-tile__unit-of-measurement, .base-price__comparison-price',
+        'brand': '.product-tile__brandname',
+    }
+
+
+@register
+class LidlExtractor(ProductExtractor):
+    domains = ('lidl.de',)
+    container = SoupStrainer(class_=re.compile(r'\bproduct-grid-box\b'))
+    selectors = {
+        'item': '.product-grid-box',
+        'name': '.product-grid-box__title',
+        'price': '.m-price__price',
+        'unit': '.price-footer, .m-price__label',
+        'brand': '.product-grid-box__brand',
+    }
+
+
+@register
+class EdekaExtractor(ProductExtractor):
+    domains = ('edeka.de', 'edeka24.de')
+    container = SoupStrainer(class_=re.compile(r'\bo-product-tile\b|\bproduct-item\b'))
+    selectors = {
+        'item': '.o-product-tile, .product-item',
+        'name': '.o-product-tile__title, .product-item__name',
+        'price': '.o-product-tile__price, .product-item__price',
+        'unit': '.o-product-tile__unit, .product-item__base-price',
+    }
+
+
+# Recipe plugins
+
+
+@register
+class ChefkochExtractor(RecipeExtractor):
+    domains = ('chefkoch.de',)
+    container = SoupStrainer(class_=re.compile(r'\bds-recipe-card\b'))
+    selectors = {
+        'item': '.ds-recipe-card',
+        'title': '.ds-recipe-card__headline, h2',
+        'link': 'a[href]',
+        'time': '.recipe-preptime',
+    }
+
+
+@register
+class LeckerExtractor(RecipeExtractor):
+    domains = ('lecker.de',)
+    container = SoupStrainer('article')
+    selectors = {
+        'item': 'article',
+        'title': 'h2, h3',
+        'link': 'a[href]',
+    }
+
+
+@register
+class AllrecipesExtractor(RecipeExtractor):
+    domains = ('allrecipes.com',)
+    container = SoupStrainer('a', class_=re.compile(r'\bmntl-card\b'))
+    selectors = {
+        'item': 'a.mntl-card',
+        'title': '.card__title-text',
+    }
+
+
+@register
+class FoodNetworkExtractor(RecipeExtractor):
+    domains = ('foodnetwork.com',)
+    container = SoupStrainer(class_=re.compile(r'\bo-RecipeResult\b'))
+    selectors = {
+        'item': '.o-RecipeResult',
+        'title': '.m-MediaBlock__a-HeadlineText',
+        'link': '.m-MediaBlock__a-Headline a[href]',
+        'time': '.o-RecipeInfo__a-Description',
+    }
+
+
+@register
+class EpicuriousExtractor(RecipeExtractor):
+    domains = ('epicurious.com',)
+    container = SoupStrainer('article')
+    selectors = {
+        'item': 'article',
+        'title': 'h4, h3',
+        'link': 'a[href]',
+    }
+
+
+# Coupon plugins
+
+
+@register
+class RabattcodeExtractor(CouponExtractor):
+    domains = ('rabattcode.de',)
+    container = SoupStrainer(class_=re.compile(r'\bvoucher\b'))
+    selectors = {
+        'item': '.voucher',
+        'description': '.voucher__title, .voucher-title',
+        'discount': '.voucher__value, .voucher-value',
+        'code': '[data-code]',
+        'expiry': '.voucher__expiry, .voucher-expires',
+        'store': '.voucher__shop, .voucher-shop',
+        'conditions': '.voucher__conditions',
+    }
+
+
+@register
+class GutscheineExtractor(CouponExtractor):
+    domains = ('gutscheine.de',)
+    container = SoupStrainer(class_=re.compile(r'\bcoupon\b'))
+    selectors = {
+        'item': '.coupon',
+        'description': '.coupon__title, .coupon-title',
+        'discount': '.coupon__discount, .coupon-discount',
+        'code': '[data-code], .coupon__code',
+        'expiry': '.coupon__expiry, time',
+        'store': '.coupon__shop',
+    }
+
+
+@register
+class SparweltExtractor(CouponExtractor):
+    domains = ('sparwelt.de',)
+    container = SoupStrainer(attrs={'data-voucher-id': True})
+    selectors = {
+        'item': '[data-voucher-id]',
+        'description': '.voucher-title, h3',
+        'discount': '.voucher-discount, .voucher-value',
+        'code': '[data-code]',
+        'expiry': '.voucher-expiry, time',
+        'store': '.voucher-shop',
+    }
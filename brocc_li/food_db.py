@@ -0,0 +1,547 @@
+"""Offline nutrient table: per-100 g nutrients of foods as memory-mapped NumPy columns.
+
+A small table of common English and German ingredients is built in. A larger
+one is built once from an open dataset dump, a USDA FoodData Central CSV
+download (the directory with ``food.csv``, ``food_nutrient.csv``) or an Open
+Food Facts CSV export:
+
+    python -m brocc_li.food_db build FoodData_Central_csv/ --output .cache/brocc_li/foods
+
+Ingredient lines ("60 g oats", "2 eggs", "1 tbsp Olivenöl") are resolved to a
+food id and an amount in grams; the nutrition of a whole meal plan is then one
+gather of the nutrient rows and one scatter-add per meal, whatever its size.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from brocc_li.ingredients import normalize
+from brocc_li.nutrition import NUTRIENTS, to_number
+from brocc_li.utils import get_cache_dir
+
+# name: (aliases, grams per piece or serving, per 100 g in NUTRIENTS order:
+#        kcal, protein g, carbs g, fat g, fiber g, sugar g, sodium mg)
+BUILTIN_FOODS = {
+    'oats': (['oatmeal', 'rolled oats', 'porridge', 'haferflocken', 'hafer'], 40,
+             (389, 16.9, 66.3, 6.9, 10.6, 1.0, 2)),
+    'granola': (['muesli', 'müsli'], 50, (471, 10.0, 64.0, 20.0, 7.0, 20.0, 26)),
+    'bread': (['toast', 'brot', 'toastbrot'], 40, (265, 9.0, 49.0, 3.2, 2.7, 5.0, 491)),
+    'whole wheat bread': (['whole grain bread', 'wholemeal bread', 'vollkornbrot'], 40,
+                          (247, 13.0, 41.0, 3.4, 7.0, 6.0, 400)),
+    'bread roll': (['roll', 'bagel', 'brötchen', 'semmel'], 60, (270, 9.0, 52.0, 2.0, 2.5, 3.0, 500)),
+    'tortilla': (['wrap', 'pita', 'flatbread', 'fladenbrot'], 60, (312, 8.0, 52.0, 8.0, 3.5, 2.5, 600)),
+    'rice cake': (['reiswaffel', 'cracker', 'crispbread', 'knäckebrot'], 10,
+                  (387, 8.0, 81.5, 2.8, 4.2, 0.9, 29)),
+    'rice': (['white rice', 'basmati rice', 'jasmine rice', 'reis', 'basmatireis'], 75,
+             (365, 7.1, 80.0, 0.7, 1.3, 0.1, 5)),
+    'cooked rice': (['steamed rice', 'gekochter reis', 'cooked brown rice'], 150, (130, 2.7, 28.0, 0.3, 0.4, 0.1, 1)),
+    'brown rice': (['whole grain rice', 'vollkornreis', 'naturreis'], 75, (370, 7.9, 77.0, 2.9, 3.5, 0.9, 7)),
+    'pasta': (['spaghetti', 'penne', 'noodle', 'macaroni', 'fusilli', 'nudeln', 'nudel'], 80,
+              (371, 13.0, 75.0, 1.5, 3.2, 2.7, 6)),
+    'whole wheat pasta': (['whole grain pasta', 'vollkornnudeln'], 80, (348, 14.6, 66.0, 2.5, 8.0, 2.5, 8)),
+    'cooked pasta': (['cooked spaghetti', 'cooked noodle', 'gekochte nudeln', 'cooked whole wheat pasta'], 180,
+                     (158, 5.8, 30.9, 0.9, 1.8, 0.6, 1)),
+    'quinoa': ([], 60, (368, 14.1, 64.2, 6.1, 7.0, 0.0, 5)),
+    'cooked quinoa': (['gekochte quinoa'], 150, (120, 4.4, 21.3, 1.9, 2.8, 0.9, 7)),
+    'couscous': (['bulgur'], 60, (376, 12.8, 77.4, 0.6, 5.0, 0.0, 10)),
+    'cooked couscous': (['cooked bulgur', 'gekochter couscous', 'gekochter bulgur'], 150,
+                        (112, 3.8, 23.2, 0.2, 1.4, 0.1, 5)),
+    'flour': (['mehl', 'weizenmehl'], 50, (364, 10.0, 76.0, 1.0, 2.7, 0.3, 2)),
+    'potato': (['kartoffel', 'kartoffeln'], 150, (77, 2.0, 17.0, 0.1, 2.2, 0.8, 6)),
+    'sweet potato': (['süßkartoffel', 'süsskartoffel'], 150, (86, 1.6, 20.1, 0.1, 3.0, 4.2, 55)),
+
+    'chicken breast': (['chicken fillet', 'hähnchenbrust', 'hühnerbrust', 'hähnchenbrustfilet'], 150,
+                       (120, 22.5, 0.0, 2.6, 0.0, 0.0, 45)),
+    'chicken': (['chicken thigh', 'hähnchen', 'huhn', 'hühnchen'], 150, (143, 17.4, 0.0, 8.1, 0.0, 0.0, 77)),
+    'turkey': (['turkey breast', 'pute', 'putenbrust', 'truthahn'], 150, (114, 23.7, 0.0, 1.5, 0.0, 0.0, 50)),
+    'ground beef': (['minced beef', 'beef mince', 'mince', 'hackfleisch', 'rinderhack'], 125,
+                    (215, 18.6, 0.0, 15.0, 0.0, 0.0, 66)),
+    'beef': (['steak', 'rindfleisch', 'rind'], 150, (187, 20.0, 0.0, 12.0, 0.0, 0.0, 60)),
+    'pork': (['pork loin', 'pork chop', 'schweinefleisch', 'schwein'], 125, (143, 21.0, 0.0, 5.8, 0.0, 0.0, 50)),
+    'ham': (['schinken'], 30, (145, 21.0, 1.5, 6.0, 0.0, 1.0, 1200)),
+    'bacon': (['speck'], 20, (417, 13.0, 1.3, 39.7, 0.0, 0.0, 833)),
+    'sausage': (['wurst', 'bratwurst', 'würstchen'], 100, (301, 12.0, 2.0, 27.0, 0.0, 1.0, 800)),
+    'salmon': (['lachs', 'lachsfilet'], 125, (208, 20.0, 0.0, 13.0, 0.0, 0.0, 59)),
+    'tuna': (['thunfisch'], 100, (116, 25.5, 0.0, 0.8, 0.0, 0.0, 247)),
+    'white fish': (['cod', 'pollock', 'haddock', 'tilapia', 'fish', 'kabeljau', 'seelachs', 'fisch'], 125,
+                   (82, 18.0, 0.0, 0.7, 0.0, 0.0, 54)),
+    'shrimp': (['prawn', 'garnele', 'garnelen'], 100, (85, 20.1, 0.0, 0.5, 0.0, 0.0, 119)),
+    'egg': (['boiled egg', 'ei', 'eier'], 50, (143, 12.6, 0.7, 9.5, 0.0, 0.4, 142)),
+    'tofu': ([], 100, (144, 15.8, 2.8, 8.7, 2.3, 0.6, 14)),
+    'tempeh': ([], 100, (192, 20.3, 7.6, 10.8, 0.0, 0.0, 9)),
+    'lentil': (['red lentil', 'linsen', 'linse'], 60, (352, 24.6, 63.4, 1.1, 10.7, 2.0, 6)),
+    'cooked lentil': (['gekochte linsen'], 150, (116, 9.0, 20.1, 0.4, 7.9, 1.8, 2)),
+    'chickpea': (['garbanzo', 'kichererbse', 'kichererbsen'], 120, (164, 8.9, 27.4, 2.6, 7.6, 4.8, 7)),
+    'bean': (['black bean', 'kidney bean', 'white bean', 'bohnen', 'bohne', 'kidneybohnen'], 120,
+             (132, 8.9, 23.7, 0.5, 8.7, 0.3, 1)),
+    'edamame': ([], 100, (121, 11.9, 8.9, 5.2, 5.2, 2.2, 6)),
+    'hummus': (['houmous'], 50, (166, 7.9, 14.3, 9.6, 6.0, 0.3, 379)),
+    'protein powder': (['whey', 'whey protein', 'proteinpulver'], 30, (400, 80.0, 8.0, 6.0, 0.0, 4.0, 300)),
+
+    'milk': (['milch', 'vollmilch'], 250, (61, 3.2, 4.8, 3.3, 0.0, 5.0, 43)),
+    'oat milk': (['hafermilch'], 250, (46, 1.0, 6.7, 1.5, 0.8, 4.0, 42)),
+    'almond milk': (['mandelmilch'], 250, (15, 0.6, 0.6, 1.1, 0.2, 0.0, 72)),
+    'soy milk': (['sojamilch', 'sojadrink'], 250, (54, 3.3, 6.3, 1.8, 0.6, 4.0, 51)),
+    'coconut milk': (['kokosmilch'], 100, (197, 2.0, 2.8, 21.0, 0.0, 2.8, 13)),
+    'yogurt': (['yoghurt', 'natural yogurt', 'joghurt', 'naturjoghurt'], 150, (61, 3.5, 4.7, 3.3, 0.0, 4.7, 46)),
+    'greek yogurt': (['greek yoghurt', 'griechischer joghurt'], 150, (97, 9.0, 3.6, 5.0, 0.0, 3.6, 35)),
+    'quark': (['magerquark', 'skyr'], 150, (67, 12.0, 4.0, 0.3, 0.0, 4.0, 40)),
+    'cottage cheese': (['hüttenkäse', 'körniger frischkäse'], 150, (98, 11.1, 3.4, 4.3, 0.0, 2.7, 364)),
+    'cheese': (['cheddar', 'gouda', 'käse', 'emmentaler'], 30, (403, 25.0, 1.3, 33.0, 0.0, 0.5, 621)),
+    'feta': (['feta cheese', 'schafskäse'], 30, (264, 14.2, 4.1, 21.3, 0.0, 4.1, 1116)),
+    'mozzarella': ([], 60, (280, 28.0, 3.1, 17.0, 0.0, 1.0, 627)),
+    'parmesan': (['parmigiano', 'parmesankäse'], 10, (431, 38.0, 4.1, 29.0, 0.0, 0.9, 1529)),
+    'cream cheese': (['frischkäse'], 30, (342, 6.2, 4.1, 34.0, 0.0, 3.2, 321)),
+    'butter': ([], 10, (717, 0.9, 0.1, 81.1, 0.0, 0.1, 11)),
+    'olive oil': (['oil', 'vegetable oil', 'rapeseed oil', 'olivenöl', 'öl', 'rapsöl'], 10,
+                  (884, 0.0, 0.0, 100.0, 0.0, 0.0, 2)),
+
+    'banana': (['banane'], 120, (89, 1.1, 22.8, 0.3, 2.6, 12.2, 1)),
+    'apple': (['apfel', 'äpfel'], 180, (52, 0.3, 13.8, 0.2, 2.4, 10.4, 1)),
+    'pear': (['birne'], 180, (57, 0.4, 15.2, 0.1, 3.1, 9.8, 1)),
+    'orange': (['mandarin', 'orangen', 'mandarine'], 150, (47, 0.9, 11.8, 0.1, 2.4, 9.4, 0)),
+    'berry': (['blueberry', 'mixed berries', 'beeren', 'heidelbeere', 'blaubeere'], 100,
+              (57, 0.7, 14.5, 0.3, 2.4, 10.0, 1)),
+    'strawberry': (['erdbeere', 'erdbeeren'], 100, (32, 0.7, 7.7, 0.3, 2.0, 4.9, 1)),
+    'raspberry': (['himbeere', 'himbeeren'], 100, (52, 1.2, 11.9, 0.7, 6.5, 4.4, 1)),
+    'grape': (['trauben', 'weintrauben'], 100, (69, 0.7, 18.1, 0.2, 0.9, 15.5, 2)),
+    'mango': ([], 150, (60, 0.8, 15.0, 0.4, 1.6, 13.7, 1)),
+    'pineapple': (['ananas'], 150, (50, 0.5, 13.1, 0.1, 1.4, 9.9, 1)),
+    'lemon': (['lime', 'lemon juice', 'zitrone', 'limette', 'zitronensaft'], 60, (29, 1.1, 9.3, 0.3, 2.8, 2.5, 2)),
+    'avocado': ([], 100, (160, 2.0, 8.5, 14.7, 6.7, 0.7, 7)),
+
+    'tomato': (['cherry tomato', 'tomate', 'tomaten', 'kirschtomate'], 120, (18, 0.9, 3.9, 0.2, 1.2, 2.6, 5)),
+    'cucumber': (['gurke', 'salatgurke'], 150, (15, 0.7, 3.6, 0.1, 0.5, 1.7, 2)),
+    'lettuce': (['salad', 'mixed greens', 'leafy greens', 'arugula', 'rocket', 'salat', 'rucola'], 50,
+                (15, 1.4, 2.9, 0.2, 1.3, 0.8, 28)),
+    'spinach': (['spinat', 'blattspinat'], 50, (23, 2.9, 3.6, 0.4, 2.2, 0.4, 79)),
+    'kale': (['grünkohl'], 50, (49, 4.3, 8.8, 0.9, 3.6, 2.3, 38)),
+    'broccoli': (['brokkoli'], 150, (34, 2.8, 6.6, 0.4, 2.6, 1.7, 33)),
+    'cauliflower': (['blumenkohl'], 150, (25, 1.9, 5.0, 0.3, 2.0, 1.9, 30)),
+    'cabbage': (['kohl', 'weißkohl', 'rotkohl'], 100, (25, 1.3, 5.8, 0.1, 2.5, 3.2, 18)),
+    'carrot': (['karotte', 'möhre', 'möhren', 'karotten'], 80, (41, 0.9, 9.6, 0.2, 2.8, 4.7, 69)),
+    'bell pepper': (['red pepper', 'green pepper', 'yellow pepper', 'paprika', 'paprikaschote'], 120,
+                    (31, 1.0, 6.0, 0.3, 2.1, 4.2, 4)),
+    'onion': (['red onion', 'shallot', 'zwiebel', 'zwiebeln', 'schalotte'], 110, (40, 1.1, 9.3, 0.1, 1.7, 4.2, 4)),
+    'garlic': (['garlic clove', 'knoblauch', 'knoblauchzehe'], 5, (149, 6.4, 33.1, 0.5, 2.1, 1.0, 17)),
+    'zucchini': (['courgette'], 200, (17, 1.2, 3.1, 0.3, 1.0, 2.5, 8)),
+    'mushroom': (['champignon', 'champignons', 'pilz', 'pilze'], 100, (22, 3.1, 3.3, 0.3, 1.0, 2.0, 5)),
+    'pea': (['green pea', 'erbse', 'erbsen'], 80, (81, 5.4, 14.5, 0.4, 5.7, 5.7, 5)),
+    'corn': (['sweetcorn', 'mais'], 80, (86, 3.3, 19.0, 1.4, 2.7, 6.3, 15)),
+    'green bean': (['grüne bohnen'], 100, (31, 1.8, 7.0, 0.2, 2.7, 3.3, 6)),
+    'asparagus': (['spargel'], 150, (20, 2.2, 3.9, 0.1, 2.1, 1.9, 2)),
+    'eggplant': (['aubergine'], 200, (25, 1.0, 5.9, 0.2, 3.0, 3.5, 2)),
+    'vegetable': (['mixed vegetables', 'veggies', 'gemüse'], 150, (40, 2.0, 7.0, 0.3, 2.8, 3.0, 30)),
+    'tomato sauce': (['passata', 'marinara', 'tomato paste', 'tomatensauce', 'tomatenmark'], 100,
+                     (32, 1.4, 6.2, 0.2, 1.6, 4.6, 330)),
+    'vegetable broth': (['broth', 'stock', 'gemüsebrühe', 'brühe'], 250, (6, 0.2, 0.9, 0.2, 0.0, 0.4, 300)),
+
+    'almond': (['mandel', 'mandeln'], 30, (579, 21.2, 21.6, 49.9, 12.5, 4.4, 1)),
+    'walnut': (['walnuss', 'walnüsse'], 30, (654, 15.2, 13.7, 65.2, 6.7, 2.6, 2)),
+    'nut': (['mixed nuts', 'nüsse', 'nuss', 'cashew', 'hazelnut', 'haselnuss'], 30,
+            (607, 20.0, 21.0, 54.0, 7.0, 4.0, 3)),
+    'peanut butter': (['erdnussbutter', 'nut butter', 'almond butter'], 16, (588, 25.1, 20.0, 50.4, 6.0, 9.2, 459)),
+    'tahini': (['sesame paste'], 15, (595, 17.0, 21.2, 53.8, 9.3, 0.5, 115)),
+    'chia seed': (['chia', 'chiasamen'], 15, (486, 16.5, 42.1, 30.7, 34.4, 0.0, 16)),
+    'flaxseed': (['linseed', 'leinsamen', 'seed', 'samen'], 10, (534, 18.3, 28.9, 42.2, 27.3, 1.6, 30)),
+    'honey': (['honig'], 20, (304, 0.3, 82.4, 0.0, 0.2, 82.1, 4)),
+    'maple syrup': (['agave syrup', 'ahornsirup', 'sirup'], 20, (260, 0.0, 67.0, 0.1, 0.0, 60.5, 12)),
+    'sugar': (['zucker', 'brown sugar'], 10, (387, 0.0, 100.0, 0.0, 0.0, 100.0, 1)),
+    'jam': (['marmalade', 'marmelade', 'konfitüre'], 20, (250, 0.4, 62.0, 0.1, 1.0, 49.0, 30)),
+    'dark chocolate': (['chocolate', 'schokolade', 'zartbitterschokolade'], 20, (546, 4.9, 61.0, 31.0, 7.0, 48.0, 24)),
+
+    'soy sauce': (['sojasauce', 'sojasoße', 'tamari'], 15, (53, 8.1, 4.9, 0.6, 0.8, 0.4, 5493)),
+    'mustard': (['senf'], 10, (66, 4.4, 5.8, 3.3, 4.0, 0.9, 1104)),
+    'mayonnaise': (['mayo'], 15, (680, 1.0, 0.6, 75.0, 0.0, 0.6, 635)),
+    'vinegar': (['balsamic vinegar', 'essig', 'balsamico'], 10, (18, 0.0, 0.9, 0.0, 0.0, 0.4, 2)),
+    'salt': (['salz', 'sea salt'], 1, (0, 0.0, 0.0, 0.0, 0.0, 0.0, 38758)),
+    # "salt and pepper" and "pepper to taste" mean the spice, not a bell pepper
+    'black pepper': (['pepper', 'pfeffer'], 1, (251, 10.4, 64.0, 3.3, 25.3, 0.6, 20)),
+    'spices': (['herbs', 'basil', 'oregano', 'thyme', 'rosemary', 'parsley', 'cilantro', 'coriander', 'dill',
+                'cinnamon', 'cumin', 'turmeric', 'curry powder', 'chili flakes', 'ginger', 'kräuter',
+                'gewürze', 'zimt', 'petersilie', 'basilikum', 'ingwer'], 2,
+               (250, 10.0, 50.0, 5.0, 30.0, 2.0, 50)),
+    'water': (['wasser', 'ice'], 250, (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0)),
+    'coffee': (['espresso', 'kaffee'], 240, (1, 0.1, 0.0, 0.0, 0.0, 0.0, 2)),
+    'tea': (['green tea', 'tee'], 240, (1, 0.0, 0.3, 0.0, 0.0, 0.0, 3)),
+    'orange juice': (['juice', 'orangensaft', 'saft'], 250, (45, 0.7, 10.4, 0.2, 0.2, 8.4, 1)),
+}
+
+# Grams per unit; volumes are taken at the density of water
+UNIT_GRAMS = {
+    'mg': 0.001, 'g': 1, 'gr': 1, 'gram': 1, 'grams': 1, 'gramm': 1, 'kg': 1000,
+    'ml': 1, 'cl': 10, 'dl': 100, 'l': 1000, 'liter': 1000, 'litre': 1000, 'liters': 1000, 'litres': 1000,
+    'oz': 28.35, 'ounce': 28.35, 'ounces': 28.35, 'lb': 453.6, 'lbs': 453.6, 'pound': 453.6, 'pounds': 453.6,
+    'cup': 240, 'cups': 240, 'tasse': 240, 'tassen': 240,
+    'tbsp': 15, 'tablespoon': 15, 'tablespoons': 15, 'el': 15,
+    'tsp': 5, 'teaspoon': 5, 'teaspoons': 5, 'tl': 5,
+    'pinch': 0.5, 'prise': 0.5, 'handful': 30, 'handvoll': 30, 'can': 400, 'cans': 400, 'dose': 400,
+}
+# Units that count pieces of the food, weighed with its portion size
+PIECE_UNITS = {'piece', 'pieces', 'slice', 'slices', 'clove', 'cloves', 'serving', 'servings', 'stück',
+               'scheibe', 'scheiben', 'portion', 'portionen'}
+FRACTIONS = {'½': 0.5, '¼': 0.25, '¾': 0.75, '⅓': 1 / 3, '⅔': 2 / 3}
+
+# Longest alias tried against the words of an ingredient line
+MAX_ALIAS_WORDS = 4
+# "1 cup cooked quinoa" is the cooked food ("cooked quinoa"), not 240 g of the dry one
+COOKED_WORDS = frozenset(
+    normalize(word) for word in ('cooked', 'boiled', 'gekocht', 'gekochte', 'gekochter', 'gekochtes')
+)
+# German aliases at least this long also match the end of a compound word ("Vollkornreis" -> "reis")
+COMPOUND_MIN_LENGTH = 4
+DEFAULT_PORTION = 100.0
+MEMO_SIZE = 65536
+
+# USDA FoodData Central nutrient ids per column, in order of preference
+FDC_NUTRIENT_IDS = {
+    'calories': (1008, 2047, 2048),
+    'protein': (1003,),
+    'carbs': (1005, 1050),
+    'fat': (1004, 1085),
+    'fiber': (1079,),
+    'sugar': (2000, 1063),
+    'sodium': (1093,),
+}
+# Branded foods are left out: millions of rows for the same generic foods
+FDC_DATA_TYPES = {'foundation_food', 'sr_legacy_food', 'survey_fndds_food'}
+# Open Food Facts columns per 100 g; sodium is given in grams
+OFF_COLUMNS = {
+    'calories': 'energy-kcal_100g', 'protein': 'proteins_100g', 'carbs': 'carbohydrates_100g',
+    'fat': 'fat_100g', 'fiber': 'fiber_100g', 'sugar': 'sugars_100g', 'sodium': 'sodium_100g',
+}
+
+_UNITS = '|'.join(sorted(map(re.escape, [*UNIT_GRAMS, *PIECE_UNITS]), key=len, reverse=True))
+_QUANTITY = re.compile(
+    r"(\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?|[½¼¾⅓⅔])\s*(?:(" + _UNITS + r")(?![^\W\d_]))?\.?",
+    re.IGNORECASE,
+)
+
+
+def parse_quantity(ingredient: str) -> Tuple[Optional[float], Optional[str], str]:
+    """``(amount, unit, rest)`` of an ingredient line: "1/2 cup milk" -> (0.5, "cup", "milk")."""
+    match = _QUANTITY.search(ingredient)
+    if not match:
+        return None, None, ingredient
+    number = match.group(1)
+    if number in FRACTIONS:
+        amount = FRACTIONS[number]
+    elif '/' in number:
+        numerator, denominator = (float(part) for part in number.split('/'))
+        amount = numerator / denominator if denominator else numerator
+    else:
+        amount = float(number.replace(',', '.'))
+    unit = match.group(2).lower() if match.group(2) else None
+    return amount, unit, ingredient[:match.start()] + ' ' + ingredient[match.end():]
+
+
+def _meal_items(day: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    meals = day.get('meals') if isinstance(day.get('meals'), dict) else {}
+    for meal in meals.values():
+        # Snacks come as a list of meals
+        for item in (meal if isinstance(meal, list) else [meal]):
+            if isinstance(item, dict):
+                yield item
+
+
+class FoodDatabase:
+    """Nutrients per 100 g (``foods x NUTRIENTS``), portion sizes and an alias -> food id map."""
+
+    def __init__(self, nutrients: np.ndarray, portions: np.ndarray, names: Sequence[str],
+                 aliases: Dict[str, int], path: Optional[Path] = None):
+        self.nutrients = nutrients
+        self.portions = portions
+        self.names = names
+        self.aliases = aliases
+        self.path = path
+        self._compounds = sorted(
+            (alias for alias in aliases if ' ' not in alias and len(alias) >= COMPOUND_MIN_LENGTH),
+            key=len, reverse=True,
+        )
+        # Ingredient line -> (food id or -1, grams); cleared when it reaches MEMO_SIZE entries
+        self._memo: Dict[str, Tuple[int, float]] = {}
+
+    @classmethod
+    def builtin(cls) -> 'FoodDatabase':
+        """The table of common ingredients that ships with the package."""
+        return cls(*_builtin_columns())
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FoodDatabase':
+        """Open a database written by :func:`build_database`; the columns are memory-mapped."""
+        path = Path(path)
+        return cls(
+            np.load(path / 'nutrients.npy', mmap_mode='r'),
+            np.load(path / 'portions.npy', mmap_mode='r'),
+            np.load(path / 'names.npy', mmap_mode='r'),
+            json.loads((path / 'aliases.json').read_text(encoding='utf-8')),
+            path,
+        )
+
+    def __len__(self) -> int:
+        return len(self.portions)
+
+    def resolve(self, name: str) -> Optional[int]:
+        """Food id of an ingredient name: the longest known alias in it, the rightmost one on a tie.
+
+        A dry food said to be cooked ("gekochte Nudeln") resolves to its
+        cooked entry when the table has one.
+        """
+        words = normalize(name).split()
+        food = self._resolve(words)
+        if food is not None and not COOKED_WORDS.isdisjoint(words):
+            cooked = self.aliases.get(f"cooked {normalize(str(self.names[food]))}")
+            if cooked is not None:
+                return cooked
+        return food
+
+    def _resolve(self, words: List[str]) -> Optional[int]:
+        for size in range(min(len(words), MAX_ALIAS_WORDS), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                food = self.aliases.get(' '.join(words[start:start + size]))
+                if food is not None:
+                    return food
+        # German compounds put the head noun last: "Vollkornreis", "Putenbrustfilet"
+        for word in reversed(words):
+            for alias in self._compounds:
+                if len(alias) < len(word) and word.endswith(alias):
+                    return self.aliases[alias]
+        return None
+
+    def lookup(self, ingredient: str) -> Tuple[Optional[int], float]:
+        """``(food id, grams)`` of an ingredient line; the food id is None if it is unknown."""
+        cached = self._memo.get(ingredient)
+        if cached is None:
+            amount, unit, name = parse_quantity(ingredient)
+            food = self.resolve(name)
+            grams = 0.0
+            if food is not None:
+                portion = float(self.portions[food]) or DEFAULT_PORTION
+                if unit in UNIT_GRAMS:
+                    grams = amount * UNIT_GRAMS[unit]
+                else:
+                    grams = (amount if amount is not None else 1.0) * portion
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            cached = self._memo[ingredient] = (-1 if food is None else food, grams)
+        food, grams = cached
+        return (None if food < 0 else food), grams
+
+    def fill_nutrition(self, meal_plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Compute the nutrition of every meal and day of ``meal_plan`` in place from the ingredient quantities.
+
+        A meal keeps the nutrition it came with when some of its ingredients
+        are unknown, since a partial sum would undercount it. Day totals are
+        the sums of their meals. Returns ``meal_plan``.
+        """
+        meals: List[Dict[str, Any]] = []
+        meal_days: List[int] = []
+        owners: List[int] = []
+        foods: List[int] = []
+        grams: List[float] = []
+        unknown: List[int] = []
+        for d, day in enumerate(meal_plan):
+            if not isinstance(day, dict):
+                continue
+            for meal in _meal_items(day):
+                index = len(meals)
+                meals.append(meal)
+                meal_days.append(d)
+                missing = 0
+                for ingredient in meal.get('ingredients') or []:
+                    food, amount = self.lookup(str(ingredient))
+                    if food is None:
+                        missing += 1
+                    else:
+                        owners.append(index)
+                        foods.append(food)
+                        grams.append(amount)
+                unknown.append(missing)
+        if not meals:
+            return meal_plan
+
+        owner_index = np.asarray(owners, dtype=np.intp)
+        values = self.nutrients[np.asarray(foods, dtype=np.intp)] * (np.asarray(grams) / 100)[:, None]
+        per_meal = np.zeros((len(meals), len(NUTRIENTS)))
+        np.add.at(per_meal, owner_index, values)
+        resolved = np.bincount(owner_index, minlength=len(meals))
+
+        has_nutrition = np.zeros(len(meals), dtype=bool)
+        for i, meal in enumerate(meals):
+            given = meal.get('nutrition')
+            if resolved[i] and (not unknown[i] or not isinstance(given, dict) or not given):
+                meal['nutrition'] = {
+                    nutrient: round(float(value), 1) for nutrient, value in zip(NUTRIENTS, per_meal[i])
+                }
+                has_nutrition[i] = True
+            elif isinstance(given, dict) and given:
+                per_meal[i] = [to_number(given.get(nutrient)) for nutrient in NUTRIENTS]
+                has_nutrition[i] = True
+
+        day_index = np.asarray(meal_days, dtype=np.intp)
+        per_day = np.zeros((len(meal_plan), len(NUTRIENTS)))
+        np.add.at(per_day, day_index[has_nutrition], per_meal[has_nutrition])
+        for d in np.unique(day_index[has_nutrition]):
+            meal_plan[d]['total_nutrition'] = {
+                nutrient: round(float(value), 1) for nutrient, value in zip(NUTRIENTS, per_day[d])
+            }
+        return meal_plan
+
+
+def _builtin_columns() -> Tuple[np.ndarray, np.ndarray, List[str], Dict[str, int]]:
+    names = list(BUILTIN_FOODS)
+    nutrients = np.array([values for _, _, values in BUILTIN_FOODS.values()], dtype=np.float32)
+    portions = np.array([portion for _, portion, _ in BUILTIN_FOODS.values()], dtype=np.float32)
+    aliases: Dict[str, int] = {}
+    # Names first, so that an alias never shadows another food's own name
+    for food, name in enumerate(names):
+        aliases[normalize(name)] = food
+    for food, (food_aliases, _, _) in enumerate(BUILTIN_FOODS.values()):
+        for alias in food_aliases:
+            aliases.setdefault(normalize(alias), food)
+    return nutrients, portions, names, aliases
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value) if value not in (None, '') else np.nan
+    except ValueError:
+        return np.nan
+
+
+def _iter_fdc(path: Path) -> Iterator[Tuple[str, List[float]]]:
+    """``(description, per-100 g nutrients)`` of the generic foods in a FoodData Central CSV download."""
+    wanted = {nutrient_id: (column, rank) for column, ids in FDC_NUTRIENT_IDS.items()
+              for rank, nutrient_id in enumerate(ids)}
+    with open(path / 'food.csv', newline='', encoding='utf-8') as f:
+        foods = {
+            row['fdc_id']: row['description'] for row in csv.DictReader(f)
+            if row.get('data_type') in FDC_DATA_TYPES and row.get('description')
+        }
+    # fdc_id -> column -> (rank, amount); the best ranked nutrient id wins
+    amounts: Dict[str, Dict[str, Tuple[int, float]]] = {}
+    with open(path / 'food_nutrient.csv', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            fdc_id = row['fdc_id']
+            try:
+                column, rank = wanted[int(row['nutrient_id'])]
+            except (KeyError, ValueError):
+                continue
+            if fdc_id not in foods:
+                continue
+            amount = _number(row.get('amount'))
+            current = amounts.setdefault(fdc_id, {}).get(column)
+            if not np.isnan(amount) and (current is None or rank < current[0]):
+                amounts[fdc_id][column] = (rank, amount)
+    for fdc_id, columns in amounts.items():
+        if 'calories' in columns:
+            yield foods[fdc_id], [columns.get(nutrient, (0, 0.0))[1] for nutrient in NUTRIENTS]
+
+
+def _iter_off(path: Path) -> Iterator[Tuple[str, List[float]]]:
+    """``(product name, per-100 g nutrients)`` of an Open Food Facts CSV export (tab separated)."""
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter='\t'):
+            name = (row.get('product_name') or '').strip()
+            calories = _number(row.get(OFF_COLUMNS['calories']))
+            if not name or np.isnan(calories):
+                continue
+            values = [_number(row.get(OFF_COLUMNS[nutrient])) for nutrient in NUTRIENTS]
+            values[-1] *= 1000  # g -> mg
+            yield name, [0.0 if np.isnan(value) else value for value in values]
+
+
+def _iter_dump(path: Path) -> Iterator[Tuple[str, List[float]]]:
+    if path.is_dir():
+        return _iter_fdc(path)
+    return _iter_off(path)
+
+
+def build_database(inputs: Iterable[Union[str, Path]], output: Union[str, Path]) -> Dict[str, Any]:
+    """Write the built-in foods plus the foods of the given dataset dumps to ``output``."""
+    nutrients, portions, names, aliases = _builtin_columns()
+    rows: Dict[str, List[float]] = {}
+    for path in inputs:
+        for name, values in _iter_dump(Path(path)):
+            rows.setdefault(name, values)
+
+    # Shorter descriptions are the more generic foods ("Milk, whole" before
+    # "Milk, whole, 3.25% milkfat, with added vitamin D"), so they claim the short aliases
+    dump_names = sorted(rows, key=lambda name: (len(name), name))
+    offset = len(names)
+    for food, name in enumerate(dump_names, start=offset):
+        aliases.setdefault(normalize(name), food)
+        # USDA descriptions start with the food itself: "Oats, raw" -> "oat"
+        head = normalize(name.split(',')[0])
+        if head:
+            aliases.setdefault(head, food)
+
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    np.save(output / 'nutrients.npy', np.concatenate([
+        nutrients, np.array([rows[name] for name in dump_names], dtype=np.float32).reshape(-1, len(NUTRIENTS)),
+    ]))
+    np.save(output / 'portions.npy', np.concatenate([
+        portions, np.full(len(dump_names), DEFAULT_PORTION, dtype=np.float32),
+    ]))
+    np.save(output / 'names.npy', np.array(names + dump_names, dtype=np.str_))
+    (output / 'aliases.json').write_text(json.dumps(aliases, ensure_ascii=False), encoding='utf-8')
+    meta = {'foods': offset + len(dump_names), 'builtin': offset, 'nutrients': list(NUTRIENTS)}
+    (output / 'meta.json').write_text(json.dumps(meta))
+    return {**meta, 'aliases': len(aliases)}
+
+
+def load_database(path: Optional[Union[str, Path]] = None) -> FoodDatabase:
+    """The database at ``path``, BROCC_LI_FOOD_DB or the cache directory, or the built-in table if none was built."""
+    path = Path(path or os.getenv('BROCC_LI_FOOD_DB') or get_cache_dir() / 'foods')
+    if (path / 'meta.json').exists():
+        return FoodDatabase.load(path)
+    return FoodDatabase.builtin()
+
+
+_shared: Optional[FoodDatabase] = None
+_shared_lock = threading.Lock()
+
+
+def shared_food_db() -> FoodDatabase:
+    """The food database used by the report tools."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = load_database()
+        return _shared
+
+
+def fill_nutrition(meal_plan: List[Dict[str, Any]], database: Optional[FoodDatabase] = None) -> List[Dict[str, Any]]:
+    """Compute the nutrition of ``meal_plan`` in place from its ingredients; see :meth:`FoodDatabase.fill_nutrition`."""
+    return (database or shared_food_db()).fill_nutrition(meal_plan)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the offline nutrient database.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Index one or more open food dataset dumps")
+    build.add_argument('inputs', nargs='+',
+                       help="FoodData Central CSV directories or Open Food Facts CSV exports")
+    build.add_argument('--output', default=None, help="Output directory (default: the cache directory)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        output = args.output or os.getenv('BROCC_LI_FOOD_DB') or get_cache_dir() / 'foods'
+        summary = build_database(args.inputs, output)
+        print(f"Indexed {summary['foods']} foods under {summary['aliases']} names into {output}")
+
+
+if __name__ == '__main__':
+    main()
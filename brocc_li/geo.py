@@ -0,0 +1,127 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+EARTH_RADIUS_KM = 6371
+METERS_PER_DEGREE_LAT = 111_320
+
+BBox = Tuple[float, float, float, float]  # south, west, north, east
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    """Encode a coordinate as a geohash string of ``precision`` characters."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_bbox(geohash: str) -> BBox:
+    """Return the (south, west, north, east) bounds of a geohash tile."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def tile_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash tile at ``precision``."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> BBox:
+    """Bounding box that contains the circle of ``radius_m`` around a point."""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lat - dlat, -90.0),
+        max(lon - dlon, -180.0),
+        min(lat + dlat, 90.0),
+        min(lon + dlon, 180.0),
+    )
+
+
+def geohashes_in_bbox(bbox: BBox, precision: int = 5) -> List[str]:
+    """All geohash tiles of ``precision`` that intersect ``bbox``."""
+    south, west, north, east = bbox
+    height, width = tile_size(precision)
+
+    # Snap to tile centers so every intersecting tile is visited exactly once
+    first_lat = (math.floor((south + 90) / height) + 0.5) * height - 90
+    first_lon = (math.floor((west + 180) / width) + 0.5) * width - 180
+
+    hashes = []
+    lat = first_lat
+    while lat - height / 2 < north:
+        lon = first_lon
+        while lon - width / 2 < east:
+            hashes.append(geohash_encode(lat, lon, precision))
+            lon += width
+        lat += height
+    return hashes
+
+
+def geohashes_in_radius(lat: float, lon: float, radius_m: float, precision: int = 5) -> List[str]:
+    """Geohash tiles covering the circle of ``radius_m`` around a point."""
+    return geohashes_in_bbox(radius_bbox(lat, lon, radius_m), precision)
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def nearest_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` smallest distances, nearest first."""
+    if k <= 0 or distances.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < distances.size:
+        candidates = np.argpartition(distances, k - 1)[:k]
+    else:
+        candidates = np.arange(distances.size)
+    return candidates[np.argsort(distances[candidates], kind="stable")]
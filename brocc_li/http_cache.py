@@ -0,0 +1,211 @@
+import base64
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from brocc_li.cache import SQLiteCache
+
+# Response headers needed to rebuild and revalidate a cached response
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified')
+
+
+class ResponseCache:
+    """Bounded in-memory LRU of HTTP responses with an optional SQLite spill.
+
+    Entries evicted from memory are written to ``spill`` (if given) and promoted
+    back on the next lookup. Stale entries are kept so they can be revalidated
+    with ETag/Last-Modified instead of being downloaded again.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 512,
+        max_bytes: int = 32 * 1024 * 1024,
+        spill: Optional[SQLiteCache] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stored': 0,
+            'evicted': 0,
+            'spilled': 0,
+        }
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for ``key``, fresh or stale, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.spill is not None:
+            stored = self.spill.get(key)
+            if stored is not None:
+                entry = {**stored, 'content': base64.b64decode(stored['content'])}
+                self.put(key, entry)
+                return entry
+        return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old['content'])
+            self._entries[key] = entry
+            self._bytes += len(entry['content'])
+            self._evict()
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, 'entries': len(self._entries), 'bytes': self._bytes}
+
+    def _evict(self) -> None:
+        """Drop least recently used entries above the bounds, spilling them if enabled."""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= len(entry['content'])
+            self.counters['evicted'] += 1
+            if self.spill is not None:
+                self.spill.set(key, {**entry, 'content': base64.b64encode(entry['content']).decode()})
+                self.counters['spilled'] += 1
+
+
+class CachedSession(requests.Session):
+    """``requests.Session`` that serves GET requests from per-domain response caches.
+
+    Caches are attached with :meth:`mount_cache`, much like transport adapters
+    are attached with ``mount``; requests to other domains go straight through.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._caches: List[Tuple[Tuple[str, ...], ResponseCache]] = []
+
+    def mount_cache(self, domains: Iterable[str], cache: ResponseCache) -> None:
+        """Serve GET requests to ``domains`` (and their subdomains) from ``cache``."""
+        self._caches.append((tuple(domain.lower() for domain in domains), cache))
+
+    def cache_for(self, url: str) -> Optional[ResponseCache]:
+        host = (urlparse(url).hostname or '').lower()
+        for domains, cache in self._caches:
+            if any(host == domain or host.endswith('.' + domain) for domain in domains):
+                return cache
+        return None
+
+    def cache_stats(self) -> List[Dict[str, Any]]:
+        return [{'domains': list(domains), **cache.stats()} for domains, cache in self._caches]
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        cache = self.cache_for(url) if method.upper() == 'GET' else None
+        if cache is None:
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        key = self._cache_key(method, url, params)
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry):
+            cache.record('hits')
+            return self._build_response(entry)
+
+        headers = dict(headers or {})
+        if entry is not None:
+            # Ask the origin whether our stale copy is still valid
+            if entry['headers'].get('etag'):
+                headers['If-None-Match'] = entry['headers']['etag']
+            if entry['headers'].get('last-modified'):
+                headers['If-Modified-Since'] = entry['headers']['last-modified']
+
+        response = super().request(method, url, params=params, headers=headers, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            refreshed = {
+                **entry,
+                'headers': {**entry['headers'], **self._kept_headers(response)},
+                'stored_at': time.time(),
+            }
+            cache.put(key, refreshed)
+            cache.record('revalidated')
+            return self._build_response(refreshed)
+
+        cache.record('misses')
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self._store_when_read(response, cache, key)
+        return response
+
+    def _store_when_read(self, response: requests.Response, cache: ResponseCache, key: str) -> None:
+        """Cache ``response`` once its body has been read, also for ``stream=True``."""
+        def store(content: bytes) -> None:
+            cache.put(key, {
+                'status': response.status_code,
+                'url': response.url,
+                'headers': self._kept_headers(response),
+                'content': content,
+                'stored_at': time.time(),
+            })
+            cache.record('stored')
+
+        if response._content_consumed:
+            store(response.content)
+            return
+
+        read_chunks = response.iter_content
+
+        def iter_content(chunk_size=1, decode_unicode=False):
+            if decode_unicode:
+                yield from read_chunks(chunk_size, decode_unicode)
+                return
+            chunks = []
+            for chunk in read_chunks(chunk_size):
+                chunks.append(chunk)
+                yield chunk
+            # Only complete bodies are cached; aborted downloads never get here
+            store(b"".join(chunks))
+
+        response.iter_content = iter_content
+
+    @staticmethod
+    def _cache_key(method: str, url: str, params: Any) -> str:
+        prepared = requests.Request(method.upper(), url, params=params).prepare()
+        return f"{prepared.method} {prepared.url}"
+
+    @staticmethod
+    def _kept_headers(response: requests.Response) -> Dict[str, str]:
+        return {
+            name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers
+        }
+
+    @staticmethod
+    def _build_response(entry: Dict[str, Any]) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry['content']
+        response._content_consumed = True
+        return response
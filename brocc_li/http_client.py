@@ -0,0 +1,172 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Responses that count against a host's breaker and are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} is unavailable, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-host breaker: ``closed`` -> ``open`` after repeated failures -> ``half_open`` after a cool-down.
+
+    While open every request fails immediately. After ``cooldown`` seconds a
+    single probe request is let through; its outcome closes or re-opens the
+    breaker.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 3, cooldown: float = 60):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.counters = {'opened': 0, 'rejected': 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.state == 'closed':
+                return
+            retry_in = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == 'open' and retry_in <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return
+            self.counters['rejected'] += 1
+        raise CircuitOpenError(self.host, max(retry_in, 0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.counters['opened'] += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = self.opened_at + self.cooldown - time.monotonic() if self.state == 'open' else 0
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': round(max(retry_in, 0), 1),
+                **self.counters,
+            }
+
+
+class HostBreakers:
+    """One :class:`CircuitBreaker` per host, shared by every session mounted with it."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.cooldown)
+            return self._breakers[host]
+
+    def state(self, url: str) -> str:
+        """Breaker state (``closed``, ``open`` or ``half_open``) for the host of ``url``."""
+        return self.breaker(urlparse(url).hostname or url).stats()['state']
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.host: breaker.stats() for breaker in breakers}
+
+
+class ResilientAdapter(HTTPAdapter):
+    """Transport adapter with bounded, jittered retries and a per-host circuit breaker.
+
+    Retries happen inside urllib3, so a breaker counts one failure per request
+    that still failed after all its retries. Only connection errors and
+    ``RETRY_STATUSES`` answers are retried: after a read timeout the server
+    may already have acted on the request, and waiting for it again would
+    multiply the caller's timeout.
+    """
+
+    def __init__(
+        self,
+        breakers: HostBreakers,
+        pool_size: int = 4,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        backoff_max: float = 3,
+        allowed_methods: Iterable[str] = Retry.DEFAULT_ALLOWED_METHODS,
+    ):
+        self.breakers = breakers
+        retry = Retry(
+            total=retries,
+            read=False,
+            backoff_factor=backoff_factor,
+            backoff_max=backoff_max,
+            backoff_jitter=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(allowed_methods),
+            # A long Retry-After would make the retries unbounded; the breaker handles throttling
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        super().__init__(pool_maxsize=pool_size, max_retries=retry)
+
+    def send(self, request, **kwargs):
+        breaker = self.breakers.breaker(urlparse(request.url).hostname or '')
+        breaker.before_request()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+def mount_resilient(
+    session: requests.Session,
+    breakers: HostBreakers,
+    pool_sizes: Optional[Dict[str, int]] = None,
+    default_pool_size: int = 4,
+    **adapter_options: Any,
+) -> requests.Session:
+    """Route all of ``session``'s traffic through :class:`ResilientAdapter`.
+
+    ``pool_sizes`` maps hostnames to their connection pool size; other hosts
+    share adapters with ``default_pool_size`` connections per host.
+    """
+    for scheme in ('http://', 'https://'):
+        session.mount(scheme, ResilientAdapter(breakers, default_pool_size, **adapter_options))
+    for host, pool_size in (pool_sizes or {}).items():
+        session.mount(f'https://{host}/', ResilientAdapter(breakers, pool_size, **adapter_options))
+    return session
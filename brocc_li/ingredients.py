@@ -0,0 +1,431 @@
+"""Shared ingredient taxonomy: English and German synonyms per shopping category.
+
+All synonyms are compiled into one Aho-Corasick automaton, so an ingredient
+line is categorized in a single pass over its characters regardless of the
+size of the dictionary. English synonyms match whole words (after plurals are
+folded, "cherry tomatoes" -> "cherry tomato"); German synonyms of four or
+more letters also match the end of a compound word, which is where German
+puts the head noun ("Vollmilch" -> "milch", "Olivenöl" -> "öl"). The longest
+match wins ("cherry tomatoes" is a vegetable, not a cherry; "red pepper flakes"
+a spice, not a bell pepper), and the rightmost one on a tie, since the head
+of an English noun phrase comes last.
+
+A second automaton over ``DIETARY`` finds the allergens and animal products
+of an ingredient line for the recipe filters; every label found counts there,
+not just the longest match.
+"""
+
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Shopping categories with their English ('en') and German ('de') synonyms
+TAXONOMY = {
+    'proteins': {
+        'en': [
+            'chicken', 'chicken breast', 'chicken thigh', 'chicken wing', 'turkey', 'turkey breast', 'duck',
+            'beef', 'ground beef', 'minced beef', 'steak', 'veal', 'pork', 'pork chop', 'pork loin', 'ham',
+            'bacon', 'sausage', 'salami', 'chorizo', 'lamb', 'mince', 'minced meat', 'meat', 'meatball',
+            'fish', 'salmon', 'tuna', 'cod', 'trout', 'mackerel', 'herring', 'sardine', 'anchovy', 'pollock',
+            'tilapia', 'haddock', 'shrimp', 'prawn', 'mussel', 'seafood', 'crab', 'squid',
+            'egg', 'eggs', 'egg white', 'tofu', 'tempeh', 'seitan', 'edamame',
+            'bean', 'black bean', 'kidney bean', 'white bean', 'chickpea', 'garbanzo', 'lentil', 'red lentil',
+            'split pea', 'hummus', 'protein powder', 'whey',
+        ],
+        'de': [
+            'hähnchen', 'hähnchenbrust', 'hähnchenschenkel', 'hühnchen', 'huhn', 'hühnerbrust', 'pute',
+            'putenbrust', 'ente', 'rind', 'rindfleisch', 'hackfleisch', 'hack', 'schwein', 'schweinefleisch',
+            'schnitzel', 'kotelett', 'schinken', 'speck', 'wurst', 'würstchen', 'salami', 'lamm', 'fleisch',
+            'frikadelle', 'fisch', 'lachs', 'thunfisch', 'kabeljau', 'forelle', 'makrele', 'hering', 'sardine',
+            'sardellen', 'seelachs', 'garnele', 'garnelen', 'krabben', 'muscheln', 'meeresfrüchte',
+            'ei', 'eier', 'eiweiß', 'tofu', 'tempeh', 'bohne', 'bohnen', 'kidneybohnen', 'kichererbse',
+            'kichererbsen', 'linse', 'linsen', 'erbsenprotein', 'eiweißpulver', 'filet', 'steak', 'lachsfilet',
+            'fischfilet', 'hähnchenbrustfilet', 'rindersteak',
+        ],
+    },
+    'vegetables': {
+        'en': [
+            'tomato', 'cherry tomato', 'lettuce', 'romaine', 'iceberg', 'salad green', 'mixed green',
+            'arugula', 'rocket', 'spinach', 'baby spinach', 'kale', 'chard', 'cabbage', 'red cabbage',
+            'cucumber', 'carrot', 'onion', 'red onion', 'spring onion', 'green onion', 'scallion', 'shallot',
+            'leek', 'garlic', 'garlic clove', 'broccoli', 'cauliflower', 'zucchini', 'courgette', 'eggplant',
+            'aubergine', 'bell pepper', 'red pepper', 'green pepper', 'chili', 'jalapeno',
+            'potato', 'sweet potato', 'pumpkin', 'squash', 'butternut squash', 'celery', 'celeriac', 'fennel',
+            'asparagus', 'green bean', 'pea', 'snow pea', 'corn', 'sweetcorn', 'beetroot', 'beet', 'radish',
+            'turnip', 'parsnip', 'mushroom', 'brussels sprout', 'artichoke', 'avocado', 'bok choy', 'okra',
+            'sprout', 'vegetable', 'veggie', 'ginger',
+        ],
+        'de': [
+            'tomate', 'tomaten', 'kirschtomate', 'kirschtomaten', 'salat', 'kopfsalat', 'eisbergsalat',
+            'rucola', 'spinat', 'blattspinat', 'grünkohl', 'mangold', 'kohl', 'weißkohl', 'rotkohl',
+            'gurke', 'gurken', 'karotte', 'karotten', 'möhre', 'möhren', 'zwiebel', 'zwiebeln',
+            'frühlingszwiebel', 'frühlingszwiebeln', 'schalotte', 'schalotten', 'lauch', 'porree',
+            'knoblauch', 'knoblauchzehe', 'knoblauchzehen', 'brokkoli', 'blumenkohl', 'zucchini', 'aubergine',
+            'paprika', 'paprikaschote', 'chilischote', 'kartoffel', 'kartoffeln', 'süßkartoffel',
+            'süßkartoffeln', 'kürbis', 'sellerie', 'staudensellerie', 'fenchel', 'spargel', 'bohnen grün',
+            'grüne bohnen', 'erbsen', 'mais', 'rote bete', 'rettich', 'radieschen', 'pastinake', 'pilze',
+            'champignons', 'rosenkohl', 'artischocke', 'avocado', 'sprossen', 'gemüse', 'ingwer',
+        ],
+    },
+    'fruits': {
+        'en': [
+            'fruit', 'apple', 'banana', 'orange', 'mandarin', 'clementine', 'lemon', 'lime', 'grapefruit',
+            'berry', 'mixed berry', 'strawberry', 'blueberry', 'raspberry', 'blackberry', 'cranberry',
+            'cherry', 'grape', 'pear', 'peach', 'nectarine', 'plum', 'apricot', 'mango', 'pineapple',
+            'kiwi', 'melon', 'watermelon', 'papaya', 'pomegranate', 'fig', 'date', 'raisin',
+            'dried fruit', 'coconut', 'passion fruit',
+        ],
+        'de': [
+            'obst', 'frucht', 'früchte', 'apfel', 'äpfel', 'banane', 'bananen', 'orange', 'orangen',
+            'mandarine', 'mandarinen', 'zitrone', 'zitronen', 'limette', 'limetten', 'beeren', 'erdbeere',
+            'erdbeeren', 'heidelbeere', 'heidelbeeren', 'blaubeeren', 'himbeere', 'himbeeren',
+            'brombeeren', 'preiselbeeren', 'kirsche', 'kirschen', 'traube', 'trauben', 'weintrauben',
+            'birne', 'birnen', 'pfirsich', 'pflaume', 'pflaumen', 'aprikose', 'aprikosen', 'mango',
+            'ananas', 'kiwi', 'melone', 'wassermelone', 'granatapfel', 'feige', 'feigen', 'datteln',
+            'rosinen', 'trockenobst', 'kokosnuss',
+        ],
+    },
+    'grains': {
+        'en': [
+            'oat', 'oatmeal', 'rolled oat', 'porridge', 'granola', 'muesli', 'cereal', 'pasta', 'spaghetti',
+            'penne', 'fusilli', 'macaroni', 'noodle', 'rice noodle', 'lasagna', 'rice', 'brown rice',
+            'basmati', 'jasmine rice', 'risotto rice', 'bread', 'whole grain bread', 'whole wheat bread',
+            'toast', 'baguette', 'roll', 'bagel', 'tortilla', 'wrap', 'pita', 'naan', 'cracker',
+            'quinoa', 'couscous', 'bulgur', 'barley', 'millet', 'buckwheat', 'polenta', 'cornmeal',
+        ],
+        'de': [
+            'hafer', 'haferflocken', 'müsli', 'porridge', 'nudeln', 'pasta', 'spaghetti', 'penne',
+            'reis', 'vollkornreis', 'basmatireis', 'brot', 'vollkornbrot', 'toastbrot', 'brötchen',
+            'baguette', 'knäckebrot', 'tortilla', 'wraps', 'quinoa', 'couscous', 'bulgur', 'gerste',
+            'hirse', 'buchweizen', 'polenta', 'dinkel',
+        ],
+    },
+    'dairy': {
+        'en': [
+            'milk', 'whole milk', 'skim milk', 'oat milk', 'almond milk', 'soy milk', 'coconut milk', 'cheese',
+            'cheddar', 'mozzarella', 'parmesan', 'feta', 'gouda', 'cottage cheese', 'cream cheese', 'ricotta',
+            'halloumi', 'yogurt', 'yoghurt', 'greek yogurt', 'skyr', 'kefir', 'butter', 'cream',
+            'sour cream', 'whipped cream', 'creme fraiche', 'buttermilk', 'ghee',
+        ],
+        'de': [
+            'milch', 'vollmilch', 'hafermilch', 'mandelmilch', 'sojamilch', 'kokosmilch', 'käse', 'bergkäse',
+            'frischkäse', 'hüttenkäse', 'parmesan', 'mozzarella', 'feta', 'gouda', 'joghurt',
+            'naturjoghurt', 'skyr', 'kefir', 'quark', 'magerquark', 'butter', 'sahne', 'schlagsahne',
+            'saure sahne', 'schmand', 'crème fraîche', 'buttermilch', 'molkerei', 'milchprodukte',
+        ],
+    },
+    'pantry': {
+        'en': [
+            'olive oil', 'oil', 'vegetable oil', 'sunflower oil', 'rapeseed oil', 'coconut oil', 'vinegar',
+            'balsamic', 'honey', 'maple syrup', 'syrup', 'sugar', 'brown sugar', 'salt', 'sea salt',
+            'black pepper', 'pepper', 'pepper flake', 'flour', 'baking powder', 'baking soda', 'yeast', 'cornstarch',
+            'basil', 'oregano', 'thyme', 'rosemary', 'parsley', 'cilantro', 'coriander', 'dill', 'mint',
+            'cumin', 'paprika powder', 'curry powder', 'turmeric', 'cinnamon', 'nutmeg', 'vanilla',
+            'herb', 'spice', 'seasoning', 'stock', 'broth', 'bouillon', 'chicken stock', 'chicken broth',
+            'beef stock', 'vegetable stock', 'vegetable broth', 'soy sauce', 'mustard', 'ketchup',
+            'mayonnaise', 'pesto', 'tomato paste', 'tomato sauce', 'passata', 'canned tomato', 'salsa',
+            'peanut butter', 'jam', 'nut', 'almond', 'walnut', 'cashew', 'hazelnut', 'peanut', 'pistachio',
+            'seed', 'chia seed', 'flaxseed', 'sunflower seed', 'pumpkin seed', 'sesame', 'tahini',
+            'chocolate', 'dark chocolate', 'cocoa', 'coffee', 'tea', 'water',
+        ],
+        'de': [
+            'öl', 'olivenöl', 'rapsöl', 'sonnenblumenöl', 'kokosöl', 'speiseöl', 'essig', 'balsamico', 'honig',
+            'ahornsirup', 'sirup', 'zucker', 'salz', 'meersalz', 'pfeffer', 'mehl', 'backpulver', 'hefe',
+            'speisestärke', 'basilikum', 'oregano', 'thymian', 'rosmarin', 'petersilie', 'koriander',
+            'schnittlauch', 'dill', 'minze', 'kreuzkümmel', 'kümmel', 'paprikapulver', 'currypulver',
+            'kurkuma', 'zimt', 'muskat', 'muskatnuss', 'vanille', 'kräuter', 'gewürz', 'gewürze', 'brühe',
+            'gemüsebrühe', 'fond', 'sojasauce', 'senf', 'ketchup', 'mayonnaise', 'pesto', 'tomatenmark',
+            'passierte tomaten', 'marmelade', 'konfitüre', 'erdnussbutter', 'nüsse', 'mandeln',
+            'walnüsse', 'cashewkerne', 'haselnüsse', 'erdnüsse', 'pistazien', 'samen', 'chiasamen',
+            'leinsamen', 'sonnenblumenkerne', 'kürbiskerne', 'sesam', 'schokolade', 'zartbitterschokolade',
+            'kakao', 'kaffee', 'tee', 'kräutertee', 'wasser', 'mineralwasser',
+        ],
+    },
+}
+
+CATEGORIES = list(TAXONOMY)
+OTHER = 'other'
+
+# Dietary labels with their synonyms: the allergens, 'meat' (rules out vegetarian diets) and
+# 'animal' (other animal products that rule out vegan ones). Unlike the shopping categories,
+# German synonyms here also match the start of a compound word ("Lachsfilet" -> "lachs").
+# Synonyms under NO_LABEL carry no label; they only keep the shorter synonyms inside them
+# from matching ("coconut milk" is not dairy, "Buchweizen" not wheat).
+NO_LABEL = ''
+DIETARY = {
+    'gluten': {
+        'en': [
+            'flour', 'wheat', 'bread', 'breadcrumb', 'pasta', 'spaghetti', 'penne', 'fusilli', 'macaroni',
+            'lasagna', 'noodle', 'couscous', 'barley', 'rye', 'bulgur', 'semolina', 'spelt', 'farro', 'seitan',
+            'tortilla', 'wrap', 'pita', 'naan', 'baguette', 'bagel', 'cracker', 'panko', 'croissant',
+        ],
+        'de': [
+            'mehl', 'weizen', 'brot', 'brötchen', 'nudel', 'nudeln', 'spätzle', 'lasagne', 'roggen', 'gerste',
+            'grieß', 'paniermehl', 'semmelbrösel', 'dinkel', 'seitan', 'couscous', 'bulgur',
+        ],
+    },
+    'dairy': {
+        'en': [
+            'milk', 'cheese', 'butter', 'buttermilk', 'cream', 'sour cream', 'yogurt', 'yoghurt', 'parmesan',
+            'mozzarella', 'feta', 'ricotta', 'mascarpone', 'cheddar', 'gouda', 'halloumi', 'kefir', 'skyr',
+            'ghee', 'whey', 'creme fraiche',
+        ],
+        'de': [
+            'milch', 'käse', 'butter', 'sahne', 'rahm', 'joghurt', 'quark', 'schmand', 'molke', 'mascarpone',
+            'crème fraîche',
+        ],
+    },
+    'eggs': {
+        'en': ['egg', 'egg white', 'egg yolk', 'mayonnaise', 'meringue'],
+        'de': ['ei', 'eier', 'eigelb', 'eiweiß', 'mayonnaise'],
+    },
+    'nuts': {
+        'en': [
+            'nut', 'almond', 'almond milk', 'almond flour', 'walnut', 'hazelnut', 'cashew', 'pecan', 'pistachio',
+            'macadamia', 'brazil nut', 'pine nut',
+        ],
+        'de': [
+            'nuss', 'nüsse', 'mandel', 'mandeln', 'mandelmilch', 'walnuss', 'walnüsse', 'haselnuss', 'haselnüsse',
+            'cashew', 'cashewkerne', 'pistazie', 'pistazien', 'pinienkerne', 'macadamia',
+        ],
+    },
+    'peanuts': {
+        'en': ['peanut', 'peanut butter'],
+        'de': ['erdnuss', 'erdnüsse', 'erdnussbutter'],
+    },
+    'soy': {
+        'en': ['soy', 'soya', 'soybean', 'soy sauce', 'soy milk', 'soy yogurt', 'tofu', 'tempeh', 'edamame', 'miso'],
+        'de': ['soja', 'sojasauce', 'sojamilch', 'sojajoghurt', 'sojasahne', 'tofu', 'tempeh'],
+    },
+    'fish': {
+        'en': [
+            'fish', 'fish sauce', 'salmon', 'tuna', 'cod', 'trout', 'mackerel', 'herring', 'sardine', 'anchovy',
+            'pollock', 'tilapia', 'haddock', 'halibut', 'worcestershire sauce',
+        ],
+        'de': [
+            'fisch', 'lachs', 'thunfisch', 'kabeljau', 'forelle', 'makrele', 'hering', 'sardine', 'sardellen',
+            'seelachs', 'scholle', 'dorsch',
+        ],
+    },
+    'shellfish': {
+        'en': ['shellfish', 'shrimp', 'prawn', 'crab', 'lobster', 'mussel', 'oyster', 'scallop', 'clam', 'squid'],
+        'de': ['garnele', 'garnelen', 'krabbe', 'krabben', 'hummer', 'muschel', 'muscheln', 'austern',
+               'tintenfisch', 'meeresfrüchte'],
+    },
+    'sesame': {
+        'en': ['sesame', 'tahini'],
+        'de': ['sesam'],
+    },
+    'meat': {
+        'en': [
+            'meat', 'minced meat', 'mince', 'chicken', 'beef', 'pork', 'lamb', 'mutton', 'veal', 'turkey', 'duck',
+            'goose', 'venison', 'rabbit', 'bacon', 'ham', 'prosciutto', 'pancetta', 'sausage', 'salami',
+            'chorizo', 'pepperoni', 'steak', 'meatball', 'burger patty', 'hot dog', 'gelatin', 'gelatine', 'lard',
+            'stock cube',
+        ],
+        'de': [
+            'fleisch', 'hähnchen', 'hühnchen', 'huhn', 'hühner', 'pute', 'puten', 'rind', 'rinder', 'kalb',
+            'schwein', 'schweine', 'lamm', 'ente', 'enten', 'gans', 'hack', 'hackfleisch', 'speck', 'schinken',
+            'wurst', 'würstchen', 'salami', 'chorizo', 'steak', 'schnitzel', 'frikadelle', 'kassler', 'gelatine',
+            'schmalz',
+        ],
+    },
+    'animal': {
+        'en': ['honey'],
+        'de': ['honig'],
+    },
+    NO_LABEL: {
+        'en': [
+            'coconut milk', 'coconut cream', 'oat milk', 'rice milk', 'cocoa butter', 'cream of tartar',
+            'butternut', 'butternut squash', 'rice flour', 'corn flour', 'cornflour', 'coconut flour',
+            'chickpea flour', 'rice noodle', 'glass noodle', 'gluten free pasta', 'gluten free bread',
+            'gluten free flour', 'coconut yogurt', 'nutmeg', 'eggplant',
+        ],
+        'de': [
+            'kokosmilch', 'kokosjoghurt', 'hafermilch', 'hafersahne', 'reismilch', 'kakaobutter', 'buchweizen',
+            'buchweizenmehl', 'reismehl', 'maismehl', 'kichererbsenmehl', 'reisnudeln', 'glasnudeln',
+            'glutenfreie nudeln', 'glutenfreies brot', 'glutenfreies mehl', 'kokosnuss', 'muskatnuss', 'honigmelone',
+        ],
+    },
+}
+
+# Rough price per unit used when no store price is known
+ESTIMATED_PRICES = {
+    'proteins': 3.50,
+    'vegetables': 1.20,
+    'fruits': 2.00,
+    'grains': 1.50,
+    'dairy': 2.50,
+    'pantry': 1.00,
+    OTHER: 1.50,
+}
+
+# German synonyms at least this long also match as the last part of a compound word
+COMPOUND_MIN_LENGTH = 4
+
+MEMO_SIZE = 65536
+
+# Separates ingredient lines scanned together; never part of a pattern
+_LINE_BREAK = '\n'
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+def _singular(word: str) -> str:
+    """Fold common English plurals ("berries" -> "berry", "tomatoes" -> "tomato"); short words stay."""
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize(ingredient: str) -> str:
+    """Ingredient line as lowercase singular words without quantities or punctuation ("2 Cherry Tomatoes," -> "cherry tomato")."""
+    return ' '.join(_singular(word) for word in _WORD.findall(ingredient.lower()))
+
+
+class _Automaton:
+    """Aho-Corasick automaton over the padded, normalized synonyms.
+
+    Whole-word synonyms are stored as " word " and compound heads as "word ",
+    so word boundaries are part of the patterns and one left-to-right scan
+    finds every match.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Per state: (pattern length, category) of the longest pattern ending there
+        self.output: List[Optional[Tuple[int, str]]] = [None]
+
+        for pattern, category in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] = (len(pattern), category)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                # Shorter patterns that end here too are reachable through the fail link
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def scan(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every (start, end, category) match in ``text``, longest per end position."""
+        matches = []
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state] is not None:
+                length, category = self.output[state]
+                matches.append((end - length, end, category))
+        return matches
+
+
+def _patterns(taxonomy: Dict[str, Dict[str, List[str]]], prefixes: bool = False) -> Dict[str, str]:
+    """Padded patterns -> label; German words also as compound heads, and with ``prefixes`` as compound starts."""
+    patterns = {}
+    for category, synonyms in taxonomy.items():
+        for language, words in synonyms.items():
+            for word in words:
+                word = normalize(word)
+                patterns[f" {word} "] = category
+                if language == 'de' and len(word) >= COMPOUND_MIN_LENGTH and ' ' not in word:
+                    patterns.setdefault(f"{word} ", category)
+                    if prefixes:
+                        patterns.setdefault(f" {word}", category)
+    return patterns
+
+
+_AUTOMATON = _Automaton(_patterns(TAXONOMY))
+_DIETARY_AUTOMATON = _Automaton(_patterns(DIETARY, prefixes=True))
+# Normalized ingredient line -> category or dietary labels; cleared when they reach MEMO_SIZE entries
+_MEMO: Dict[str, str] = {}
+_DIETARY_MEMO: Dict[str, Set[str]] = {}
+
+
+def _best(matches: Iterable[Tuple[int, int, str]]) -> str:
+    """Category of the longest match, the rightmost one on a tie."""
+    best = max(matches, key=lambda match: (match[1] - match[0], match[1]), default=None)
+    return best[2] if best else OTHER
+
+
+def _remember(text: str, category: str) -> str:
+    if len(_MEMO) >= MEMO_SIZE:
+        _MEMO.clear()
+    _MEMO[text] = category
+    return category
+
+
+def categorize(ingredient: str) -> str:
+    """Shopping category of one ingredient line, or 'other'."""
+    text = normalize(ingredient)
+    if text in _MEMO:
+        return _MEMO[text]
+    return _remember(text, _best(_AUTOMATON.scan(f" {text} ")))
+
+
+def categorize_many(ingredients: Iterable[str]) -> Dict[str, str]:
+    """Category of every ingredient line; the lines not seen before are scanned together in one pass."""
+    normalized = {ingredient: normalize(ingredient) for ingredient in ingredients}
+    unseen = sorted(set(normalized.values()) - _MEMO.keys())
+    if unseen:
+        starts = []
+        offset = 0
+        for line in unseen:
+            starts.append(offset)
+            offset += len(line) + 3
+        per_line: Dict[int, List[Tuple[int, int, str]]] = {}
+        for match in _AUTOMATON.scan(_LINE_BREAK.join(f" {line} " for line in unseen)):
+            per_line.setdefault(bisect_right(starts, match[0]) - 1, []).append(match)
+        for index, line in enumerate(unseen):
+            _remember(line, _best(per_line.get(index, ())))
+    return {
+        ingredient: _MEMO[text] if text in _MEMO else categorize(ingredient)
+        for ingredient, text in normalized.items()
+    }
+
+
+def _outermost(matches: List[Tuple[int, int, str]]) -> Set[str]:
+    """Labels of the matches that are not inside a longer match."""
+    return {
+        label for start, end, label in matches
+        if not any(other_start <= start and end <= other_end and (other_start, other_end) != (start, end)
+                   for other_start, other_end, _ in matches)
+    }
+
+
+def categories(text: str) -> Set[str]:
+    """Every category mentioned in a free text such as a coupon description, ignoring matches inside longer ones."""
+    return _outermost(_AUTOMATON.scan(f" {normalize(text)} "))
+
+
+def dietary_labels(ingredient: str) -> Set[str]:
+    """Dietary labels (see DIETARY) of one ingredient line, e.g. {'gluten'} for "500 g Weizenmehl"."""
+    text = normalize(ingredient)
+    labels = _DIETARY_MEMO.get(text)
+    if labels is None:
+        labels = _outermost(_DIETARY_AUTOMATON.scan(f" {text} ")) - {NO_LABEL}
+        if len(_DIETARY_MEMO) >= MEMO_SIZE:
+            _DIETARY_MEMO.clear()
+        _DIETARY_MEMO[text] = labels
+    return set(labels)
@@ -0,0 +1,483 @@
+"""Meal plan generation helpers shared by the report tools.
+
+``stream_meal_plan`` reads the chat model's token stream through
+:class:`DayStreamParser`, which hands out each day of the plan as soon as
+its closing brace arrives, so the UI can show Monday while the model is
+still writing Tuesday.
+
+``generate_week`` instead fixes the weekly constraints in one small
+planning call and then generates the days concurrently. Each finished day
+gets a deterministic check against the days accepted so far (calorie
+target, daily budget, no repeated meals): it is either accepted and shown
+right away, or sent back for regeneration with the meals already claimed.
+The model only writes ingredient quantities; calories and nutrients come
+from the offline food database (see ``brocc_li.food_db``).
+
+Days are validated one by one against ``PlanDaySchema``; ``salvage_meal_plan``
+keeps the valid ones and asks the model to repair only the invalid or
+missing days.
+"""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from brocc_li.food_db import fill_nutrition
+from brocc_li.nutrition import plan_array
+from brocc_li.schemas import MealPlanSchema, PlanDaySchema
+
+# Keys of the top-level object whose array holds the days
+DAY_ARRAY_KEYS = ('meal_plan', 'days')
+MEAL_ORDER = ('breakfast', 'lunch', 'dinner', 'snacks')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+DEFAULT_DAILY_CALORIES = 2000
+# A day may miss its calorie target or exceed its budget by this fraction before it is regenerated
+CALORIE_TOLERANCE = 0.15
+BUDGET_TOLERANCE = 0.15
+
+DAY_FORMAT = """{
+    "day": "Monday",
+    "meals": {
+        "breakfast": {
+            "name": "meal name",
+            "ingredients": ["60 g oats", "200 ml milk", "1 banana"],
+            "cost": 2.50,
+            "prep_time": "10 minutes"
+        },
+        "lunch": {...},
+        "dinner": {...},
+        "snacks": [{...}]
+    },
+    "total_cost": 12.50
+}
+
+Give every ingredient with its quantity (grams, ml or pieces); nutrition is computed from the quantities."""
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+class DayStreamParser:
+    """Incremental scanner for a streamed meal plan JSON document.
+
+    Accepts ``{"meal_plan": [{day}, ...]}`` or a bare ``[{day}, ...]``, with
+    any prose or markdown fence around it. Each character is looked at once;
+    a day's text is only parsed when its object closes.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.days: List[Dict[str, Any]] = []
+        # Day objects that closed but were not valid JSON
+        self.invalid: List[str] = []
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._last_string: Optional[str] = None
+        self._days_depth: Optional[int] = None
+        self._day_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add streamed text; returns the days completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                continue
+            if self.done:
+                break
+
+            if char == '"' and self._stack:
+                self._in_string = True
+                self._string_start = i
+            elif char in '{[':
+                depth = len(self._stack)
+                if self._days_depth is None and char == '[' and (
+                    depth == 0 or (depth == 1 and self._last_string in DAY_ARRAY_KEYS)
+                ):
+                    self._days_depth = depth + 1
+                elif char == '{' and depth == self._days_depth:
+                    self._day_start = i
+                self._stack.append(char)
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                depth = len(self._stack)
+                if char == '}' and depth == self._days_depth and self._day_start is not None:
+                    fragment = text[self._day_start:i + 1]
+                    self._day_start = None
+                    try:
+                        day = json.loads(fragment)
+                    except json.JSONDecodeError:
+                        self.invalid.append(fragment)
+                    else:
+                        self.days.append(day)
+                        completed.append(day)
+                elif char == ']' and self._days_depth is not None and depth == self._days_depth - 1:
+                    self.done = True
+        self._pos = len(text)
+        return completed
+
+
+def chunk_text(content: Any) -> str:
+    """Text of a chat model message or chunk ``content`` (a string or a list of parts)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return ''.join(
+            part if isinstance(part, str) else str(part.get('text', '')) if isinstance(part, dict) else ''
+            for part in content
+        )
+    return str(content or '')
+
+
+def day_index(day: Dict[str, Any], days: Tuple[str, ...] = WEEKDAYS) -> int:
+    """Position of ``day`` in ``days`` by its name, or ``len(days)`` if it names none of them."""
+    order = [name.lower() for name in days]
+    name = str(day.get('day', '')).strip().lower()
+    return order.index(name) if name in order else len(order)
+
+
+def stream_meal_plan(llm, prompt: str,
+                     on_day: Optional[Callable[[Dict[str, Any], int], None]] = None) -> DayStreamParser:
+    """Generate a meal plan from ``llm``'s token stream, calling ``on_day(day, index)`` as each day completes.
+
+    Only days that pass ``PlanDaySchema`` are shown; ``index`` is the day's
+    position in the week. Returns the parser, which holds the parsed days,
+    the day fragments that were not valid JSON and the full response text.
+    """
+    parser = DayStreamParser()
+    for chunk in llm.stream(prompt):
+        for day in parser.feed(chunk_text(chunk.content)):
+            if on_day is None:
+                continue
+            try:
+                day = PlanDaySchema.model_validate(day).model_dump(exclude_none=True)
+            except ValidationError:
+                # Left to salvage_meal_plan, which repairs it before it is shown
+                continue
+            on_day(day, day_index(day))
+    return parser
+
+
+def day_markdown(day: Dict[str, Any]) -> str:
+    """Short markdown summary of one plan day for progressive display."""
+    lines = [f"**{day.get('day', 'Day')}**"]
+    meals = day.get('meals') if isinstance(day.get('meals'), dict) else {}
+    for meal_type in sorted(meals, key=lambda meal: MEAL_ORDER.index(meal) if meal in MEAL_ORDER else len(MEAL_ORDER)):
+        items = meals[meal_type] if isinstance(meals[meal_type], list) else [meals[meal_type]]
+        names = ', '.join(str(item.get('name', '')) for item in items if isinstance(item, dict) and item.get('name'))
+        if names:
+            lines.append(f"- {meal_type.title()}: {names}")
+    totals = day.get('total_nutrition') if isinstance(day.get('total_nutrition'), dict) else {}
+    if totals.get('calories') is not None:
+        lines.append(f"- {totals['calories']} kcal, {totals.get('protein', '?')} g protein")
+    return '\n'.join(lines)
+
+
+def extract_json(content: Any) -> Any:
+    """JSON value in a model response, ignoring markdown fences and prose around it."""
+    text = chunk_text(content).strip()
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise json.JSONDecodeError("no JSON value", text, 0)
+    value, _ = json.JSONDecoder().raw_decode(text[min(starts):])
+    return value
+
+
+def plan_week(llm, preferences: Dict[str, Any], days: Tuple[str, ...] = WEEKDAYS) -> Dict[str, Any]:
+    """Weekly constraints from one small planning call: calorie target, budget per day and a theme per day.
+
+    Missing or unreadable values fall back to the preferences themselves, so
+    the per-day calls always get a complete plan.
+    """
+    prompt = f"""
+    Plan the constraints of a {len(days)}-day meal plan for a user with these preferences: {preferences}
+
+    Return ONLY a JSON object:
+    {{
+        "daily_calories": 2000,
+        "daily_budget": 12.50,
+        "days": [{{"day": "Monday", "main_protein": "chicken", "cuisine": "Mediterranean"}}]
+    }}
+
+    daily_budget is in euros and null if the user has no budget. Give every day
+    ({', '.join(days)}) a different main protein or cuisine so that no meal repeats.
+    """
+    try:
+        week = extract_json(llm.invoke(prompt).content)
+    except (json.JSONDecodeError, ValueError):
+        week = {}
+    if not isinstance(week, dict):
+        week = {}
+
+    themes = {
+        str(theme.get('day')): theme for theme in week.get('days') or []
+        if isinstance(theme, dict)
+    }
+    daily_calories = _positive(week.get('daily_calories')) or _positive(preferences.get('calories'))
+    return {
+        'daily_calories': daily_calories or DEFAULT_DAILY_CALORIES,
+        'daily_budget': _positive(week.get('daily_budget')),
+        'days': [{**themes.get(day, {}), 'day': day} for day in days],
+    }
+
+
+def _positive(value: Any) -> Optional[float]:
+    try:
+        number = float(str(value).replace(',', '.')) if value is not None else None
+    except ValueError:
+        return None
+    return number if number and number > 0 else None
+
+
+def generate_day(llm, preferences: Dict[str, Any], week: Dict[str, Any], day: str,
+                 problems: Optional[List[str]] = None, avoid: Optional[List[str]] = None) -> Dict[str, Any]:
+    """One day of the plan; ``problems`` and ``avoid`` are fed back when a day is regenerated."""
+    theme = next((theme for theme in week['days'] if theme['day'] == day), {'day': day})
+    budget = f"Keep the total cost at or below {week['daily_budget']:.2f} EUR." if week.get('daily_budget') else ""
+    feedback = ""
+    if problems:
+        feedback += "The previous version of this day was rejected: " + "; ".join(problems) + "."
+    if avoid:
+        feedback += f" Do not use these meals, they are on other days: {', '.join(avoid)}."
+    prompt = f"""
+    Create the meal plan for {day} for a user with these preferences: {preferences}
+
+    Day theme: {json.dumps({key: value for key, value in theme.items() if key != 'day'})}
+    Aim for about {week['daily_calories']:.0f} kcal in total. {budget}
+    {feedback}
+
+    Return a JSON object with this structure:
+    {DAY_FORMAT}
+
+    Ensure the day meets the user's dietary restrictions, budget, and cooking time constraints.
+    """
+    parsed, raw = invoke_structured(llm, PlanDaySchema, prompt)
+    if parsed is None:
+        if isinstance(raw, dict) and isinstance(raw.get('meal_plan'), list) and raw['meal_plan']:
+            raw = raw['meal_plan'][0]
+        parsed = PlanDaySchema.model_validate({**raw, 'day': day} if isinstance(raw, dict) else raw)
+    return {**parsed.model_dump(exclude_none=True), 'day': day}
+
+
+def _meal_names(day: Dict[str, Any]) -> List[str]:
+    meals = day.get('meals') if isinstance(day.get('meals'), dict) else {}
+    return [
+        str(meal['name']).strip().lower() for meal_type, meal in meals.items()
+        if meal_type != 'snacks' and isinstance(meal, dict) and meal.get('name')
+    ]
+
+
+def check_day(day: Dict[str, Any], week: Dict[str, Any], claimed: Dict[str, str]) -> List[str]:
+    """Weekly rules ``day`` breaks; ``claimed`` maps the meals of the days accepted so far to their day."""
+    problems = []
+    calories = plan_array(fill_nutrition([day])).sum(axis=1)[0, 0]
+    target = week['daily_calories']
+    if abs(calories - target) > CALORIE_TOLERANCE * target:
+        problems.append(f"it has {calories:.0f} kcal instead of about {target:.0f}")
+    cost = _positive(day.get('total_cost'))
+    if week.get('daily_budget') and cost and cost > week['daily_budget'] * (1 + BUDGET_TOLERANCE):
+        problems.append(f"it costs {cost:.2f} EUR, over the daily budget of {week['daily_budget']:.2f}")
+    for name in _meal_names(day):
+        if name in claimed:
+            problems.append(f"'{name}' is already served on {claimed[name]}")
+    return problems
+
+
+def generate_week(llm, preferences: Dict[str, Any], days: Tuple[str, ...] = WEEKDAYS,
+                  max_concurrency: int = 4, max_rounds: int = 2,
+                  on_day: Optional[Callable[[Dict[str, Any], int], None]] = None) -> List[Dict[str, Any]]:
+    """Plan the week, generate its days concurrently and regenerate only the days that break a weekly rule.
+
+    A day is accepted as soon as it passes :func:`check_day` against the
+    days accepted before it, and ``on_day(day, index)`` is called for it
+    then. Rejected days are regenerated concurrently, told to avoid every
+    claimed meal; one of them that repeats a meal accepted earlier in the
+    same round goes to the next round. After ``max_rounds`` regeneration
+    rounds the remaining days are accepted with their violations; days that
+    never generated are left out.
+    """
+    week = plan_week(llm, preferences, days)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(days)
+    claimed: Dict[str, str] = {}
+    # Latest version of each rejected day and the rules it breaks
+    rejected: Dict[int, Tuple[Optional[Dict[str, Any]], List[str]]] = {}
+
+    def generate(index: int, problems: Optional[List[str]] = None,
+                 avoid: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return generate_day(llm, preferences, week, days[index], problems, avoid)
+        except Exception:
+            return None
+
+    def accept(index: int, day: Dict[str, Any]) -> None:
+        results[index] = day
+        for name in _meal_names(day):
+            claimed.setdefault(name, day['day'])
+        if on_day is not None:
+            on_day(day, index)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="brocc-li-plan") as executor:
+        pending = {executor.submit(generate, index): index for index in range(len(days))}
+        for round_number in range(max_rounds + 1):
+            for future in as_completed(pending):
+                index = pending[future]
+                day = future.result()
+                if day is None:
+                    # A regenerated day that failed keeps the previous version
+                    rejected.setdefault(index, (None, ["the day could not be generated"]))
+                    continue
+                problems = check_day(day, week, claimed)
+                if problems:
+                    rejected[index] = (day, problems)
+                else:
+                    rejected.pop(index, None)
+                    accept(index, day)
+            if not rejected or round_number == max_rounds:
+                break
+            avoid = sorted(claimed)
+            pending = {
+                executor.submit(generate, index, problems, avoid): index
+                for index, (_, problems) in rejected.items()
+            }
+
+    for index, (day, _) in sorted(rejected.items()):
+        if day is not None:
+            accept(index, day)
+    return [day for day in results if day is not None]
+
+
+def invoke_structured(llm, schema: type, prompt: str) -> Tuple[Optional[BaseModel], Any]:
+    """Call ``llm`` in structured-output mode for ``schema``.
+
+    Returns ``(validated object, None)``, or ``(None, raw value)`` with the
+    JSON the model produced when it does not validate, so that callers can
+    salvage the valid parts.
+    """
+    result = llm.with_structured_output(schema, include_raw=True).invoke(prompt)
+    if result.get('parsed') is not None:
+        return result['parsed'], None
+    raw = result.get('raw')
+    tool_calls = getattr(raw, 'tool_calls', None)
+    if tool_calls:
+        return None, tool_calls[0].get('args')
+    try:
+        return None, extract_json(getattr(raw, 'content', ''))
+    except ValueError:
+        return None, None
+
+
+def _errors(error: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'day'}: {item['msg']}" for item in error.errors()[:5]
+    )
+
+
+def validate_days(value: Any) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Any, str]]]:
+    """Split a meal plan into valid days and ``(day name, fragment, problems)`` of the invalid ones.
+
+    ``value`` is a ``{"meal_plan": [...]}`` object or a list of days; a day
+    may also be a JSON fragment string that did not parse.
+    """
+    if isinstance(value, dict):
+        value = value.get('meal_plan', value.get('days'))
+    valid, invalid = [], []
+    for i, item in enumerate(value if isinstance(value, list) else []):
+        if isinstance(item, str):
+            try:
+                item = json.loads(item)
+            except json.JSONDecodeError as e:
+                match = re.search(r'"day"\s*:\s*"([^"]+)"', item)
+                invalid.append((match.group(1) if match else f"Day {i + 1}", item, f"invalid JSON: {e.msg}"))
+                continue
+        name = str(item.get('day') or f"Day {i + 1}") if isinstance(item, dict) else f"Day {i + 1}"
+        try:
+            valid.append(PlanDaySchema.model_validate(item).model_dump(exclude_none=True))
+        except ValidationError as e:
+            invalid.append((name, item, _errors(e)))
+    return valid, invalid
+
+
+def repair_days(llm, preferences: Dict[str, Any], invalid: List[Tuple[str, Any, str]],
+                missing: List[str], keep: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One structured call that fixes only the invalid days and writes the missing ones."""
+    fragments = "\n".join(
+        f"- {name}: {fragment if isinstance(fragment, str) else json.dumps(fragment)}\n  Problems: {problems}"
+        for name, fragment, problems in invalid
+    )
+    prompt = f"""
+    These days of a meal plan for a user with these preferences are broken: {preferences}
+
+    {fragments or "(none)"}
+
+    Missing days that still need to be written: {', '.join(missing) or "(none)"}
+    Meals already used on the other days: {', '.join(sorted({name for day in keep for name in _meal_names(day)})) or "(none)"}
+
+    Return a JSON object {{"meal_plan": [...]}} with ONLY the repaired and missing days, each with this structure:
+    {DAY_FORMAT}
+    """
+    parsed, raw = invoke_structured(llm, MealPlanSchema, prompt)
+    if parsed is not None:
+        return [day.model_dump(exclude_none=True) for day in parsed.meal_plan]
+    return validate_days(raw)[0]
+
+
+def salvage_meal_plan(llm, preferences: Dict[str, Any], value: Any, days: Tuple[str, ...] = WEEKDAYS,
+                      on_day: Optional[Callable[[Dict[str, Any], int], None]] = None) -> List[Dict[str, Any]]:
+    """Keep the valid days of ``value`` and repair only the invalid or missing ones with one more call.
+
+    Raises ValueError if no valid day is left after the repair.
+    """
+    valid, invalid = validate_days(value)
+    present = {str(day['day']).lower() for day in valid} | {name.lower() for name, _, _ in invalid}
+    missing = [day for day in days if day.lower() not in present] if len(present) < len(days) else []
+
+    if invalid or missing:
+        try:
+            repaired = repair_days(llm, preferences, invalid, missing, valid)
+        except Exception:
+            repaired = []
+        for day in repaired:
+            if on_day is not None:
+                on_day(day, day_index(day, days))
+            valid.append(day)
+
+    order = {day.lower(): i for i, day in enumerate(days)}
+    merged: Dict[str, Dict[str, Any]] = {}
+    for day in valid:
+        merged[str(day['day']).lower()] = day
+    if not merged:
+        raise ValueError("The meal plan could not be generated")
+    return sorted(merged.values(), key=lambda day: order.get(str(day['day']).lower(), len(order)))
+
+
+def generate_meal_plan(llm, prompt: str, preferences: Dict[str, Any],
+                       on_day: Optional[Callable[[Dict[str, Any], int], None]] = None) -> List[Dict[str, Any]]:
+    """Whole plan from one structured-output call, salvaged day by day if it does not validate."""
+    parsed, raw = invoke_structured(llm, MealPlanSchema, prompt)
+    if parsed is None:
+        days = salvage_meal_plan(llm, preferences, raw)
+    else:
+        days = [day.model_dump(exclude_none=True) for day in parsed.meal_plan]
+    if on_day is not None:
+        for day in days:
+            on_day(day, day_index(day))
+    return days
@@ -0,0 +1,174 @@
+"""Nutrition aggregation over meal plans as dense NumPy arrays.
+
+A plan becomes a ``days x meals x nutrients`` array in one pass over its
+dicts; totals, averages and goal deviations are then array reductions, and
+a batch of plans is one ``plans x days x meals x nutrients`` array with a
+day count per plan, so plans of different lengths are averaged correctly.
+"""
+
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+# 'other' holds day-level nutrition (``total_nutrition``) that no meal accounts for
+MEALS = ('breakfast', 'lunch', 'dinner', 'snacks', 'other')
+
+_NUTRIENT_INDEX = {nutrient: i for i, nutrient in enumerate(NUTRIENTS)}
+_MEAL_INDEX = {meal: i for i, meal in enumerate(MEALS)}
+_MEAL_INDEX.update({'snack': _MEAL_INDEX['snacks'], 'dessert': _MEAL_INDEX['snacks']})
+_OTHER = _MEAL_INDEX['other']
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def to_number(value: Any) -> float:
+    """Numeric value of a nutrition entry (300, "300", "15 g", "1,5"); 0 if there is none."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.search(str(value)) if value is not None else None
+    return float(match.group().replace(',', '.')) if match else 0.0
+
+
+def _build(plans: Sequence[Sequence[Mapping[str, Any]]], max_days: int) -> np.ndarray:
+    """``plans x days x meals x nutrients`` array; the dicts are walked once, the array is filled in bulk."""
+    meals_n, nutrients_n = len(MEALS), len(NUTRIENTS)
+    meal_index: List[int] = []      # flat positions in the plans x days x meals x nutrients array
+    meal_values: List[float] = []
+    day_index: List[int] = []       # flat positions in a plans x days x nutrients array
+    day_values: List[float] = []
+
+    def add(index: List[int], values: List[float], base: int, nutrition: Any) -> None:
+        if not isinstance(nutrition, dict):
+            return
+        for nutrient, value in nutrition.items():
+            position = _NUTRIENT_INDEX.get(nutrient)
+            if position is None:
+                position = _NUTRIENT_INDEX.get(str(nutrient).lower())
+                if position is None:
+                    continue
+            index.append(base + position)
+            values.append(value if type(value) in (int, float) else to_number(value))
+
+    for p, meal_plan in enumerate(plans):
+        for day, plan_day in enumerate(meal_plan):
+            if not isinstance(plan_day, dict):
+                continue
+            day_base = p * max_days + day
+            meals = plan_day.get('meals') or {}
+            for meal_type, meal in (meals.items() if isinstance(meals, dict) else ()):
+                base = (day_base * meals_n + _MEAL_INDEX.get(str(meal_type).lower(), _OTHER)) * nutrients_n
+                # Snacks come as a list of meals
+                for item in (meal if isinstance(meal, list) else [meal]):
+                    if isinstance(item, dict):
+                        add(meal_index, meal_values, base, item.get('nutrition'))
+            add(day_index, day_values, day_base * nutrients_n, plan_day.get('total_nutrition'))
+
+    shape = (len(plans), max_days, meals_n, nutrients_n)
+    size = int(np.prod(shape))
+    out = np.bincount(np.asarray(meal_index, dtype=np.intp), np.asarray(meal_values), minlength=size).reshape(shape)
+    reported = np.bincount(
+        np.asarray(day_index, dtype=np.intp), np.asarray(day_values), minlength=size // meals_n
+    ).reshape(shape[0], shape[1], nutrients_n)
+    out[:, :, _OTHER] += np.maximum(reported - out.sum(axis=2), 0)
+    return out
+
+
+def plan_array(meal_plan: Sequence[Mapping[str, Any]]) -> np.ndarray:
+    """``days x meals x nutrients`` array of a meal plan (axes ordered as days, MEALS, NUTRIENTS)."""
+    return _build([meal_plan], len(meal_plan))[0]
+
+
+def batch_array(plans: Sequence[Sequence[Mapping[str, Any]]]) -> np.ndarray:
+    """``plans x days x meals x nutrients`` array, zero-padded to the longest plan."""
+    return _build(plans, max((len(plan) for plan in plans), default=0))
+
+
+def goal_vector(goals: Optional[Mapping[str, Any]]) -> np.ndarray:
+    """Daily goals per nutrient; NaN where there is no goal."""
+    vector = np.full(len(NUTRIENTS), np.nan)
+    for nutrient, value in (goals or {}).items():
+        index = _NUTRIENT_INDEX.get(str(nutrient).lower())
+        if index is not None and value not in (None, ''):
+            vector[index] = to_number(value) or np.nan
+    return vector
+
+
+def aggregate_batch(array: np.ndarray, days: Optional[np.ndarray] = None,
+                    goals: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """Totals, averages and goal deviations of every plan in a ``batch_array``.
+
+    ``days`` is the real length of each plan (defaults to the padded length).
+    Returned arrays are indexed ``[plan, ...]`` with the nutrient axis last.
+    """
+    if days is None:
+        days = np.full(array.shape[0], array.shape[1])
+    per_plan_days = np.maximum(np.asarray(days, dtype=float), 1)[:, None]
+
+    daily = array.sum(axis=2)                      # plans x days x nutrients
+    totals = daily.sum(axis=1)                     # plans x nutrients
+    daily_average = totals / per_plan_days
+    meal_average = array.sum(axis=1) / per_plan_days[:, :, None]  # plans x meals x nutrients
+
+    goal = goal_vector(goals)
+    deviation = daily_average - goal               # NaN where there is no goal
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation_percent = 100 * deviation / goal
+    # Days past a plan's end are padding, not missed goals
+    in_plan = np.arange(array.shape[1])[None, :] < np.asarray(days)[:, None]
+    daily_deviation = np.where(in_plan[:, :, None], daily - goal, np.nan)
+
+    return {
+        'days': np.asarray(days),
+        'daily': daily,
+        'totals': totals,
+        'daily_average': daily_average,
+        'meal_average': meal_average,
+        'goal_deviation': deviation,
+        'goal_deviation_percent': deviation_percent,
+        'daily_goal_deviation': daily_deviation,
+    }
+
+
+def _by_nutrient(values: np.ndarray) -> Dict[str, Optional[float]]:
+    return {
+        nutrient: None if np.isnan(value) else round(float(value), 2)
+        for nutrient, value in zip(NUTRIENTS, values)
+    }
+
+
+def summarize(meal_plan: Sequence[Mapping[str, Any]], goals: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """JSON-ready nutrition summary of one meal plan: per day, per meal, totals, averages and goal deviations."""
+    result = aggregate_batch(plan_array(meal_plan)[None], np.array([len(meal_plan)]), goals)
+    summary: Dict[str, Any] = {
+        'days': len(meal_plan),
+        'daily': [
+            {
+                'day': plan_day.get('day', f"Day {i + 1}") if isinstance(plan_day, dict) else f"Day {i + 1}",
+                'nutrition': _by_nutrient(result['daily'][0, i]),
+            }
+            for i, plan_day in enumerate(meal_plan)
+        ],
+        'totals': _by_nutrient(result['totals'][0]),
+        'daily_average': _by_nutrient(result['daily_average'][0]),
+        'meal_average': {
+            meal: _by_nutrient(values) for meal, values in zip(MEALS, result['meal_average'][0])
+            if values.any()
+        },
+    }
+    if goals:
+        summary['goal_deviation'] = {
+            nutrient: value for nutrient, value in _by_nutrient(result['goal_deviation'][0]).items()
+            if value is not None
+        }
+        summary['goal_deviation_percent'] = {
+            nutrient: value for nutrient, value in _by_nutrient(result['goal_deviation_percent'][0]).items()
+            if value is not None
+        }
+    return summary
+
+
+def summarize_batch(plans: List[Sequence[Mapping[str, Any]]],
+                    goals: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """Aggregate many plans at once; see :func:`aggregate_batch` for the returned arrays."""
+    return aggregate_batch(batch_array(plans), np.array([len(plan) for plan in plans]), goals)
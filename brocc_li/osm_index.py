@@ -0,0 +1,302 @@
+"""Offline store index built from a local OpenStreetMap extract.
+
+Build it once per region, e.g. from an Overpass JSON dump or a PBF file:
+
+    python -m brocc_li.osm_index build berlin.json bonn.osm.pbf --output .cache/brocc_li/osm_index
+
+and point BROCC_LI_OSM_INDEX at the output directory. FreeMapServices then
+answers store and place lookups inside the indexed regions without any
+network access.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from brocc_li.geo import haversine_km, nearest_k, radius_bbox
+
+try:
+    import osmium
+    OSMIUM_AVAILABLE = True
+except ImportError:
+    OSMIUM_AVAILABLE = False
+    osmium = None
+
+# Shops that count as grocery stores, same as the Overpass queries
+STORE_SHOPS = {'supermarket', 'convenience'}
+
+# Place nodes kept as a small gazetteer for offline geocoding
+PLACE_TYPES = {'city', 'town', 'village', 'suburb', 'borough', 'quarter', 'neighbourhood'}
+# Every place is filed under the nearest of these, so "Mitte, Berlin" can be told from "Mitte, Hamburg"
+CITY_TYPES = {'city', 'town'}
+# Tags naming the areas a place lies in, besides its nearest city
+AREA_TAGS = ('is_in', 'is_in:city', 'is_in:municipality', 'is_in:state', 'is_in:region', 'is_in:country',
+             'addr:city', 'addr:state', 'addr:country')
+# Country names accepted after any indexed place ("Berlin, Germany"); the store chains are German
+HOME_COUNTRY = {'germany', 'deutschland', 'de'}
+
+TEXT_COLUMNS = ['name', 'brand', 'opening_hours', 'street', 'housenumber', 'phone', 'website']
+
+# Grid cell size in degrees (~1.1 km in latitude)
+CELL_SIZE = 0.01
+
+
+def _cell_rows_cols(lats: np.ndarray, lons: np.ndarray, cell_size: float):
+    rows = np.floor((lats + 90) / cell_size).astype(np.int64)
+    cols = np.floor((lons + 180) / cell_size).astype(np.int64)
+    return rows, cols
+
+
+def _cells_per_row(cell_size: float) -> int:
+    return int(round(360 / cell_size))
+
+
+def _normalize_place(name: str) -> str:
+    return " ".join(name.lower().replace(",", " ").split())
+
+
+def _area_names(tags: Dict[str, str]) -> List[str]:
+    names = {_normalize_place(part) for tag in AREA_TAGS for part in tags.get(tag, '').replace(';', ',').split(',')}
+    return sorted(names - {''})
+
+
+def _file_under_cities(places: Dict[str, Dict[str, Any]]) -> None:
+    """Add the nearest city or town to the area names of every place (a city is its own nearest)."""
+    cities = [name for name, place in places.items() if place['type'] in CITY_TYPES]
+    if not cities:
+        return
+    lats = np.array([places[name]['lat'] for name in cities])
+    lons = np.array([places[name]['lon'] for name in cities])
+    for place in places.values():
+        nearest = cities[int(np.argmin(haversine_km(place['lat'], place['lon'], lats, lons)))]
+        place['area'] = sorted({*place['area'], nearest})
+
+
+def _iter_overpass_json(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield ``{"lat", "lon", "tags"}`` for tagged elements of an Overpass JSON dump."""
+    data = json.loads(path.read_text())
+    for element in data.get('elements', []):
+        tags = element.get('tags')
+        if not tags:
+            continue
+        point = element if 'lat' in element else element.get('center')
+        if point:
+            yield {'lat': point['lat'], 'lon': point['lon'], 'tags': tags}
+
+
+def _iter_pbf(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield ``{"lat", "lon", "tags"}`` for store and place elements of a PBF extract."""
+    if not OSMIUM_AVAILABLE:
+        raise ImportError("osmium is not available. Please install it with: pip install osmium")
+
+    processor = (
+        osmium.FileProcessor(str(path))
+        .with_locations()
+        .with_filter(osmium.filter.KeyFilter('shop', 'place'))
+    )
+    for obj in processor:
+        tags = dict(obj.tags)
+        if obj.is_node():
+            yield {'lat': obj.location.lat, 'lon': obj.location.lon, 'tags': tags}
+        elif obj.is_way():
+            nodes = [node.location for node in obj.nodes if node.location.valid()]
+            if nodes:
+                yield {
+                    'lat': sum(node.lat for node in nodes) / len(nodes),
+                    'lon': sum(node.lon for node in nodes) / len(nodes),
+                    'tags': tags,
+                }
+
+
+def _iter_extract(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.name.endswith('.pbf'):
+        return _iter_pbf(path)
+    return _iter_overpass_json(path)
+
+
+def build_index(inputs: Iterable[Union[str, Path]], output: Union[str, Path]) -> Dict[str, Any]:
+    """Build an offline store index from OSM extracts and write it to ``output``."""
+    stores: Dict[Any, Dict[str, Any]] = {}
+    places: Dict[str, Dict[str, float]] = {}
+    regions = []
+
+    for path in inputs:
+        region = [90.0, 180.0, -90.0, -180.0]
+        for element in _iter_extract(Path(path)):
+            region = [
+                min(region[0], element['lat']), min(region[1], element['lon']),
+                max(region[2], element['lat']), max(region[3], element['lon']),
+            ]
+            tags = element['tags']
+            if tags.get('shop') in STORE_SHOPS and 'name' in tags:
+                # The same store can appear in overlapping extracts
+                key = (tags['name'], round(element['lat'], 5), round(element['lon'], 5))
+                stores[key] = element
+            elif tags.get('place') in PLACE_TYPES and 'name' in tags:
+                places.setdefault(
+                    _normalize_place(tags['name']),
+                    {'lat': element['lat'], 'lon': element['lon'], 'type': tags['place'],
+                     'area': _area_names(tags)},
+                )
+        if region[0] <= region[2]:
+            regions.append(region)
+    _file_under_cities(places)
+    for place in places.values():
+        del place['type']
+
+    elements = list(stores.values())
+    lats = np.array([e['lat'] for e in elements], dtype=np.float64)
+    lons = np.array([e['lon'] for e in elements], dtype=np.float64)
+    rows, cols = _cell_rows_cols(lats, lons, CELL_SIZE)
+    cells = rows * _cells_per_row(CELL_SIZE) + cols
+
+    # Sort by cell so every row of cells in a query is one contiguous slice
+    order = np.argsort(cells, kind="stable")
+    columns = {
+        'name': [e['tags'].get('name', '') for e in elements],
+        'brand': [e['tags'].get('brand', '') for e in elements],
+        'opening_hours': [e['tags'].get('opening_hours', '') for e in elements],
+        'street': [e['tags'].get('addr:street', '') for e in elements],
+        'housenumber': [e['tags'].get('addr:housenumber', '') for e in elements],
+        'phone': [e['tags'].get('phone', '') for e in elements],
+        'website': [e['tags'].get('website', '') for e in elements],
+    }
+
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    np.save(output / 'lat.npy', lats[order])
+    np.save(output / 'lon.npy', lons[order])
+    np.save(output / 'cells.npy', cells[order])
+    for column in TEXT_COLUMNS:
+        np.save(output / f'{column}.npy', np.array(columns[column], dtype=np.str_)[order])
+
+    meta = {
+        'cell_size': CELL_SIZE,
+        'stores': len(elements),
+        # One bounding box per extract, so gaps between indexed cities still go online
+        'regions': regions,
+    }
+    (output / 'meta.json').write_text(json.dumps(meta))
+    (output / 'places.json').write_text(json.dumps(places))
+    return {**meta, 'places': len(places)}
+
+
+class OfflineStoreIndex:
+    """Memory-mapped grid index over store coordinates with OSM tag columns."""
+
+    def __init__(self, path: Union[str, Path]):
+        path = Path(path)
+        meta = json.loads((path / 'meta.json').read_text())
+        self.path = path
+        self.cell_size = meta['cell_size']
+        self.regions = meta['regions']
+        self.lat = np.load(path / 'lat.npy', mmap_mode='r')
+        self.lon = np.load(path / 'lon.npy', mmap_mode='r')
+        self.cells = np.load(path / 'cells.npy', mmap_mode='r')
+        self.columns = {
+            column: np.load(path / f'{column}.npy', mmap_mode='r') for column in TEXT_COLUMNS
+        }
+        self.places = json.loads((path / 'places.json').read_text())
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def covers(self, lat: float, lon: float) -> bool:
+        """Whether a point lies inside one of the regions the index was built from."""
+        return any(
+            south <= lat <= north and west <= lon <= east
+            for south, west, north, east in self.regions
+        )
+
+    def geocode(self, location: str) -> Optional[Dict[str, float]]:
+        """Resolve a place name (e.g. "Berlin", "Mitte, Berlin" or "Berlin, Germany") from the gazetteer.
+
+        After the first comma, every part must name the place's city or an
+        area it lies in; otherwise the place is left to the online geocoder.
+        """
+        normalized = _normalize_place(location)
+        place = self.places.get(normalized)
+        if place is None:
+            # "Mitte, Berlin" -> "mitte" in "berlin"; indexes built before area names only accept the country
+            first, *rest = (_normalize_place(part) for part in location.split(','))
+            place = self.places.get(first)
+            if place is None or not all(part in HOME_COUNTRY or part in place.get('area', ()) for part in rest if part):
+                return None
+        return {'lat': place['lat'], 'lon': place['lon']}
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        south, west, north, east = radius_bbox(lat, lon, radius_m)
+        row_min, col_min = _cell_rows_cols(np.array([south]), np.array([west]), self.cell_size)
+        row_max, col_max = _cell_rows_cols(np.array([north]), np.array([east]), self.cell_size)
+
+        cells_per_row = _cells_per_row(self.cell_size)
+        slices = []
+        for row in range(int(row_min[0]), int(row_max[0]) + 1):
+            lo = np.searchsorted(self.cells, row * cells_per_row + int(col_min[0]), side='left')
+            hi = np.searchsorted(self.cells, row * cells_per_row + int(col_max[0]), side='right')
+            if hi > lo:
+                slices.append(np.arange(lo, hi))
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.intp)
+
+    def search(self, lat: float, lon: float, radius_m: float = 5000, limit: int = 10,
+               name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Stores within ``radius_m`` of a point, nearest first, optionally matching ``name``."""
+        candidates = self._candidates(lat, lon, radius_m)
+        if name and candidates.size:
+            needle = name.lower()
+            names = np.char.lower(self.columns['name'][candidates])
+            brands = np.char.lower(self.columns['brand'][candidates])
+            matches = (np.char.find(names, needle) >= 0) | (np.char.find(brands, needle) >= 0)
+            candidates = candidates[matches]
+        if not candidates.size:
+            return []
+
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        within = np.flatnonzero(distances <= radius_m / 1000)
+        nearest = within[nearest_k(distances[within], limit)]
+
+        return [
+            self._row(int(candidates[index]), float(distances[index])) for index in nearest
+        ]
+
+    def _row(self, index: int, distance: float) -> Dict[str, Any]:
+        values = {column: str(self.columns[column][index]) or None for column in TEXT_COLUMNS}
+        return {
+            'lat': float(self.lat[index]),
+            'lon': float(self.lon[index]),
+            'distance': distance,
+            **values,
+        }
+
+
+def load_index(path: Optional[Union[str, Path]] = None) -> Optional[OfflineStoreIndex]:
+    """Load the index from ``path`` or BROCC_LI_OSM_INDEX, or None if there is none."""
+    path = path or os.getenv('BROCC_LI_OSM_INDEX')
+    if not path or not (Path(path) / 'meta.json').exists():
+        return None
+    return OfflineStoreIndex(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the offline OSM store index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Index one or more OSM extracts")
+    build.add_argument('inputs', nargs='+', help="Overpass JSON dumps or .osm.pbf files")
+    build.add_argument('--output', required=True, help="Output directory for the index")
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        summary = build_index(args.inputs, args.output)
+        print(
+            f"Indexed {summary['stores']} stores and {summary['places']} places "
+            f"into {args.output}"
+        )
+
+
+if __name__ == '__main__':
+    main()
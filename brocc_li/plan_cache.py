@@ -0,0 +1,151 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from brocc_li.cache import SQLiteCache
+from brocc_li.nutrition import to_number
+
+# Plans stay valid for a week; the least recently served ones go first when the cache is full
+PLAN_CACHE_TTL = 7 * 24 * 3600
+PLAN_CACHE_MAX_ENTRIES = 5_000
+
+# Numeric preferences are rounded down to these steps, so nearby profiles share a plan; a plan
+# is still only served to profiles whose budget is at least the one it was generated for
+BUCKETS = {
+    'age': 10,
+    'height': 5,             # cm
+    'weight': 5,             # kg
+    'calories': 200,         # kcal per day
+    'protein': 20,           # g per day
+    'budget': 5,             # EUR
+    'max_cooking_time': 15,  # minutes
+}
+SET_FIELDS = ('dietary_restrictions', 'allergies', 'likes', 'dislikes', 'cuisine')
+
+GOAL_ALIASES = {
+    'weight_loss': ['lose', 'loss', 'weight loss', 'cut', 'slim', 'abnehmen', 'fat loss'],
+    'muscle_gain': ['muscle', 'bulk', 'gain', 'build', 'zunehmen', 'muskel'],
+    'maintenance': ['maintain', 'maintenance', 'keep', 'halten'],
+    'health': ['health', 'healthy', 'gesund', 'energy'],
+}
+GENDER_ALIASES = {'m': 'male', 'man': 'male', 'männlich': 'male', 'f': 'female', 'w': 'female',
+                  'woman': 'female', 'weiblich': 'female'}
+
+
+def _words(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        value = re.split(r"[,;/]| and | und ", value)
+    if not isinstance(value, (list, tuple, set)):
+        return []
+    return (str(item).strip().lower() for item in value if str(item).strip())
+
+
+def normalize_goal(goal: Any) -> Optional[str]:
+    text = str(goal or '').strip().lower()
+    if not text:
+        return None
+    for canonical, aliases in GOAL_ALIASES.items():
+        if any(alias in text for alias in aliases):
+            return canonical
+    return text
+
+
+def canonical_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Preferences reduced to what decides a plan: bucketed numbers, sorted sets, normalized goal."""
+    canonical: Dict[str, Any] = {}
+    for key, value in preferences.items():
+        key = str(key).lower()
+        if value in (None, '', [], {}):
+            continue
+        if key in BUCKETS:
+            number = to_number(value)
+            if key == 'height' and 0 < number < 3:
+                number *= 100  # metres
+            if number > 0:
+                canonical[key] = int(number // BUCKETS[key] * BUCKETS[key])
+        elif key in SET_FIELDS:
+            words = sorted(set(_words(value)) - {'none', 'no', 'keine'})
+            if words:
+                canonical[key] = words
+        elif key == 'goal':
+            canonical[key] = normalize_goal(value)
+        elif key == 'gender':
+            gender = str(value).strip().lower()
+            canonical[key] = GENDER_ALIASES.get(gender, gender)
+        elif isinstance(value, (list, tuple, set)):
+            canonical[key] = sorted(_words(value))
+        else:
+            canonical[key] = re.sub(r"\s+", " ", str(value).strip().lower())
+    return canonical
+
+
+def _budget(preferences: Dict[str, Any]) -> Optional[float]:
+    """Budget of ``preferences`` as a number, or None if it has none."""
+    for key, value in preferences.items():
+        if str(key).lower() == 'budget' and value not in (None, ''):
+            number = to_number(value)
+            return number if number > 0 else None
+    return None
+
+
+def fingerprint(preferences: Dict[str, Any], kind: str) -> str:
+    """Cache key of a ``kind`` of plan (e.g. "diet_report") for ``preferences``."""
+    canonical = json.dumps(canonical_preferences(preferences), sort_keys=True, ensure_ascii=False)
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+class PlanCache:
+    """Generated plans keyed on a fingerprint of the preferences they were made for.
+
+    Profiles that differ only within a bucket ("vegetarian, 15 €/day, weight
+    loss" with 1850 or 1900 kcal) share an entry. The budget of the profile
+    a plan was made for is stored with it, and the plan is not served to a
+    profile with a smaller budget; that profile's new plan replaces it, so
+    the entry fits every budget of its bucket from then on. Entries expire
+    after ``ttl`` seconds and the least recently served ones are evicted
+    first.
+    """
+
+    def __init__(self, ttl: float = PLAN_CACHE_TTL, max_entries: int = PLAN_CACHE_MAX_ENTRIES, path=None):
+        self.cache = SQLiteCache("plans", ttl=ttl, max_entries=max_entries, path=path)
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, preferences: Dict[str, Any]) -> Optional[Any]:
+        entry = self.cache.get(fingerprint(preferences, kind))
+        value = None
+        if isinstance(entry, dict) and 'value' in entry:
+            budget, source_budget = _budget(preferences), entry.get('budget')
+            if budget is None or (source_budget is not None and source_budget <= budget):
+                value = entry['value']
+        with self._lock:
+            counters = self.counters.setdefault(kind, {'hits': 0, 'misses': 0})
+            counters['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, kind: str, preferences: Dict[str, Any], value: Any) -> None:
+        self.cache.set(fingerprint(preferences, kind), {'budget': _budget(preferences), 'value': value})
+
+    def stats(self) -> Dict[str, Any]:
+        """Overall hit rate plus hits and misses per kind of plan."""
+        with self._lock:
+            per_kind = {
+                kind: {**counters, 'hit_rate': counters['hits'] / max(counters['hits'] + counters['misses'], 1)}
+                for kind, counters in self.counters.items()
+            }
+        return {**self.cache.stats(), 'kinds': per_kind}
+
+
+_shared: Optional[PlanCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_plan_cache() -> PlanCache:
+    """The plan cache used by the report and diet planning tools."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PlanCache()
+        return _shared
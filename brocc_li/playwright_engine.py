@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    async_playwright = None
+
+# Resources a scrape never needs; grocery sites are full of them
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+
+TRACKER_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'facebook.net',
+    'connect.facebook.com',
+    'hotjar.com',
+    'criteo.com',
+    'criteo.net',
+    'adnxs.com',
+    'taboola.com',
+    'outbrain.com',
+    'scorecardresearch.com',
+    'usercentrics.eu',
+    'cookielaw.org',
+    'onetrust.com',
+)
+
+
+def _is_tracker(url: str) -> bool:
+    host = (urlparse(url).hostname or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in TRACKER_DOMAINS)
+
+
+class PlaywrightScraper:
+    """Async Playwright scraping backend with resource blocking.
+
+    One Chromium instance runs on a private event loop thread; every page gets
+    its own browser context, so up to ``max_concurrency`` pages load in
+    parallel. Images, fonts, media and known trackers are aborted through
+    request interception. The public methods are synchronous so they can be
+    called from tools.
+    """
+
+    def __init__(self, max_concurrency: int = 4, page_timeout: float = 30,
+                 user_agent: Optional[str] = None):
+        if not PLAYWRIGHT_AVAILABLE:
+            raise ImportError(
+                "Playwright is not available. Please install it with: "
+                "pip install playwright && playwright install chromium"
+            )
+        self.max_concurrency = max_concurrency
+        self.page_timeout = page_timeout
+        self.user_agent = user_agent
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def scrape(self, url: str) -> Dict[str, Any]:
+        """Load one page and return its title, HTML and timing."""
+        return self._run(self._scrape(url))
+
+    def scrape_many(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Load several pages concurrently; failures are returned as ``{"url", "error"}``."""
+        async def scrape_all():
+            results = await asyncio.gather(
+                *(self._scrape(url) for url in urls), return_exceptions=True
+            )
+            return [
+                {'url': url, 'error': str(result)} if isinstance(result, Exception) else result
+                for url, result in zip(urls, results)
+            ]
+        return self._run(scrape_all())
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self._shutdown())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+
+    def _run(self, coroutine):
+        # Allow for waiting on the semaphore on top of the page load itself
+        timeout = self.page_timeout * 4
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def _ensure_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+        return self._browser
+
+    async def _block_unneeded(self, route) -> None:
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or _is_tracker(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _scrape(self, url: str) -> Dict[str, Any]:
+        browser = await self._ensure_browser()
+        async with self._semaphore:
+            context = await browser.new_context(user_agent=self.user_agent)
+            try:
+                await context.route('**/*', self._block_unneeded)
+                page = await context.new_page()
+                started = time.monotonic()
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.page_timeout * 1000)
+                load_time = time.monotonic() - started
+                return {
+                    'url': url,
+                    'title': await page.title(),
+                    'html': await page.content(),
+                    'load_time': load_time,
+                }
+            finally:
+                await context.close()
+
+    async def _shutdown(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
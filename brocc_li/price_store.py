@@ -0,0 +1,215 @@
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from brocc_li.utils import get_cache_dir
+
+
+def normalize_product(name: str) -> str:
+    """Canonical product key: lowercase words without punctuation ("Milch, 1L " -> "milch 1l")."""
+    return " ".join(re.findall(r"\w+", name.lower()))
+
+
+# Bump when the table layout changes; older stores are migrated when opened
+SCHEMA_VERSION = 1
+
+
+class PriceStore:
+    """Local price time series per (chain, normalized product, unit).
+
+    Every lookup is appended to ``observations`` with its timestamp; the
+    ``latest`` table keeps the most recent observation per (product, chain,
+    unit), so a per-kg and a per-piece price don't overwrite each other, and
+    bulk reads are one indexed query. A lookup where the store did not list
+    the product is recorded too (with a NULL price), so it is not repeated on
+    every request.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else get_cache_dir() / "prices.sqlite3"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION and self._has_table('latest'):
+            # Version 0 keyed ``latest`` on (product, chain) only; its rows are copied over below
+            self._conn.executescript(
+                """
+                DROP TABLE IF EXISTS latest_v0;
+                DROP INDEX IF EXISTS latest_observed;
+                ALTER TABLE latest RENAME TO latest_v0;
+                """
+            )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS observations (
+                chain TEXT NOT NULL,
+                product TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                name TEXT,
+                price REAL,
+                availability INTEGER,
+                brand TEXT,
+                observed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS observations_series
+                ON observations (chain, product, unit, observed_at);
+            CREATE TABLE IF NOT EXISTS latest (
+                chain TEXT NOT NULL,
+                product TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                name TEXT,
+                price REAL,
+                availability INTEGER,
+                brand TEXT,
+                observed_at REAL NOT NULL,
+                PRIMARY KEY (product, chain, unit)
+            );
+            CREATE INDEX IF NOT EXISTS latest_observed ON latest (observed_at);
+            """
+        )
+        if version < SCHEMA_VERSION:
+            if self._has_table('latest_v0'):
+                self._conn.executescript("INSERT INTO latest SELECT * FROM latest_v0; DROP TABLE latest_v0;")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def _has_table(self, name: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def record(self, chain: str, product: str, info: Optional[Dict[str, Any]],
+               observed_at: Optional[float] = None) -> None:
+        """Record one lookup of ``product`` at ``chain``; ``info`` is a ProductInfo dict or None if not listed."""
+        self.record_many([(chain, product, info)], observed_at)
+
+    def record_many(self, lookups: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+                    observed_at: Optional[float] = None) -> None:
+        observed_at = time.time() if observed_at is None else observed_at
+        rows = []
+        for chain, product, info in lookups:
+            info = info or {}
+            rows.append((
+                chain,
+                normalize_product(product),
+                info.get('unit') or '',
+                info.get('name'),
+                info.get('price'),
+                None if not info else int(bool(info.get('availability', True))),
+                info.get('brand'),
+                observed_at,
+            ))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def latest(self, chain: str, product: str) -> Optional[Dict[str, Any]]:
+        """Most recent observation of ``product`` at ``chain``, or None if it was never looked up."""
+        return self.bulk_latest([product], [chain]).get((normalize_product(product), chain))
+
+    def bulk_latest(self, products: Iterable[str], chains: Iterable[str]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Most recent observation, whatever its unit, for every (normalized product, chain) pair, in one indexed query.
+
+        Each value is ``{"product": ProductInfo dict or None, "observed_at", "age"}``;
+        pairs that were never looked up are missing from the result.
+        """
+        products = sorted({normalize_product(product) for product in products})
+        chains = sorted(set(chains))
+        if not products or not chains:
+            return {}
+
+        # Oldest first, so the newest unit of a pair is the one that stays in the result
+        query = f"""
+            SELECT chain, product, unit, name, price, availability, brand, observed_at
+            FROM latest
+            WHERE product IN ({', '.join('?' * len(products))})
+              AND chain IN ({', '.join('?' * len(chains))})
+            ORDER BY observed_at
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(query, [*products, *chains]).fetchall()
+
+        results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for chain, product, unit, name, price, availability, brand, observed_at in rows:
+            results[(product, chain)] = {
+                'product': None if price is None else {
+                    'name': name,
+                    'price': price,
+                    'store': chain,
+                    'availability': bool(availability),
+                    'unit': unit,
+                    'brand': brand,
+                },
+                'observed_at': observed_at,
+                'age': now - observed_at,
+            }
+        with self._lock:
+            self.hits += len(results)
+            self.misses += len(products) * len(chains) - len(results)
+        return results
+
+    def stale(self, max_age: float, limit: int = 1000) -> List[Tuple[str, str]]:
+        """(chain, normalized product) pairs last observed more than ``max_age`` seconds ago, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT chain, product FROM latest
+                GROUP BY chain, product HAVING MAX(observed_at) < ?
+                ORDER BY MAX(observed_at) LIMIT ?
+                """,
+                (time.time() - max_age, limit),
+            ).fetchall()
+        return [(chain, product) for chain, product in rows]
+
+    def history(self, chain: str, product: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Every observation of ``product`` at ``chain``, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT unit, price, availability, observed_at FROM observations
+                WHERE chain = ? AND product = ? AND observed_at >= ?
+                ORDER BY observed_at
+                """,
+                (chain, normalize_product(product), since or 0),
+            ).fetchall()
+        return [
+            {'unit': unit, 'price': price, 'availability': bool(availability), 'observed_at': observed_at}
+            for unit, price, availability, observed_at in rows
+        ]
+
+    def prune(self, older_than: float) -> int:
+        """Drop observations older than ``older_than`` seconds; the latest price per series is kept."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM observations WHERE observed_at < ?", (time.time() - older_than,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counters for this process plus the size of the store."""
+        with self._lock:
+            series = self._conn.execute("SELECT COUNT(*) FROM latest").fetchone()[0]
+            observations = self._conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'series': series,
+                'observations': observations,
+            }
@@ -0,0 +1,379 @@
+"""Local full-text recipe index with dietary, allergen and time filters.
+
+Load a recipe dump (one RecipeInfo-like JSON object per line) once:
+
+    python -m brocc_li.recipe_index load recipes.jsonl
+
+Titles and ingredients go into an SQLite FTS5 inverted index ranked with
+BM25. Dietary tags and allergens are derived from the ingredients at load
+time and indexed as tokens of their own, so filters are part of the index
+lookup; the total time is a B-tree indexed column.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from brocc_li.ingredients import dietary_labels
+from brocc_li.utils import get_cache_dir
+
+# Tokens of the ``tags`` index column: 'vegetarian', 'vegan' and one "<allergen>free" tag per allergen
+ALLERGEN_FREE_TAGS = {
+    'gluten': 'glutenfree',
+    'dairy': 'dairyfree',
+    'eggs': 'eggfree',
+    'nuts': 'nutfree',
+    'peanuts': 'peanutfree',
+    'soy': 'soyfree',
+    'fish': 'fishfree',
+    'shellfish': 'shellfishfree',
+    'sesame': 'sesamefree',
+}
+
+# How users spell dietary restrictions -> index tag
+DIET_ALIASES = {
+    'vegetarian': 'vegetarian', 'vegetarisch': 'vegetarian', 'veggie': 'vegetarian',
+    'vegan': 'vegan',
+    'gluten free': 'glutenfree', 'glutenfree': 'glutenfree', 'glutenfrei': 'glutenfree', 'celiac': 'glutenfree',
+    'dairy free': 'dairyfree', 'dairyfree': 'dairyfree', 'lactose free': 'dairyfree', 'laktosefrei': 'dairyfree',
+    'nut free': 'nutfree', 'nutfree': 'nutfree', 'nut allergy': 'nutfree',
+    'egg free': 'eggfree', 'eggfree': 'eggfree',
+    'soy free': 'soyfree', 'soyfree': 'soyfree',
+    'fish free': 'fishfree',
+    'shellfish free': 'shellfishfree', 'shellfish allergy': 'shellfishfree',
+    'sesame free': 'sesamefree', 'peanut free': 'peanutfree', 'peanut allergy': 'peanutfree',
+}
+
+_HOURS = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:h|hrs?|hours?|std|stunden?)\b", re.IGNORECASE)
+_MINUTES = re.compile(r"(\d+)\s*(?:m|mins?|minutes?|minuten?)\b", re.IGNORECASE)
+_ISO_DURATION = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+
+# Bump when the diet and allergen classification changes; older indexes are re-tagged when opened
+CLASSIFIER_VERSION = 2
+
+# Weight of title, ingredient and tag matches in the BM25 score
+BM25_WEIGHTS = (10.0, 3.0, 0.0)
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def parse_minutes(text: Optional[str]) -> Optional[int]:
+    """Minutes in "75 minutes", "1 h 15 min", "1,5 Stunden" or "PT1H15M", or None."""
+    if not text:
+        return None
+    text = str(text).strip()
+    iso = _ISO_DURATION.fullmatch(text)
+    if iso and any(iso.groups()):
+        days, hours, minutes = (int(part) if part else 0 for part in iso.groups())
+        return days * 1440 + hours * 60 + minutes
+    hours = sum(float(h.replace(',', '.')) for h in _HOURS.findall(text))
+    minutes = sum(int(m) for m in _MINUTES.findall(text))
+    if not hours and not minutes:
+        number = re.fullmatch(r"\d+", text)
+        return int(number.group()) if number else None
+    return int(round(hours * 60)) + minutes
+
+
+def total_minutes(recipe: Dict[str, Any]) -> Optional[int]:
+    if recipe.get('total_time'):
+        return parse_minutes(recipe['total_time'])
+    parts = [parse_minutes(recipe.get('prep_time')), parse_minutes(recipe.get('cook_time'))]
+    parts = [part for part in parts if part is not None]
+    return sum(parts) if parts else None
+
+
+def allergens(ingredients: Iterable[str]) -> Set[str]:
+    """Allergens (see ALLERGEN_FREE_TAGS) found in the ingredient lines by the shared ingredient matcher."""
+    return {label for line in ingredients for label in dietary_labels(line)} & ALLERGEN_FREE_TAGS.keys()
+
+
+def diets(ingredients: Iterable[str], found_allergens: Optional[Set[str]] = None) -> Set[str]:
+    """Dietary tags (see ALLERGEN_FREE_TAGS) the ingredient lines are compatible with."""
+    labels = {label for line in ingredients for label in dietary_labels(line)}
+    found = labels & ALLERGEN_FREE_TAGS.keys() if found_allergens is None else found_allergens
+
+    tags = {tag for allergen, tag in ALLERGEN_FREE_TAGS.items() if allergen not in found}
+    if not labels & {'meat', 'fish', 'shellfish'} and not found & {'fish', 'shellfish'}:
+        tags.add('vegetarian')
+        if not labels & {'animal', 'dairy', 'eggs'} and not found & {'dairy', 'eggs'}:
+            tags.add('vegan')
+    return tags
+
+
+def diet_tags(restrictions: Optional[Iterable[str]]) -> Set[str]:
+    """Index tags for user-facing restrictions like "gluten-free" or "Vegetarisch"; unknown ones are dropped."""
+    tags = set()
+    for restriction in restrictions or []:
+        tag = DIET_ALIASES.get(" ".join(_words(restriction.replace('-', ' '))))
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+class RecipeIndex:
+    """SQLite FTS5 index over recipe titles and ingredients with BM25 ranking."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else get_cache_dir() / "recipes.sqlite3"
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS recipes (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                ingredients TEXT NOT NULL,
+                instructions TEXT NOT NULL,
+                prep_time TEXT,
+                cook_time TEXT,
+                servings INTEGER,
+                source TEXT,
+                total_minutes INTEGER,
+                allergens TEXT NOT NULL,
+                tags TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS recipes_minutes ON recipes (total_minutes);
+            CREATE VIRTUAL TABLE IF NOT EXISTS recipe_text USING fts5(
+                title, ingredients, tags,
+                content='recipes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS recipes_ai AFTER INSERT ON recipes BEGIN
+                INSERT INTO recipe_text (rowid, title, ingredients, tags)
+                VALUES (new.id, new.title, new.ingredients, new.tags);
+            END;
+            CREATE TRIGGER IF NOT EXISTS recipes_ad AFTER DELETE ON recipes BEGIN
+                INSERT INTO recipe_text (recipe_text, rowid, title, ingredients, tags)
+                VALUES ('delete', old.id, old.title, old.ingredients, old.tags);
+            END;
+            CREATE TRIGGER IF NOT EXISTS recipes_au AFTER UPDATE ON recipes BEGIN
+                INSERT INTO recipe_text (recipe_text, rowid, title, ingredients, tags)
+                VALUES ('delete', old.id, old.title, old.ingredients, old.tags);
+                INSERT INTO recipe_text (rowid, title, ingredients, tags)
+                VALUES (new.id, new.title, new.ingredients, new.tags);
+            END;
+            """
+        )
+        self._conn.commit()
+        self._reclassify()
+
+    def _reclassify(self) -> None:
+        """Re-derive the stored allergens and tags if they come from an older classifier."""
+        with self._lock:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] >= CLASSIFIER_VERSION:
+                return
+            rows = []
+            for recipe_id, ingredients in self._conn.execute("SELECT id, ingredients FROM recipes"):
+                ingredients = json.loads(ingredients)
+                found = allergens(ingredients)
+                rows.append((" ".join(sorted(found)), " ".join(sorted(diets(ingredients, found))), recipe_id))
+            self._conn.executemany("UPDATE recipes SET allergens = ?, tags = ? WHERE id = ?", rows)
+            self._conn.execute(f"PRAGMA user_version = {CLASSIFIER_VERSION}")
+            self._conn.commit()
+
+    def add(self, recipes: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update recipes (RecipeInfo dicts, optionally with ``total_time``), keyed by URL.
+
+        Recipes without ingredients (title-only search cards) are skipped: they
+        can't be classified, and as stubs they would answer local searches in
+        place of the live ones. An update keeps the stored instructions and
+        times where the new row has none.
+        """
+        rows = []
+        for recipe in recipes:
+            if not recipe.get('title') or not recipe.get('url'):
+                continue
+            ingredients = list(recipe.get('ingredients') or [])
+            if not ingredients:
+                continue
+            found = allergens(ingredients)
+            tags = diets(ingredients, found)
+            rows.append((
+                recipe['url'],
+                recipe['title'],
+                json.dumps(ingredients, ensure_ascii=False),
+                json.dumps(list(recipe.get('instructions') or []), ensure_ascii=False),
+                recipe.get('prep_time'),
+                recipe.get('cook_time'),
+                recipe.get('servings'),
+                recipe.get('source'),
+                total_minutes(recipe),
+                " ".join(sorted(found)),
+                " ".join(sorted(tags)),
+            ))
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO recipes (url, title, ingredients, instructions, prep_time, cook_time,
+                                     servings, source, total_minutes, allergens, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = excluded.title, ingredients = excluded.ingredients,
+                    instructions = COALESCE(NULLIF(excluded.instructions, '[]'), recipes.instructions),
+                    prep_time = COALESCE(excluded.prep_time, recipes.prep_time),
+                    cook_time = COALESCE(excluded.cook_time, recipes.cook_time),
+                    servings = COALESCE(excluded.servings, recipes.servings),
+                    source = COALESCE(excluded.source, recipes.source),
+                    total_minutes = COALESCE(excluded.total_minutes, recipes.total_minutes),
+                    allergens = excluded.allergens, tags = excluded.tags
+                """,
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def load_jsonl(self, path: Union[str, Path], batch_size: int = 5000) -> int:
+        """Load a JSONL recipe dump in batches; returns the number of recipes indexed."""
+        loaded = 0
+        for batch in _batches(_iter_jsonl(Path(path)), batch_size):
+            loaded += self.add(batch)
+        with self._lock:
+            self._conn.execute("INSERT INTO recipe_text (recipe_text) VALUES ('optimize')")
+            self._conn.commit()
+        return loaded
+
+    def search(self, query: str, dietary_restrictions: Optional[List[str]] = None,
+               max_time: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best BM25 matches for ``query`` that satisfy every dietary restriction and ``max_time`` minutes.
+
+        Recipes containing every query word are preferred; if there are fewer
+        than ``limit`` of them, recipes matching any word fill up the results.
+        """
+        words = [f'"{word}"' for word in _words(query)]
+        tags = sorted(diet_tags(dietary_restrictions))
+        tag_filter = f"tags : ({' AND '.join(tags)})" if tags else None
+
+        if not words and not tag_filter:
+            return self._by_time(max_time, limit)
+
+        recipes: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        operators = [' AND ', ' OR '] if len(words) > 1 else [' AND ']
+        for operator in operators:
+            match = [f"{{title ingredients}} : ({operator.join(words)})"] if words else []
+            if tag_filter:
+                match.append(tag_filter)
+            for recipe in self._match(" AND ".join(match), max_time, limit):
+                if recipe['url'] not in seen:
+                    seen.add(recipe['url'])
+                    recipes.append(recipe)
+            if len(recipes) >= limit:
+                break
+        return recipes[:limit]
+
+    def _match(self, match: str, max_time: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        # Rank ids first so that only the returned rows are read in full
+        time_join = "JOIN recipes t ON t.id = recipe_text.rowid AND t.total_minutes <= ?" if max_time else ""
+        sql = f"""
+            WITH hits AS (
+                SELECT recipe_text.rowid AS id,
+                       bm25(recipe_text, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score
+                FROM recipe_text {time_join}
+                WHERE recipe_text MATCH ?
+                ORDER BY score
+                LIMIT ?
+            )
+            SELECT r.* FROM hits JOIN recipes r ON r.id = hits.id ORDER BY hits.score
+        """
+        params = ([max_time] if max_time else []) + [match, limit]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._recipe(row) for row in rows]
+
+    def _by_time(self, max_time: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        sql = f"""
+            SELECT * FROM recipes
+            {'WHERE total_minutes <= ?' if max_time else ''}
+            ORDER BY total_minutes IS NULL, total_minutes
+            LIMIT ?
+        """
+        params = ([max_time] if max_time else []) + [limit]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._recipe(row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    @staticmethod
+    def _recipe(row) -> Dict[str, Any]:
+        (_, url, title, ingredients, instructions, prep_time, cook_time, servings, source,
+         minutes, found_allergens, tags) = row
+        return {
+            'title': title,
+            'ingredients': json.loads(ingredients),
+            'instructions': json.loads(instructions),
+            'prep_time': prep_time,
+            'cook_time': cook_time,
+            'servings': servings,
+            'source': source,
+            'url': url,
+            'total_minutes': minutes,
+            'allergens': found_allergens.split(),
+            'diets': tags.split(),
+        }
+
+
+def matches_filters(recipe: Dict[str, Any], dietary_restrictions: Optional[List[str]] = None,
+                    max_time: Optional[int] = None) -> bool:
+    """Apply the index filters to a recipe that is not in the index (e.g. a live search result)."""
+    tags = diet_tags(dietary_restrictions)
+    if tags:
+        ingredients = recipe.get('ingredients') or []
+        if not ingredients or not tags <= diets(ingredients):
+            return False
+    if max_time:
+        minutes = total_minutes(recipe)
+        if minutes is None or minutes > max_time:
+            return False
+    return True
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open(encoding='utf-8') as lines:
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _batches(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the local recipe index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('load', help="Index a JSONL recipe dump")
+    load.add_argument('inputs', nargs='+', help="JSONL files with one recipe per line")
+    load.add_argument('--index', help="Index file (default: BROCC_LI_RECIPE_INDEX or the cache directory)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'load':
+        index = RecipeIndex(args.index or os.getenv('BROCC_LI_RECIPE_INDEX'))
+        loaded = sum(index.load_jsonl(path) for path in args.inputs)
+        print(f"Indexed {loaded} recipes into {index.path} ({len(index)} in total)")
+
+
+if __name__ == '__main__':
+    main()
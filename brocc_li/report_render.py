@@ -0,0 +1,419 @@
+"""Diet report rendering to HTML and, through Typst, to PDF.
+
+Each section of a report (profile, meal plan, shopping list, nutrition,
+recommendations) is rendered on its own from the report fields it shows and
+cached under a hash of them, so an edited report only re-renders the
+sections that changed. The sections are assembled into an HTML page and a
+Typst document styled like ``report/main.typ``; the PDF is compiled with the
+``typst`` package or the ``typst`` CLI and kept under the hash of the whole
+document. Rendering runs on a small thread pool, off the request thread.
+"""
+
+import hashlib
+import html
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from string import Template
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from brocc_li.cache import SQLiteCache
+from brocc_li.nutrition import MEALS, NUTRIENTS
+from brocc_li.utils import get_cache_dir
+
+try:
+    import typst
+    TYPST_AVAILABLE = True
+except ImportError:
+    TYPST_AVAILABLE = False
+    typst = None
+
+# Bump when a template changes, so cached sections are rendered again
+TEMPLATE_VERSION = 2
+SECTION_CACHE_TTL = 30 * 24 * 3600
+SECTION_CACHE_MAX_ENTRIES = 50_000
+RENDER_WORKERS = 2
+TYPST_TIMEOUT = 60
+
+# Section -> report fields it is rendered from (and hashed on)
+SECTIONS = {
+    'profile': ('user_info',),
+    'meal_plan': ('meal_plan',),
+    'shopping_list': ('shopping_list', 'total_weekly_cost'),
+    'nutrition': ('nutritional_summary',),
+    'recommendations': ('recommendations',),
+}
+UNITS = {'calories': 'kcal', 'sodium': 'mg'}
+
+HTML_PAGE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Brocc Li Diet Report</title>
+<style>
+  body { font-family: Georgia, serif; max-width: 52rem; margin: 2rem auto; padding: 0 1rem; color: #222; }
+  header { text-align: center; margin-bottom: 2rem; }
+  table { border-collapse: collapse; width: 100%; margin: 0.5rem 0 1rem; }
+  th { border-bottom: 1px solid #000; text-align: center; }
+  th:first-child, td:first-child { text-align: left; }
+  td { text-align: center; padding: 0.15rem 0.4rem; }
+  .totals { color: #555; }
+</style>
+</head>
+<body>
+<header>
+<h1>Brocc Li</h1>
+<p>Your Personalized Diet Report &middot; $generated</p>
+</header>
+$sections
+</body>
+</html>
+""")
+
+TYPST_DOCUMENT = Template("""#set page("a4", numbering: "1")
+#set text(font: "New Computer Modern")
+#set heading(numbering: "1.")
+#show table.cell.where(y: 0): strong
+#set table(
+  stroke: (x, y) => if y == 0 {
+    (bottom: 0.7pt + black)
+  },
+  align: (x, y) => (
+    if x > 0 { center }
+    else { left }
+  )
+)
+
+#align(center)[
+  #text(size: 14pt)[
+    *Brocc Li* \\
+    *Your Personalized Diet Report*
+  ]
+
+  #$generated
+]
+
+$sections
+""")
+
+
+def _as_dict(report: Any) -> Dict[str, Any]:
+    if is_dataclass(report):
+        return asdict(report)
+    return dict(report)
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _number(value: Any, digits: int = 0) -> str:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value) if value not in (None, '') else '-'
+    return f"{value:,.{digits}f}"
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return ', '.join(str(item) for item in value) or '-'
+    return str(value) if value not in (None, '') else '-'
+
+
+def _label(key: str) -> str:
+    return key.replace('_', ' ').capitalize()
+
+
+def _meal_rows(day: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+    """``(meal, dish, calories, cost)`` rows of one plan day, in MEALS order."""
+    meals = day.get('meals') if isinstance(day.get('meals'), dict) else {}
+    order = {meal: i for i, meal in enumerate(MEALS)}
+    rows = []
+    for meal_type in sorted(meals, key=lambda meal: order.get(meal, len(order))):
+        for item in (meals[meal_type] if isinstance(meals[meal_type], list) else [meals[meal_type]]):
+            if isinstance(item, dict):
+                nutrition = item.get('nutrition') if isinstance(item.get('nutrition'), dict) else {}
+                rows.append((
+                    _label(meal_type), _text(item.get('name')),
+                    _number(nutrition.get('calories')), _number(item.get('cost'), 2),
+                ))
+    return rows
+
+
+def _nutrition_rows(summary: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+    """``(nutrient, daily average, weekly total, goal deviation)`` rows."""
+    averages = summary.get('daily_averages') or {}
+    deviation = summary.get('goal_deviation') or {}
+    rows = []
+    for nutrient in NUTRIENTS:
+        if averages.get(nutrient) is None and summary.get(f"total_{nutrient}") is None:
+            continue
+        unit = UNITS.get(nutrient, 'g')
+        offset = deviation.get(nutrient)
+        rows.append((
+            f"{_label(nutrient)} ({unit})",
+            _number(averages.get(nutrient)),
+            _number(summary.get(f"total_{nutrient}")),
+            f"{offset:+,.0f}" if isinstance(offset, (int, float)) else '-',
+        ))
+    return rows
+
+
+# HTML sections
+
+def _html_table(header: Iterable[str], rows: Iterable[Iterable[Any]]) -> str:
+    head = ''.join(f"<th>{html.escape(str(cell))}</th>" for cell in header)
+    body = ''.join(
+        '<tr>' + ''.join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + '</tr>' for row in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def _html_profile(report: Dict[str, Any]) -> str:
+    info = report.get('user_info') or {}
+    rows = [(_label(key), _text(value)) for key, value in info.items() if value not in (None, '', [])]
+    return "<section><h2>Profile</h2>" + _html_table(("Field", "Value"), rows) + "</section>"
+
+
+def _html_meal_plan(report: Dict[str, Any]) -> str:
+    parts = ["<section><h2>Meal Plan</h2>"]
+    for day in report.get('meal_plan') or []:
+        if not isinstance(day, dict):
+            continue
+        totals = day.get('total_nutrition') if isinstance(day.get('total_nutrition'), dict) else {}
+        parts.append(f"<h3>{html.escape(_text(day.get('day')))}</h3>")
+        parts.append(_html_table(("Meal", "Dish", "Calories", "Cost (EUR)"), _meal_rows(day)))
+        parts.append(
+            f"<p class=\"totals\">{_number(totals.get('calories'))} kcal, "
+            f"{_number(totals.get('protein'))} g protein, {_number(day.get('total_cost'), 2)} EUR</p>"
+        )
+    parts.append("</section>")
+    return ''.join(parts)
+
+
+def _html_shopping_list(report: Dict[str, Any]) -> str:
+    items = report.get('shopping_list') or []
+    rows = [
+        (_text(item.get('name')), _text(item.get('category')), _text(item.get('quantity')),
+         _number(item.get('estimated_price'), 2))
+        for item in items if isinstance(item, dict)
+    ]
+    estimated = sum(item.get('estimated_price') or 0 for item in items if isinstance(item, dict))
+    return (
+        "<section><h2>Shopping List</h2>"
+        + _html_table(("Item", "Category", "Quantity", "Price (EUR)"), rows)
+        + f"<p class=\"totals\">Estimated shopping cost: {_number(estimated, 2)} EUR &middot; "
+        f"meal plan cost: {_number(report.get('total_weekly_cost'), 2)} EUR</p></section>"
+    )
+
+
+def _html_nutrition(report: Dict[str, Any]) -> str:
+    rows = _nutrition_rows(report.get('nutritional_summary') or {})
+    return (
+        "<section><h2>Nutrition</h2>"
+        + _html_table(("Nutrient", "Daily average", "Weekly total", "vs. goal"), rows)
+        + "</section>"
+    )
+
+
+def _html_recommendations(report: Dict[str, Any]) -> str:
+    items = ''.join(f"<li>{html.escape(str(item))}</li>" for item in report.get('recommendations') or [])
+    return f"<section><h2>Recommendations</h2><ul>{items}</ul></section>"
+
+
+# Typst sections; report text goes into string literals, so it never needs markup escaping
+
+# Typst string escapes; other control characters only have the \u{...} form
+_TYPST_ESCAPES = str.maketrans({
+    **{chr(code): f"\\u{{{code:x}}}" for code in (*range(0x20), *range(0x7f, 0xa0))},
+    '\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t',
+})
+
+
+def _typst_string(value: Any) -> str:
+    return '"' + str(value).translate(_TYPST_ESCAPES) + '"'
+
+
+def _typst_table(header: Iterable[str], rows: Iterable[Iterable[Any]]) -> str:
+    header = list(header)
+    cells = ''.join(f"[{cell}]" for cell in header)
+    body = ''.join(f",\n  {', '.join(_typst_string(cell) for cell in row)}" for row in rows)
+    return f"#table(\n  columns: {len(header)},\n  table.header{cells}{body},\n)\n"
+
+
+def _typst_profile(report: Dict[str, Any]) -> str:
+    info = report.get('user_info') or {}
+    rows = [(_label(key), _text(value)) for key, value in info.items() if value not in (None, '', [])]
+    return "= Profile\n\n" + _typst_table(("Field", "Value"), rows)
+
+
+def _typst_meal_plan(report: Dict[str, Any]) -> str:
+    parts = ["= Meal Plan\n"]
+    for day in report.get('meal_plan') or []:
+        if not isinstance(day, dict):
+            continue
+        totals = day.get('total_nutrition') if isinstance(day.get('total_nutrition'), dict) else {}
+        parts.append(f"\n== #{_typst_string(_text(day.get('day')))}\n\n")
+        parts.append(_typst_table(("Meal", "Dish", "Calories", "Cost (EUR)"), _meal_rows(day)))
+        parts.append("\n#" + _typst_string(
+            f"{_number(totals.get('calories'))} kcal, {_number(totals.get('protein'))} g protein, "
+            f"{_number(day.get('total_cost'), 2)} EUR"
+        ) + "\n")
+    return ''.join(parts)
+
+
+def _typst_shopping_list(report: Dict[str, Any]) -> str:
+    items = report.get('shopping_list') or []
+    rows = [
+        (_text(item.get('name')), _text(item.get('category')), _text(item.get('quantity')),
+         _number(item.get('estimated_price'), 2))
+        for item in items if isinstance(item, dict)
+    ]
+    estimated = sum(item.get('estimated_price') or 0 for item in items if isinstance(item, dict))
+    return (
+        "= Shopping List\n\n"
+        + _typst_table(("Item", "Category", "Quantity", "Price (EUR)"), rows)
+        + "\n#" + _typst_string(
+            f"Estimated shopping cost: {_number(estimated, 2)} EUR, "
+            f"meal plan cost: {_number(report.get('total_weekly_cost'), 2)} EUR"
+        ) + "\n"
+    )
+
+
+def _typst_nutrition(report: Dict[str, Any]) -> str:
+    rows = _nutrition_rows(report.get('nutritional_summary') or {})
+    return "= Nutrition\n\n" + _typst_table(("Nutrient", "Daily average", "Weekly total", "vs. goal"), rows)
+
+
+def _typst_recommendations(report: Dict[str, Any]) -> str:
+    items = ', '.join(_typst_string(item) for item in report.get('recommendations') or [])
+    return f"= Recommendations\n\n#list({items})\n" if items else "= Recommendations\n"
+
+
+RENDERERS: Dict[str, Dict[str, Callable[[Dict[str, Any]], str]]] = {
+    'html': {
+        'profile': _html_profile,
+        'meal_plan': _html_meal_plan,
+        'shopping_list': _html_shopping_list,
+        'nutrition': _html_nutrition,
+        'recommendations': _html_recommendations,
+    },
+    'typst': {
+        'profile': _typst_profile,
+        'meal_plan': _typst_meal_plan,
+        'shopping_list': _typst_shopping_list,
+        'nutrition': _typst_nutrition,
+        'recommendations': _typst_recommendations,
+    },
+}
+
+
+def compile_pdf(source: str, output: Union[str, Path]) -> Path:
+    """Compile a Typst document to ``output`` with the typst package, or the typst CLI if it is not installed."""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="brocc-li-typst-") as tmp:
+        document = Path(tmp) / 'report.typ'
+        document.write_text(source, encoding='utf-8')
+        pdf = Path(tmp) / 'report.pdf'
+        if TYPST_AVAILABLE:
+            typst.compile(str(document), output=str(pdf))
+        elif shutil.which('typst'):
+            subprocess.run(
+                ['typst', 'compile', str(document), str(pdf)],
+                check=True, capture_output=True, timeout=TYPST_TIMEOUT,
+            )
+        else:
+            raise ImportError("typst is not available. Please install it with: pip install typst")
+        # Readers never see a half-written PDF
+        os.replace(pdf, output)
+    return output
+
+
+def typst_available() -> bool:
+    return TYPST_AVAILABLE or shutil.which('typst') is not None
+
+
+class ReportRenderer:
+    """Renders diet reports section by section, with sections cached by content hash."""
+
+    def __init__(self, output_dir: Optional[Union[str, Path]] = None, workers: int = RENDER_WORKERS,
+                 cache: Optional[SQLiteCache] = None):
+        self.output_dir = Path(output_dir) if output_dir else get_cache_dir() / "reports"
+        self.cache = cache or SQLiteCache(
+            "report_sections", ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_MAX_ENTRIES,
+        )
+        self.rendered = 0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="brocc-li-render")
+        self._lock = threading.Lock()
+
+    def section(self, report: Any, name: str, fmt: str) -> str:
+        """One rendered section; only rendered again when the fields it shows changed."""
+        report = _as_dict(report)
+        key = f"{fmt}:{name}:{TEMPLATE_VERSION}:{_hash({field: report.get(field) for field in SECTIONS[name]})}"
+        text = self.cache.get(key)
+        if text is None:
+            text = RENDERERS[fmt][name](report)
+            self.cache.set(key, text)
+            with self._lock:
+                self.rendered += 1
+        return text
+
+    def html(self, report: Any) -> str:
+        report = _as_dict(report)
+        sections = '\n'.join(self.section(report, name, 'html') for name in SECTIONS)
+        return HTML_PAGE.substitute(generated=html.escape(_text(report.get('generated_date'))), sections=sections)
+
+    def typst(self, report: Any) -> str:
+        report = _as_dict(report)
+        sections = '\n'.join(self.section(report, name, 'typst') for name in SECTIONS)
+        return TYPST_DOCUMENT.substitute(generated=_typst_string(_text(report.get('generated_date'))),
+                                         sections=sections)
+
+    def render(self, report: Any, formats: Iterable[str] = ('html', 'pdf')) -> Dict[str, Optional[Path]]:
+        """Write the report as files named by their content hash; the PDF is None if Typst is not available."""
+        report = _as_dict(report)
+        files: Dict[str, Optional[Path]] = {}
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if 'html' in formats:
+            page = self.html(report)
+            path = self.output_dir / f"{_hash(page)[:16]}.html"
+            if not path.exists():
+                path.write_text(page, encoding='utf-8')
+            files['html'] = path
+        if 'pdf' in formats:
+            files['pdf'] = None
+            if typst_available():
+                document = self.typst(report)
+                path = self.output_dir / f"{_hash(document)[:16]}.pdf"
+                # An unchanged document is not compiled again
+                files['pdf'] = path if path.exists() else compile_pdf(document, path)
+        return files
+
+    def submit(self, report: Any, formats: Iterable[str] = ('html', 'pdf')) -> Future:
+        """Render on the renderer's thread pool; the future holds the result of :meth:`render`."""
+        return self._executor.submit(self.render, _as_dict(report), tuple(formats))
+
+    def stats(self) -> Dict[str, Any]:
+        """Section cache hit rate and the number of sections rendered by this instance."""
+        with self._lock:
+            rendered = self.rendered
+        return {**self.cache.stats(), 'sections_rendered': rendered}
+
+
+_shared: Optional[ReportRenderer] = None
+_shared_lock = threading.Lock()
+
+
+def shared_renderer() -> ReportRenderer:
+    """The report renderer used by the app."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ReportRenderer()
+        return _shared
@@ -1,7 +1,11 @@
-from typing import Annotated, List, Literal, TypedDict
+from dataclasses import dataclass
+from typing import Annotated, Any, Dict, List, Literal, Optional, TypedDict
 
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
+from pydantic import BaseModel, Field, field_validator
+
+from brocc_li.nutrition import to_number
 
 USER_INSTRUCTIONS_MARKDOWN: str = """
 ### Planning Your Diet
@@ -26,3 +30,159 @@ Chat = List[ChatItem]
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
+
+
+@dataclass
+class StoreInfo:
+    name: str
+    address: str
+    distance: float
+    rating: Optional[float]
+    phone: Optional[str]
+    website: Optional[str]
+
+@dataclass
+class ProductInfo:
+    name: str
+    price: float
+    store: str
+    availability: bool
+    unit: str
+    brand: Optional[str] = None
+
+@dataclass
+class CouponInfo:
+    code: str
+    description: str
+    discount: str
+    expiry_date: Optional[str]
+    store: str
+    conditions: Optional[str] = None
+
+@dataclass
+class RecipeInfo:
+    title: str
+    ingredients: List[str]
+    instructions: List[str]
+    prep_time: Optional[str]
+    cook_time: Optional[str]
+    servings: Optional[int]
+    source: str
+    url: str
+
+@dataclass
+class NutritionalInfo:
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    fiber: float
+    sugar: float
+    sodium: float
+
+@dataclass
+class MealPlan:
+    day: str
+    meals: Dict[str, Dict[str, Any]]  # breakfast, lunch, dinner, snacks
+    total_nutrition: NutritionalInfo
+    total_cost: float
+
+@dataclass
+class ShoppingItem:
+    name: str
+    quantity: str
+    estimated_price: float
+    store: str
+    category: str
+    notes: Optional[str] = None
+
+@dataclass
+class DietReport:
+    user_info: Dict[str, Any]
+    meal_plan: List[MealPlan]
+    shopping_list: List[ShoppingItem]
+    total_weekly_cost: float
+    nutritional_summary: Dict[str, Any]
+    recommendations: List[str]
+    generated_date: str
+
+
+# Schemas for structured LLM output. Numbers are coerced leniently ("15 g", "2,50 €"),
+# everything else is validated strictly so that broken days can be found and repaired.
+
+def _lenient_number(value: Any) -> Any:
+    if isinstance(value, str):
+        if not any(char.isdigit() for char in value):
+            raise ValueError(f"{value!r} is not a number")
+        return to_number(value)
+    return value
+
+
+class NutritionSchema(BaseModel):
+    calories: float = Field(ge=0)
+    protein: float = Field(default=0, ge=0)
+    carbs: float = Field(default=0, ge=0)
+    fat: float = Field(default=0, ge=0)
+    fiber: Optional[float] = Field(default=None, ge=0)
+    sugar: Optional[float] = Field(default=None, ge=0)
+    sodium: Optional[float] = Field(default=None, ge=0)
+
+    @field_validator('*', mode='before')
+    @classmethod
+    def _number(cls, value: Any) -> Any:
+        return _lenient_number(value)
+
+
+class MealSchema(BaseModel):
+    name: str = Field(min_length=1)
+    ingredients: List[str] = Field(min_length=1)
+    # Computed from the ingredient quantities when the food database knows them
+    nutrition: Optional[NutritionSchema] = None
+    cost: Optional[float] = Field(default=None, ge=0)
+    prep_time: Optional[str] = None
+
+    @field_validator('cost', mode='before')
+    @classmethod
+    def _cost(cls, value: Any) -> Any:
+        return _lenient_number(value)
+
+
+class DayMealsSchema(BaseModel):
+    breakfast: MealSchema
+    lunch: MealSchema
+    dinner: MealSchema
+    snacks: List[MealSchema] = Field(default_factory=list)
+
+
+class PlanDaySchema(BaseModel):
+    day: str = Field(min_length=1)
+    meals: DayMealsSchema
+    total_nutrition: Optional[NutritionSchema] = None
+    total_cost: float = Field(ge=0)
+
+    @field_validator('total_cost', mode='before')
+    @classmethod
+    def _cost(cls, value: Any) -> Any:
+        return _lenient_number(value)
+
+
+class MealPlanSchema(BaseModel):
+    meal_plan: List[PlanDaySchema]
+
+
+class PreferencesSchema(BaseModel):
+    calories: Optional[float] = Field(default=None, description="Daily calorie target")
+    protein: Optional[float] = Field(default=None, description="Daily protein target in grams")
+    allergies: List[str] = Field(default_factory=list)
+    likes: List[str] = Field(default_factory=list)
+    dislikes: List[str] = Field(default_factory=list)
+    budget: Optional[float] = Field(default=None, description="Daily food budget in euros")
+
+    @field_validator('calories', 'protein', 'budget', mode='before')
+    @classmethod
+    def _number(cls, value: Any) -> Any:
+        return _lenient_number(value)
+
+
+class RecommendationsSchema(BaseModel):
+    recommendations: List[str] = Field(min_length=1)
@@ -1,17 +1,69 @@
-import json
+import atexit
 import os
+import re
+import threading
 import time
-from typing import List, Dict, Optional, Any, Union
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from typing import Callable, List, Dict, Optional, Any, Set, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from datetime import datetime
 import urllib.parse
-import urllib.request
 
 import streamlit as st
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from langchain_google_genai import ChatGoogleGenerativeAI
+import numpy as np
+from pydantic import ValidationError
 import requests
-from bs4 import BeautifulSoup
+
+from brocc_li.browser_pool import DriverPool
+from brocc_li.cache import SQLiteCache
+from brocc_li.coupon_index import CouponIndex
+from brocc_li.extractors import extract_coupons, extract_products, extract_recipes
+from brocc_li.food_db import fill_nutrition
+from brocc_li.geo import (
+    geohash_bbox,
+    geohash_encode,
+    geohashes_in_radius,
+    haversine_km,
+    nearest_k,
+)
+from brocc_li.http_cache import CachedSession, ResponseCache
+from brocc_li.http_client import CircuitOpenError, HostBreakers, mount_resilient
+from brocc_li.ingredients import (
+    CATEGORIES as INGREDIENT_CATEGORIES,
+    ESTIMATED_PRICES,
+    categorize_many as categorize_ingredients,
+)
+from brocc_li.meal_plan import (
+    day_index,
+    extract_json,
+    generate_meal_plan,
+    generate_week,
+    invoke_structured,
+    salvage_meal_plan,
+    stream_meal_plan,
+    WEEKDAYS,
+)
+from brocc_li.nutrition import summarize as summarize_nutrition
+from brocc_li.osm_index import OfflineStoreIndex, load_index as load_osm_index
+from brocc_li.plan_cache import shared_plan_cache
+from brocc_li.playwright_engine import PlaywrightScraper
+from brocc_li.price_store import PriceStore, normalize_product
+from brocc_li.recipe_index import RecipeIndex, matches_filters
+from brocc_li.schemas import (
+    CouponInfo,
+    DietReport,
+    MealPlan,
+    NutritionalInfo,
+    PreferencesSchema,
+    ProductInfo,
+    RecipeInfo,
+    RecommendationsSchema,
+    ShoppingItem,
+    StoreInfo,
+)
 
 # Optional imports with error handling
 try:
@@ -48,204 +100,467 @@ try:
 except NameError:
     pass
 
-@dataclass
-class StoreInfo:
-    name: str
-    address: str
-    distance: float
-    rating: Optional[float]
-    phone: Optional[str]
-    website: Optional[str]
-
-@dataclass
-class ProductInfo:
-    name: str
-    price: float
-    store: str
-    availability: bool
-    unit: str
-    brand: Optional[str] = None
-
-@dataclass
-class CouponInfo:
-    code: str
-    description: str
-    discount: str
-    expiry_date: Optional[str]
-    store: str
-    conditions: Optional[str] = None
-
-@dataclass
-class RecipeInfo:
-    title: str
-    ingredients: List[str]
-    instructions: List[str]
-    prep_time: Optional[str]
-    cook_time: Optional[str]
-    servings: Optional[int]
-    source: str
-    url: str
-
-@dataclass
-class NutritionalInfo:
-    calories: float
-    protein: float
-    carbs: float
-    fat: float
-    fiber: float
-    sugar: float
-    sodium: float
-
-@dataclass
-class MealPlan:
-    day: str
-    meals: Dict[str, Dict[str, Any]]  # breakfast, lunch, dinner, snacks
-    total_nutrition: NutritionalInfo
-    total_cost: float
-
-@dataclass
-class ShoppingItem:
-    name: str
-    quantity: str
-    estimated_price: float
-    store: str
-    category: str
-    notes: Optional[str] = None
-
-@dataclass
-class DietReport:
-    user_info: Dict[str, Any]
-    meal_plan: List[MealPlan]
-    shopping_list: List[ShoppingItem]
-    total_weekly_cost: float
-    nutritional_summary: Dict[str, Any]
-    recommendations: List[str]
-    generated_date: str
+_LAT_LON_PATTERN = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+# Geocoding results rarely change, so keep them for a month
+GEOCODE_CACHE_TTL = 30 * 24 * 3600
+GEOCODE_CACHE_MAX_ENTRIES = 10_000
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+# Overpass results are cached per geohash tile (~5 km at precision 5) and store category.
+# Stale tiles are still served while a background refresh fetches them again.
+TILE_PRECISION = 5
+TILE_REFRESH_AFTER = 24 * 3600
+TILE_CACHE_TTL = 14 * 24 * 3600
+TILE_CACHE_MAX_ENTRIES = 50_000
+
+STORE_CATEGORIES = {
+    'grocery': ['supermarket', 'convenience'],
+}
+
+# List of German grocery store websites
+STORE_SEARCH_URLS = {
+    'Rewe': 'https://shop.rewe.de',
+    'Aldi': 'https://www.aldi-sued.de',
+    'Lidl': 'https://www.lidl.de',
+    'Edeka': 'https://www.edeka.de'
+}
+
+# Store websites are queried concurrently; results that miss the deadline are reported as timeouts
+FAN_OUT_WORKERS = 16
+PRICE_SEARCH_DEADLINE = 12
+COMPARISON_DEADLINE = 30
+
+# Prices are read from the local price store first. Prices older than PRICE_REFRESH_AFTER
+# seconds are still served while a background lookup refreshes them.
+PRICE_REFRESH_AFTER = float(os.getenv("BROCC_LI_PRICE_MAX_AGE", str(12 * 3600)))
+PRICE_REFRESH_WORKERS = 4
+# Share of the searched product's words a listed product name must contain to count as a match
+PRODUCT_MATCH_MIN_OVERLAP = 0.5
+# Shorter words only match whole words; longer ones also match inside compounds ("milch" in "Vollmilch")
+PRODUCT_MATCH_MIN_PART = 4
+
+# Refresh stale prices and coupons from inside the app; turn off when the crawler worker
+# (python -m brocc_li.crawler run) keeps the local stores fresh instead
+BACKGROUND_REFRESH = os.getenv("BROCC_LI_BACKGROUND_REFRESH", "1") != "0"
+
+# Popular recipe websites
+RECIPE_SITES = [
+    'https://www.allrecipes.com',
+    'https://www.foodnetwork.com',
+    'https://www.epicurious.com',
+    'https://www.chefkoch.de',  # German recipe site
+    'https://www.lecker.de'     # German recipe site
+]
+
+# Each recipe site gets its own time budget; the search stops early once enough recipes are found
+RECIPE_SITE_BUDGET = 6
+RECIPE_SEARCH_DEADLINE = RECIPE_SITE_BUDGET + 1
+RECIPE_MAX_RESULTS = 10
+
+# Headless browser pool for scrape_store_website
+BROWSER_POOL_SIZE = int(os.getenv("BROCC_LI_BROWSER_POOL_SIZE", "2"))
+BROWSER_POOL_MIN_IDLE = int(os.getenv("BROCC_LI_BROWSER_POOL_MIN_IDLE", "1"))
+BROWSER_MAX_PAGES = 50
+BROWSER_IDLE_TIMEOUT = 600
+SCRAPE_PAGE_TIMEOUT = 30
+
+# Scraping backend for scrape_store_website: 'selenium' or 'playwright'
+SCRAPER_BACKEND = os.getenv("BROCC_LI_SCRAPER_BACKEND", "selenium")
+PLAYWRIGHT_MAX_CONCURRENCY = 4
+
+# Example coupon websites
+COUPON_SITES = [
+    'https://www.rabattcode.de',
+    'https://www.gutscheine.de',
+    'https://www.sparwelt.de'
+]
+
+# Coupon sites are scraped into the local coupon index in the background; the coupon tools
+# only query the index. Expired coupons are evicted every COUPON_EVICT_INTERVAL seconds.
+COUPON_REFRESH_INTERVAL = 6 * 3600
+COUPON_REFRESH_DEADLINE = 20
+COUPON_EVICT_INTERVAL = 15 * 60
+
+# Freshness of cached pages per site group; stale pages are revalidated with ETag/Last-Modified.
+# Pages evicted from memory spill to SQLite so other sessions and restarts can reuse them.
+STORE_CACHE_TTL = 6 * 3600
+COUPON_CACHE_TTL = 24 * 3600
+RECIPE_CACHE_TTL = 24 * 3600
+HTTP_CACHE_SPILL = os.getenv("BROCC_LI_HTTP_CACHE_SPILL", "1") != "0"
+HTTP_SPILL_TTL = 7 * 24 * 3600
+
+# Outbound HTTP: connections kept per host, bounded retries with jittered backoff, and a
+# per-host circuit breaker that fails fast for BREAKER_COOLDOWN seconds once a host has
+# failed BREAKER_FAILURE_THRESHOLD requests in a row (after retries).
+HTTP_POOL_SIZE = 4
+HTTP_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.3
+HTTP_BACKOFF_MAX = 3
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 60
+MAP_POOL_SIZES = {
+    'nominatim.openstreetmap.org': 1,  # Nominatim allows one request per second anyway
+    'overpass-api.de': 2,
+}
+
+# How generate_diet_report generates the meal plan (see brocc_li.meal_plan):
+# 'stream' reads the model's token stream so each day can be shown as soon as it is complete,
+# 'parallel' plans the week and generates its days concurrently (lowest total time, more calls),
+# 'single' waits for one blocking call
+MEAL_PLAN_MODE = os.getenv("BROCC_LI_MEAL_PLAN_MODE", "stream")
+MEAL_PLAN_CONCURRENCY = int(os.getenv("BROCC_LI_MEAL_PLAN_CONCURRENCY", "4"))
+MEAL_PLAN_REPAIR_ROUNDS = 2
+
+# Generated plans are reused for profiles with the same preferences fingerprint
+# (see brocc_li.plan_cache); BROCC_LI_PLAN_CACHE=0 always generates a new plan
+PLAN_CACHE_ENABLED = os.getenv("BROCC_LI_PLAN_CACHE", "1") != "0"
+
+# Shown when the model returns no usable recommendations
+DEFAULT_RECOMMENDATIONS = [
+    "Consider meal prepping on weekends to save time during the week",
+    "Buy ingredients in bulk when possible to reduce costs",
+    "Plan meals around seasonal produce for better prices",
+    "Use leftovers creatively to minimize food waste",
+]
+
+# Breakers are shared by every outbound session, so a host that is down fails fast everywhere
+HTTP_BREAKERS = HostBreakers(failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN)
+
+
+def _store_chain(name: str, brand: Optional[str] = None) -> Optional[str]:
+    """Map an OSM store name/brand (e.g. "ALDI SÜD", "REWE City") to a key of STORE_SEARCH_URLS."""
+    text = f"{name} {brand or ''}".lower()
+    for chain in STORE_SEARCH_URLS:
+        if chain.lower() in text:
+            return chain
+    return None
+
+
+def _hostnames(urls) -> List[str]:
+    return [urllib.parse.urlparse(url).hostname for url in urls]
+
+
+def _mount_http(session: requests.Session, pool_sizes: Dict[str, int], **options: Any) -> requests.Session:
+    return mount_resilient(
+        session,
+        HTTP_BREAKERS,
+        pool_sizes,
+        default_pool_size=HTTP_POOL_SIZE,
+        retries=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_max=HTTP_BACKOFF_MAX,
+        **options,
+    )
+
 
 class FreeMapServices:
     """Free mapping services that don't require API keys."""
-    
+
+    _geocode_cache: Optional[SQLiteCache] = None
+    _tile_cache: Optional[SQLiteCache] = None
+    _refreshing: Set[Tuple[str, str]] = set()
+    _refresh_lock = threading.Lock()
+    _offline_index: Optional[OfflineStoreIndex] = None
+    _offline_index_loaded = False
+    _session: Optional[requests.Session] = None
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        """HTTP session for Nominatim and Overpass, shared by every session in this process."""
+        if cls._session is None:
+            session = requests.Session()
+            # Add proper headers to avoid being blocked
+            session.headers.update({'User-Agent': 'Brocc-Li Diet Assistant/1.0'})
+            # Overpass queries are POSTed but read-only, so they are safe to retry
+            cls._session = _mount_http(
+                session, MAP_POOL_SIZES, allowed_methods={'GET', 'POST'}
+            )
+        return cls._session
+
+    @classmethod
+    def offline_index(cls) -> Optional[OfflineStoreIndex]:
+        """Offline store index from BROCC_LI_OSM_INDEX, if one has been built."""
+        if not cls._offline_index_loaded:
+            cls._offline_index = load_osm_index()
+            cls._offline_index_loaded = True
+        return cls._offline_index
+
+    @classmethod
+    def geocode_cache(cls) -> SQLiteCache:
+        """Geocoding cache shared by every session in this process."""
+        if cls._geocode_cache is None:
+            cls._geocode_cache = SQLiteCache(
+                "geocode",
+                ttl=GEOCODE_CACHE_TTL,
+                max_entries=GEOCODE_CACHE_MAX_ENTRIES,
+            )
+        return cls._geocode_cache
+
+    @staticmethod
+    def geocode_cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters of the geocoding cache (each hit is one Nominatim call saved)."""
+        return FreeMapServices.geocode_cache().stats()
+
+    @staticmethod
+    def _normalize_location(location: str) -> str:
+        location = re.sub(r"\s*,\s*", ", ", location.lower())
+        return " ".join(location.split()).strip(" ,.")
+
+    @staticmethod
+    def _parse_coordinates(location: str) -> Optional[Dict[str, float]]:
+        """Parse literal "lat,lon" input without any network call."""
+        match = _LAT_LON_PATTERN.match(location)
+        if not match:
+            return None
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return {'lat': lat, 'lon': lon}
+        return None
+
     @staticmethod
     def geocode_location(location: str) -> Optional[Dict[str, float]]:
-        """Geocode location using OpenStreetMap Nominatim (free)."""
+        """Geocode location using OpenStreetMap Nominatim (free), with a persistent cache."""
+        coords = FreeMapServices._parse_coordinates(location)
+        if coords:
+            return coords
+
+        index = FreeMapServices.offline_index()
+        coords = index.geocode(location) if index else None
+        if coords:
+            return coords
+
+        cache = FreeMapServices.geocode_cache()
+        cache_key = FreeMapServices._normalize_location(location)
+        coords = cache.get(cache_key)
+        if coords:
+            return coords
+
         try:
             # Use Nominatim for geocoding
-            base_url = "https://nominatim.openstreetmap.org/search"
             params = {
                 'q': location,
                 'format': 'json',
                 'limit': 1
             }
             
-            url = f"{base_url}?{urllib.parse.urlencode(params)}"
+            response = FreeMapServices.session().get(NOMINATIM_URL, params=params, timeout=10)
+            response.raise_for_status()
+            data = response.json()
             
-            # Add proper headers to avoid being blocked
-            headers = {
-                'User-Agent': 'Brocc-Li Diet Assistant/1.0'
-            }
-            
-            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
-                data = json.loads(response.read().decode())
-                
-                if data:
-                    result = data[0]
-                    return {
-                        'lat': float(result['lat']),
-                        'lon': float(result['lon'])
-                    }
+            if data:
+                result = data[0]
+                coords = {
+                    'lat': float(result['lat']),
+                    'lon': float(result['lon'])
+                }
+                cache.set(cache_key, coords)
+                return coords
         except Exception as e:
             st.warning(f"Geocoding failed: {e}")
         
         return None
     
+    @classmethod
+    def tile_cache(cls) -> SQLiteCache:
+        """Overpass results per (store category, geohash tile), shared by every session."""
+        if cls._tile_cache is None:
+            cls._tile_cache = SQLiteCache(
+                "overpass_tiles",
+                ttl=TILE_CACHE_TTL,
+                max_entries=TILE_CACHE_MAX_ENTRIES,
+            )
+        return cls._tile_cache
+
+    @staticmethod
+    def tile_cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters of the Overpass tile cache."""
+        return FreeMapServices.tile_cache().stats()
+
+    @staticmethod
+    def _fetch_tiles(tiles: List[str], category: str) -> Dict[str, List[Dict]]:
+        """Fetch all stores of ``category`` inside ``tiles`` with one Overpass query."""
+        bboxes = [geohash_bbox(tile) for tile in tiles]
+        south = min(b[0] for b in bboxes)
+        west = min(b[1] for b in bboxes)
+        north = max(b[2] for b in bboxes)
+        east = max(b[3] for b in bboxes)
+
+        selectors = "\n".join(
+            f'  nwr["shop"="{shop}"]({south},{west},{north},{east});'
+            for shop in STORE_CATEGORIES[category]
+        )
+        overpass_query = f"""
+            [out:json][timeout:25];
+            (
+            {selectors}
+            );
+            out center;
+            """
+
+        response = FreeMapServices.session().post(OVERPASS_URL, data=overpass_query, timeout=30)
+        response.raise_for_status()
+
+        # Bucket the elements back into the requested tiles
+        results: Dict[str, List[Dict]] = {tile: [] for tile in tiles}
+        for element in response.json().get('elements', []):
+            if 'tags' not in element:
+                continue
+            point = element if 'lat' in element else element.get('center')
+            if not point:
+                continue
+            tile = geohash_encode(point['lat'], point['lon'], TILE_PRECISION)
+            if tile in results:
+                results[tile].append({
+                    'lat': point['lat'],
+                    'lon': point['lon'],
+                    'tags': element['tags'],
+                })
+        return results
+
+    @staticmethod
+    def _store_tiles(tiles: List[str], category: str) -> Dict[str, List[Dict]]:
+        results = FreeMapServices._fetch_tiles(tiles, category)
+        cache = FreeMapServices.tile_cache()
+        for tile, elements in results.items():
+            cache.set(f"{category}:{tile}", elements)
+        return results
+
+    @classmethod
+    def _refresh_tiles_in_background(cls, tiles: List[str], category: str) -> None:
+        """Re-fetch stale tiles without blocking the caller."""
+        with cls._refresh_lock:
+            tiles = [tile for tile in tiles if (category, tile) not in cls._refreshing]
+            cls._refreshing.update((category, tile) for tile in tiles)
+        if not tiles:
+            return
+
+        def refresh():
+            try:
+                cls._store_tiles(tiles, category)
+            except Exception:
+                # Stale tiles stay usable; the next lookup retries the refresh
+                pass
+            finally:
+                with cls._refresh_lock:
+                    cls._refreshing.difference_update((category, tile) for tile in tiles)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    @staticmethod
+    def _load_elements(coords: Dict[str, float], radius: int, category: str) -> List[Dict]:
+        """Load the store elements of every tile covering ``radius`` around ``coords``."""
+        cache = FreeMapServices.tile_cache()
+        tiles = geohashes_in_radius(coords['lat'], coords['lon'], radius, TILE_PRECISION)
+
+        elements = []
+        missing = []
+        stale = []
+        now = time.time()
+        for tile in tiles:
+            entry = cache.get_entry(f"{category}:{tile}")
+            if entry is None:
+                missing.append(tile)
+                continue
+            elements.extend(entry['value'])
+            if now - entry['stored_at'] > TILE_REFRESH_AFTER:
+                stale.append(tile)
+
+        if missing:
+            for tile_elements in FreeMapServices._store_tiles(missing, category).values():
+                elements.extend(tile_elements)
+        if stale:
+            FreeMapServices._refresh_tiles_in_background(stale, category)
+
+        return elements
+
+    @staticmethod
+    def _offline_place(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'name': row['name'],
+            'address': (row['street'] or '') + ' ' + (row['housenumber'] or ''),
+            'distance': row['distance'],
+            'rating': None,  # Not available in OSM
+            'phone': row['phone'],
+            'website': row['website'],
+            'opening_hours': row['opening_hours'],
+            'brand': row['brand']
+        }
+
     @staticmethod
-    def search_nearby_places(location: str, query: str, radius: int = 5000) -> List[Dict]:
-        """Search for nearby places using OpenStreetMap Overpass API (free)."""
+    def _matches_name(tags: Dict[str, str], name: Optional[str]) -> bool:
+        if 'name' not in tags:
+            return False
+        if not name:
+            return True
+        needle = name.lower()
+        return needle in tags['name'].lower() or needle in tags.get('brand', '').lower()
+
+    @staticmethod
+    def search_nearby_places(location: str, query: str, radius: int = 5000, limit: int = 10,
+                             name: Optional[str] = None) -> List[Dict]:
+        """Search for nearby places using OpenStreetMap Overpass API (free), nearest first.
+
+        Answered from the offline store index instead when it covers the location.
+        ``name`` restricts the results to stores whose name or brand contains it.
+        """
         try:
             # First geocode the location
             coords = FreeMapServices.geocode_location(location)
             if not coords:
                 return []
-            
-            # Use Overpass API to search for places
-            overpass_url = "https://overpass-api.de/api/interpreter"
-            
-            # Search for supermarkets and grocery stores
-            overpass_query = f"""
-            [out:json][timeout:25];
-            (
-              node["shop"="supermarket"](around:{radius},{coords['lat']},{coords['lon']});
-              node["shop"="convenience"](around:{radius},{coords['lat']},{coords['lon']});
-              way["shop"="supermarket"](around:{radius},{coords['lat']},{coords['lon']});
-              way["shop"="convenience"](around:{radius},{coords['lat']},{coords['lon']});
-            );
-            out body;
-            >;
-            out skel qt;
-            """
-            
-            headers = {
-                'User-Agent': 'Brocc-Li Diet Assistant/1.0'
-            }
-            
-            response = requests.post(overpass_url, data=overpass_query, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                places = []
-                
-                for element in data.get('elements', []):
-                    if element['type'] == 'node' and 'tags' in element:
-                        tags = element['tags']
-                        if 'name' in tags:
-                            # Calculate approximate distance (simplified)
-                            distance = FreeMapServices._calculate_distance(
-                                coords['lat'], coords['lon'],
-                                element['lat'], element['lon']
-                            )
-                            
-                            place_info = {
-                                'name': tags.get('name', 'Unknown Store'),
-                                'address': tags.get('addr:street', '') + ' ' + tags.get('addr:housenumber', ''),
-                                'distance': distance,
-                                'rating': None,  # Not available in OSM
-                                'phone': tags.get('phone'),
-                                'website': tags.get('website'),
-                                'opening_hours': tags.get('opening_hours'),
-                                'brand': tags.get('brand')
-                            }
-                            places.append(place_info)
-                
-                return places[:10]  # Return top 10 results
-                
+
+            index = FreeMapServices.offline_index()
+            if index and index.covers(coords['lat'], coords['lon']):
+                rows = index.search(coords['lat'], coords['lon'], radius, limit, name=name)
+                return [FreeMapServices._offline_place(row) for row in rows]
+
+            # Search for supermarkets and grocery stores in the covering tiles
+            elements = FreeMapServices._load_elements(coords, radius, 'grocery')
+            named = [
+                element for element in elements
+                if FreeMapServices._matches_name(element['tags'], name)
+            ]
+            if not named:
+                return []
+
+            lats = np.fromiter((element['lat'] for element in named), dtype=np.float64, count=len(named))
+            lons = np.fromiter((element['lon'] for element in named), dtype=np.float64, count=len(named))
+            distances = haversine_km(coords['lat'], coords['lon'], lats, lons)
+
+            # Tiles cover more than the search circle, so apply the radius as a filter
+            within = np.flatnonzero(distances <= radius / 1000)
+            nearest = within[nearest_k(distances[within], limit)]
+
+            places = []
+            for index in nearest:
+                tags = named[index]['tags']
+                place_info = {
+                    'name': tags.get('name', 'Unknown Store'),
+                    'address': tags.get('addr:street', '') + ' ' + tags.get('addr:housenumber', ''),
+                    'distance': float(distances[index]),
+                    'rating': None,  # Not available in OSM
+                    'phone': tags.get('phone'),
+                    'website': tags.get('website'),
+                    'opening_hours': tags.get('opening_hours'),
+                    'brand': tags.get('brand')
+                }
+                places.append(place_info)
+
+            return places
+
         except Exception as e:
             st.warning(f"Place search failed: {e}")
-        
+
         return []
-    
-    @staticmethod
-    def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two points using Haversine formula."""
-        import math
-        
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat / 2) ** 2 +
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        return R * c
 
 class WebSearchTools:
-    def __init__(self):
-        self.driver = None
+    def __init__(self, background_refresh: bool = BACKGROUND_REFRESH, prewarm_browsers: bool = True):
         self.ua = None
-        self.session = requests.Session()
+        self.background_refresh = background_refresh
+        self.session = CachedSession()
         
         # Initialize UserAgent if available
         if FAKE_USERAGENT_AVAILABLE and UserAgent:
@@ -257,52 +572,392 @@ class WebSearchTools:
         else:
             self.session.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
         
-        # Store data cache
-        self.store_cache = {}
-        self.coupon_cache = {}
-        self.recipe_cache = {}
-        
-    def _get_selenium_driver(self):
+        # Store data cache: HTTP responses per site group, with their own freshness policy
+        spill = SQLiteCache("http_responses", ttl=HTTP_SPILL_TTL) if HTTP_CACHE_SPILL else None
+        self.store_cache = ResponseCache(ttl=STORE_CACHE_TTL, spill=spill)
+        self.coupon_cache = ResponseCache(ttl=COUPON_CACHE_TTL, spill=spill)
+        self.recipe_cache = ResponseCache(ttl=RECIPE_CACHE_TTL, spill=spill)
+        self.session.mount_cache(_hostnames(STORE_SEARCH_URLS.values()), self.store_cache)
+        self.session.mount_cache(_hostnames(COUPON_SITES), self.coupon_cache)
+        self.session.mount_cache(_hostnames(RECIPE_SITES), self.recipe_cache)
+
+        # Per-host pools, retries and circuit breakers; store sites get one connection per fan-out worker
+        _mount_http(self.session, {host: FAN_OUT_WORKERS for host in _hostnames(STORE_SEARCH_URLS.values())})
+
+        # Warm headless browsers shared by every session; the pool size caps scraping concurrency
+        self.driver_pool = DriverPool(
+            self._new_selenium_driver,
+            max_size=BROWSER_POOL_SIZE,
+            min_idle=BROWSER_POOL_MIN_IDLE,
+            max_pages=BROWSER_MAX_PAGES,
+            idle_timeout=BROWSER_IDLE_TIMEOUT,
+        )
+        if prewarm_browsers and SELENIUM_AVAILABLE and SCRAPER_BACKEND == 'selenium':
+            self.driver_pool.prewarm()
+
+        # Playwright backend, started on first use
+        self.playwright: Optional[PlaywrightScraper] = None
+        self._playwright_lock = threading.Lock()
+        atexit.register(self._cleanup_driver)
+
+        # Shared pool for concurrent outbound requests
+        self.executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="brocc-li-web")
+
+        # Local price time series; stale prices are refreshed off the request path
+        self.prices = PriceStore()
+        self._refreshing_prices: Set[Tuple[str, str]] = set()
+        self._refresh_lock = threading.Lock()
+        self.refresh_executor = ThreadPoolExecutor(
+            max_workers=PRICE_REFRESH_WORKERS, thread_name_prefix="brocc-li-prices"
+        )
+
+        # Local recipe index (see ``python -m brocc_li.recipe_index``); live results are added to it
+        self.recipe_index = RecipeIndex(os.getenv("BROCC_LI_RECIPE_INDEX"))
+
+        # Local coupon index, kept up to date by a background thread
+        self.coupons = CouponIndex()
+        self._coupon_lock = threading.Lock()
+        if background_refresh:
+            threading.Thread(target=self._refresh_coupons_forever, daemon=True).start()
+
+    @staticmethod
+    def breaker_state(url: str) -> str:
+        """Circuit breaker state of the host serving ``url``."""
+        return HTTP_BREAKERS.state(url)
+
+    @staticmethod
+    def breaker_stats() -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state and counters per host contacted so far."""
+        return HTTP_BREAKERS.stats()
+
+    @staticmethod
+    def _timed(call: Callable[[], Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            outcome = {'status': 'ok', 'value': call()}
+        except CircuitOpenError as e:
+            outcome = {'status': 'circuit_open', 'error': str(e)}
+        except (TimeoutError, requests.Timeout) as e:
+            outcome = {'status': 'timeout', 'error': str(e)}
+        except Exception as e:
+            outcome = {'status': 'error', 'error': str(e)}
+        outcome['elapsed'] = round(time.monotonic() - started, 3)
+        return outcome
+
+    def fan_out(self, calls: Dict[str, Callable[[], Any]], deadline: float,
+                enough: Optional[Callable[[Dict[str, Dict[str, Any]]], bool]] = None,
+                cancel: Optional[threading.Event] = None) -> Dict[str, Dict[str, Any]]:
+        """Run ``calls`` concurrently and collect whatever finished within ``deadline`` seconds.
+
+        Returns one entry per call, in call order: ``{"status": "ok", "value": ...}``,
+        ``{"status": "error" | "timeout" | "circuit_open", "error": ...}`` (both with ``elapsed`` seconds),
+        or ``{"status": "timeout"}`` if the call missed the deadline. If ``enough`` returns True for the outcomes so far,
+        the remaining calls are marked ``"cancelled"`` and ``cancel`` is set so that
+        calls watching it can abort their in-flight requests.
+        """
+        futures = {self.executor.submit(self._timed, call): key for key, call in calls.items()}
+        stop_at = time.monotonic() + deadline
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        pending = set(futures)
+        stopped_early = False
+
+        while pending:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcomes[futures[future]] = future.result()
+            if enough is not None and pending and enough(outcomes):
+                stopped_early = True
+                break
+
+        if pending and cancel is not None:
+            cancel.set()
+        for future in pending:
+            # Requests already in flight finish in the background and are discarded
+            future.cancel()
+            outcomes[futures[future]] = {'status': 'cancelled' if stopped_early else 'timeout'}
+
+        return {key: outcomes[key] for key in calls}
+
+    def fetch_page(self, url: str, budget: float, cancel: Optional[threading.Event] = None) -> Optional[bytes]:
+        """GET ``url`` within ``budget`` seconds, aborting the download once ``cancel`` is set."""
+        started = time.monotonic()
+        with self.session.get(url, timeout=budget, stream=True) as response:
+            if response.status_code != 200:
+                return None
+
+            chunks = []
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                if cancel is not None and cancel.is_set():
+                    raise RuntimeError("cancelled")
+                if time.monotonic() - started > budget:
+                    raise TimeoutError(f"exceeded {budget}s budget")
+                chunks.append(chunk)
+            return b"".join(chunks)
+
+    @staticmethod
+    def recipe_search_url(site: str, query: str) -> str:
+        return f"{site}/search?{urllib.parse.urlencode({'q': query})}"
+
+    @staticmethod
+    def product_search_url(store_name: str, product_name: str) -> str:
+        return f"{STORE_SEARCH_URLS[store_name]}/search?{urllib.parse.urlencode({'q': product_name})}"
+
+    def fetch_recipes(self, site: str, query: str, budget: float,
+                      cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """Search one recipe website."""
+        search_url = self.recipe_search_url(site, query)
+        content = self.fetch_page(search_url, budget, cancel)
+        if content is None:
+            return []
+
+        # Extract recipe information with the site's extraction plugin
+        return extract_recipes(search_url, content, site)
+
+    def fetch_product_price(self, store_name: str, product_name: str) -> Optional[Dict[str, Any]]:
+        """Look up one product on one store website; None if the page lists no product matching its name.
+
+        Raises ``requests.HTTPError`` when the store does not answer with a
+        page (bot block, rate limit, server error), so that a failed lookup is
+        never recorded as "not listed".
+        """
+        search_url = self.product_search_url(store_name, product_name)
+
+        response = self.session.get(search_url, timeout=10)
+        if response.status_code != 200:
+            raise requests.HTTPError(f"{response.status_code} from {search_url}", response=response)
+
+        # Extract product information with the store's extraction plugin
+        products = extract_products(search_url, response.content, store_name)
+        return self.best_product_match(product_name, products)
+
+    @staticmethod
+    def best_product_match(product_name: str, products: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The listed product whose name shares the most words with ``product_name``.
+
+        Ties keep the store's own ranking, preferring products in stock. None
+        if no name contains at least PRODUCT_MATCH_MIN_OVERLAP of the words.
+        """
+        wanted = normalize_product(product_name).split()
+        if not wanted:
+            return None
+        best, best_key = None, None
+        for rank, product in enumerate(products):
+            words = normalize_product(product.get('name') or '').split()
+            found = sum(
+                any(word == token or (len(word) >= PRODUCT_MATCH_MIN_PART and word in token) for token in words)
+                for word in wanted
+            )
+            overlap = found / len(wanted)
+            if overlap < PRODUCT_MATCH_MIN_OVERLAP:
+                continue
+            key = (overlap, bool(product.get('availability', True)), -rank)
+            if best_key is None or key > best_key:
+                best, best_key = product, key
+        return best
+
+    @staticmethod
+    def _observed(product: Optional[Dict[str, Any]], observed_at: float) -> Optional[Dict[str, Any]]:
+        if product is None:
+            return None
+        return {**product, 'observed_at': datetime.fromtimestamp(observed_at).isoformat(timespec='seconds')}
+
+    def refresh_price(self, store_name: str, product_name: str) -> Optional[Dict[str, Any]]:
+        """Look up one product on one store website and record the result in the price store.
+
+        A failed lookup raises before anything is recorded, so the stored price stays.
+        """
+        product = self.fetch_product_price(store_name, product_name)
+        observed_at = time.time()
+        self.prices.record(store_name, product_name, product, observed_at)
+        return self._observed(product, observed_at)
+
+    def _refresh_prices_in_background(self, pairs: List[Tuple[str, str]]) -> None:
+        """Re-fetch stale (product, chain) prices without blocking the caller."""
+        with self._refresh_lock:
+            pairs = [pair for pair in pairs if pair not in self._refreshing_prices]
+            self._refreshing_prices.update(pairs)
+
+        def refresh(product: str, chain: str):
+            try:
+                self.refresh_price(chain, product)
+            except Exception:
+                # The stale price stays usable; the next lookup retries the refresh
+                pass
+            finally:
+                with self._refresh_lock:
+                    self._refreshing_prices.discard((product, chain))
+
+        for product, chain in pairs:
+            self.refresh_executor.submit(refresh, product, chain)
+
+    def lookup_prices(self, products: List[str], chains: List[str],
+                      deadline: float) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Price every (product, chain) pair, reading the price store first.
+
+        Stored prices are returned immediately (stale ones are refreshed in the
+        background); only pairs that were never looked up are fetched from the
+        store websites, concurrently within ``deadline``. Returns one
+        ``fan_out``-style outcome per pair.
+        """
+        stored = self.prices.bulk_latest(products, chains)
+        outcomes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        missing = {}
+        stale = []
+        for product in products:
+            for chain in chains:
+                entry = stored.get((normalize_product(product), chain))
+                if entry is None:
+                    missing[(product, chain)] = partial(self.refresh_price, chain, product)
+                    continue
+                outcomes[(product, chain)] = {
+                    'status': 'ok',
+                    'value': self._observed(entry['product'], entry['observed_at']),
+                    'elapsed': 0.0,
+                }
+                if entry['age'] > PRICE_REFRESH_AFTER:
+                    stale.append((product, chain))
+
+        if missing:
+            outcomes.update(self.fan_out(missing, deadline=deadline))
+        if stale and self.background_refresh:
+            self._refresh_prices_in_background(stale)
+
+        return {(product, chain): outcomes[(product, chain)] for product in products for chain in chains}
+
+    def fetch_coupons(self, site: str) -> List[Dict[str, Any]]:
+        """Scrape the current coupons of one coupon site."""
+        response = self.session.get(site, timeout=10)
+        response.raise_for_status()
+        return extract_coupons(site, response.content)
+
+    def due_coupon_sites(self, force: bool = False) -> List[str]:
+        """Coupon sites whose index entries are older than COUPON_REFRESH_INTERVAL (all with ``force``)."""
+        sources = self.coupons.sources()
+        now = time.time()
+        # Sites whose last refresh failed are retried on every round
+        return [
+            site for site in COUPON_SITES
+            if force or site not in sources or sources[site]['status'] != 'ok'
+            or now - sources[site]['refreshed_at'] > COUPON_REFRESH_INTERVAL
+        ]
+
+    def refresh_coupon_site(self, site: str) -> int:
+        """Scrape one coupon site into the coupon index; returns the number of live coupons found."""
+        try:
+            added = self.coupons.add(site, self.fetch_coupons(site))
+        except Exception as e:
+            self.coupons.record_refresh(site, 'circuit_open' if isinstance(e, CircuitOpenError) else 'error', str(e))
+            raise
+        self.coupons.record_refresh(site, 'ok', coupons=added)
+        return added
+
+    def refresh_coupons(self, force: bool = False) -> None:
+        """Scrape the coupon sites that are due (or all with ``force``) into the coupon index, concurrently."""
+        with self._coupon_lock:
+            due = self.due_coupon_sites(force)
+            if not due:
+                return
+
+            outcomes = self.fan_out(
+                {site: partial(self.refresh_coupon_site, site) for site in due},
+                deadline=COUPON_REFRESH_DEADLINE,
+            )
+            for site, outcome in outcomes.items():
+                if outcome['status'] in ('timeout', 'cancelled'):
+                    self.coupons.record_refresh(site, outcome['status'], outcome.get('error'))
+
+    def refresh_recipes(self, site: str, query: str) -> int:
+        """Search one recipe site and add the results to the local recipe index."""
+        return self.recipe_index.add(self.fetch_recipes(site, query, RECIPE_SITE_BUDGET))
+
+    def _refresh_coupons_forever(self) -> None:
+        while True:
+            try:
+                self.refresh_coupons()
+                self.coupons.evict_expired()
+            except Exception:
+                # Keep serving the coupons already indexed; the next round retries
+                pass
+            time.sleep(COUPON_EVICT_INTERVAL)
+
+    def _new_selenium_driver(self):
         """Initialize Selenium WebDriver with headless options."""
         if not SELENIUM_AVAILABLE:
             raise ImportError("Selenium is not available. Please install it with: pip install selenium")
         
-        if self.driver is None:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            if self.ua:
-                chrome_options.add_argument(f"--user-agent={self.ua.random}")
-            self.driver = webdriver.Chrome(options=chrome_options)
-        return self.driver
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        if self.ua:
+            chrome_options.add_argument(f"--user-agent={self.ua.random}")
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(SCRAPE_PAGE_TIMEOUT)
+        return driver
     
+    def scrape_with_selenium(self, url: str) -> Dict[str, Any]:
+        """Load a page in a pooled Selenium browser."""
+        with self.driver_pool.checkout() as driver:
+            started = time.monotonic()
+            driver.get(url)
+
+            # Wait for page to load
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+            load_time = time.monotonic() - started
+            self.driver_pool.record_page_load(load_time)
+
+            return {
+                'url': url,
+                'title': driver.title,
+                'html': driver.page_source,
+                'load_time': load_time,
+            }
+
+    def scrape_with_playwright(self, url: str) -> Dict[str, Any]:
+        """Load a page with the async Playwright backend, skipping images, fonts, media and trackers."""
+        with self._playwright_lock:
+            if self.playwright is None:
+                self.playwright = PlaywrightScraper(
+                    max_concurrency=PLAYWRIGHT_MAX_CONCURRENCY,
+                    page_timeout=SCRAPE_PAGE_TIMEOUT,
+                    user_agent=self.session.headers.get('User-Agent'),
+                )
+        return self.playwright.scrape(url)
+
     def _cleanup_driver(self):
-        """Clean up Selenium driver."""
-        if self.driver:
-            self.driver.quit()
-            self.driver = None
+        """Clean up the Selenium driver pool and the Playwright browser."""
+        self.driver_pool.close()
+        if self.playwright is not None:
+            self.playwright.close()
 
 def make_web_search_tools():
     """Create comprehensive web search tools."""
     web_tools = WebSearchTools()
     
     @tool
-    def search_nearby_stores(location: str, store_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    def search_nearby_stores(location: str, store_types: Optional[List[str]] = None,
+                             max_distance_km: Optional[float] = None) -> List[Dict[str, Any]]:
         """
-        Search for nearby grocery stores using free mapping services.
+        Search for nearby grocery stores using free mapping services, nearest first.
         
         Args:
             location: Address or coordinates to search from
             store_types: List of store types to search for (e.g., ['supermarket', 'grocery_store'])
+            max_distance_km: Maximum distance the user is willing to travel, in kilometers
         """
         if store_types is None:
             store_types = ['supermarket', 'grocery_store']
         
         stores = []
+        radius = int(max_distance_km * 1000) if max_distance_km else 5000
         
         # Use free mapping services
-        places = FreeMapServices.search_nearby_places(location, "supermarket")
+        places = FreeMapServices.search_nearby_places(location, "supermarket", radius=radius)
         
         for place in places:
             store_info = StoreInfo(
@@ -346,38 +1001,24 @@ def make_web_search_tools():
             location: Optional location for local store search
         """
         products = []
-        
-        # List of German grocery store websites
-        store_urls = {
-            'Rewe': 'https://shop.rewe.de',
-            'Aldi': 'https://www.aldi-sued.de',
-            'Lidl': 'https://www.lidl.de',
-            'Edeka': 'https://www.edeka.de'
-        }
-        
-        for store_name, base_url in store_urls.items():
-            try:
-                # This is a simplified example - actual implementation would need
-                # specific selectors for each store's website
-                search_url = f"{base_url}/search?q={product_name}"
-                
-                response = web_tools.session.get(search_url, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Extract product information (this would need to be customized per store)
-                    product_info = ProductInfo(
-                        name=product_name,
-                        price=0.0,  # Would extract actual price
-                        store=store_name,
-                        availability=True,  # Would check actual availability
-                        unit="piece"
-                    )
-                    products.append(product_info.__dict__)
-                    
-            except Exception as e:
-                st.warning(f"Could not search {store_name}: {str(e)}")
-        
+
+        # Known prices come from the price store; the other stores are queried at once,
+        # so a slow store only costs up to the shared deadline
+        outcomes = web_tools.lookup_prices(
+            [product_name], list(STORE_SEARCH_URLS), deadline=PRICE_SEARCH_DEADLINE
+        )
+
+        for (_, store_name), outcome in outcomes.items():
+            if outcome['status'] != 'ok':
+                # Report stores that timed out or failed so the answer can mention them
+                products.append({
+                    'store': store_name,
+                    **outcome,
+                    'breaker': web_tools.breaker_state(STORE_SEARCH_URLS[store_name])
+                })
+            elif outcome['value']:
+                products.append({**outcome['value'], 'status': 'ok'})
+
         return products
     
     @tool
@@ -387,124 +1028,158 @@ def make_web_search_tools():
         
         Args:
             store_name: Specific store to search for coupons
-            category: Category of products (e.g., 'groceries', 'dairy')
+            category: Category of products (proteins, vegetables, fruits, grains, dairy or pantry)
         """
-        coupons = []
-        
-        # Example coupon websites
-        coupon_sites = [
-            'https://www.rabattcode.de',
-            'https://www.gutscheine.de',
-            'https://www.sparwelt.de'
-        ]
-        
-        for site in coupon_sites:
-            try:
-                response = web_tools.session.get(site, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Extract coupon information (simplified)
-                    coupon_info = CouponInfo(
-                        code="EXAMPLE123",
-                        description="Sample discount",
-                        discount="10% off",
-                        expiry_date=(datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d"),
-                        store="Sample Store",
-                        conditions="Minimum purchase required"
-                    )
-                    coupons.append(coupon_info.__dict__)
-                    
-            except Exception as e:
-                st.warning(f"Could not search {site}: {str(e)}")
+        if not web_tools.coupons.sources():
+            # First run only: populate the index before answering
+            web_tools.refresh_coupons()
+
+        if category and category.lower() not in INGREDIENT_CATEGORIES:
+            # Broad categories like 'groceries' cover every coupon
+            category = None
+        coupons = web_tools.coupons.search(store=store_name, category=category)
+
+        # Report coupon sites whose last refresh failed so the answer can mention them
+        for site, source in web_tools.coupons.sources().items():
+            if source['status'] != 'ok':
+                coupons.append({
+                    'site': site,
+                    'status': source['status'],
+                    'error': source['error'],
+                    'breaker': web_tools.breaker_state(site)
+                })
         
         return coupons
     
+    @tool
+    def match_coupons_to_shopping_list(items: List[str],
+                                       store_names: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Find the coupons that apply to each item of a shopping list.
+        
+        Args:
+            items: Shopping list items (e.g., ['milk', 'chicken breast', 'rice'])
+            store_names: Only consider coupons for these stores
+        """
+        if not web_tools.coupons.sources():
+            web_tools.refresh_coupons()
+        return web_tools.coupons.match_shopping_list(items, stores=store_names)
+    
     @tool
     def search_recipes(query: str, dietary_restrictions: Optional[List[str]] = None, 
-                      max_time: Optional[int] = None) -> List[Dict[str, Any]]:
+                      max_time: Optional[int] = None, max_results: int = RECIPE_MAX_RESULTS) -> Dict[str, Any]:
         """
-        Search for recipes from popular cooking websites.
+        Search for recipes in the local recipe index and on popular cooking websites.
         
         Args:
             query: Recipe search query
             dietary_restrictions: List of dietary restrictions (e.g., ['vegetarian', 'gluten-free'])
-            max_time: Maximum cooking time in minutes
+            max_time: Maximum total (prep + cook) time in minutes
+            max_results: Stop searching once this many recipes have been found
         """
-        recipes = []
-        
-        # Popular recipe websites
-        recipe_sites = [
-            'https://www.allrecipes.com',
-            'https://www.foodnetwork.com',
-            'https://www.epicurious.com',
-            'https://www.chefkoch.de',  # German recipe site
-            'https://www.lecker.de'     # German recipe site
-        ]
-        
-        for site in recipe_sites:
-            try:
-                search_url = f"{site}/search?q={query}"
-                response = web_tools.session.get(search_url, timeout=10)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Extract recipe information (simplified)
-                    recipe_info = RecipeInfo(
-                        title=f"Sample Recipe from {site}",
-                        ingredients=["ingredient 1", "ingredient 2", "ingredient 3"],
-                        instructions=["Step 1", "Step 2", "Step 3"],
-                        prep_time="15 minutes",
-                        cook_time="30 minutes",
-                        servings=4,
-                        source=site,
-                        url=search_url
-                    )
-                    recipes.append(recipe_info.__dict__)
-                    
-            except Exception as e:
-                st.warning(f"Could not search {site}: {str(e)}")
-        
-        return recipes
+        # Answer from the local index first; the websites only fill up what it lacks
+        recipes = web_tools.recipe_index.search(query, dietary_restrictions, max_time, max_results)
+        local = len(recipes)
+        if local >= max_results:
+            return {
+                'recipes': recipes,
+                'sites': [],
+                'local': local
+            }
+
+        sites = []
+        seen = {recipe['url'] for recipe in recipes}
+        cancel = threading.Event()
+
+        def usable(found: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return [
+                recipe for recipe in found
+                if recipe['url'] not in seen and matches_filters(recipe, dietary_restrictions, max_time)
+            ]
+
+        def enough(outcomes: Dict[str, Dict[str, Any]]) -> bool:
+            found = sum(len(usable(o['value'])) for o in outcomes.values() if o['status'] == 'ok')
+            return local + found >= max_results
+
+        # Search every site at once, each within its own time budget
+        outcomes = web_tools.fan_out(
+            {
+                site: partial(web_tools.fetch_recipes, site, query, RECIPE_SITE_BUDGET, cancel)
+                for site in RECIPE_SITES
+            },
+            deadline=RECIPE_SEARCH_DEADLINE,
+            enough=enough,
+            cancel=cancel,
+        )
+
+        for site, outcome in outcomes.items():
+            found = usable(outcome['value']) if outcome['status'] == 'ok' else []
+            if outcome['status'] == 'ok':
+                # Grow the local index with everything the site returned
+                web_tools.recipe_index.add(outcome['value'])
+            seen.update(recipe['url'] for recipe in found)
+            recipes.extend(found)
+            site_status = {
+                'site': site,
+                'status': outcome['status'],
+                'recipes': len(found),
+                'elapsed': outcome.get('elapsed'),
+            }
+            if 'error' in outcome:
+                site_status['error'] = outcome['error']
+                site_status['breaker'] = web_tools.breaker_state(site)
+            sites.append(site_status)
+
+        return {
+            'recipes': recipes[:max_results],
+            'sites': sites,
+            'local': local
+        }
     
     @tool
-    def scrape_store_website(store_url: str, product_search: Optional[str] = None) -> Dict[str, Any]:
+    def scrape_store_website(store_url: str, product_search: Optional[str] = None,
+                             backend: Optional[str] = None) -> Dict[str, Any]:
         """
         Scrape product information from a specific store website.
         
         Args:
             store_url: URL of the store website
             product_search: Optional product to search for
+            backend: Browser backend, 'selenium' or 'playwright' (defaults to BROCC_LI_SCRAPER_BACKEND)
         """
+        backend = backend or SCRAPER_BACKEND
         try:
-            driver = web_tools._get_selenium_driver()
-            driver.get(store_url)
-            
-            # Wait for page to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            if backend == 'playwright':
+                page = web_tools.scrape_with_playwright(store_url)
+            elif backend == 'selenium':
+                page = web_tools.scrape_with_selenium(store_url)
+            else:
+                return {"error": f"Unknown scraper backend '{backend}'"}
             
             # Extract page information
             page_info = {
-                'title': driver.title,
+                'title': page['title'],
                 'url': store_url,
                 'products_found': [],
-                'scraping_time': datetime.now().isoformat()
+                'scraping_time': datetime.now().isoformat(),
+                'backend': backend,
+                'load_time': page['load_time']
             }
             
             if product_search:
-                # This would implement actual product search logic
-                # specific to each store's website structure
+                # Extract products with the store's plugin and keep the ones matching the search
                 page_info['search_query'] = product_search
+                store = urllib.parse.urlparse(store_url).hostname or store_url
                 page_info['products_found'] = [
-                    {
-                        'name': 'Sample Product',
-                        'price': '€2.99',
-                        'availability': True
-                    }
+                    product for product in extract_products(store_url, page['html'].encode(), store)
+                    if product_search.lower() in product['name'].lower()
                 ]
+                # Keep the scraped prices as observations in the price store; other sites can't be re-crawled
+                chain = _store_chain(store)
+                if chain:
+                    web_tools.prices.record_many(
+                        (chain, product['name'], product) for product in page_info['products_found']
+                    )
             
             return page_info
             
@@ -522,8 +1197,7 @@ def make_web_search_tools():
         """
         try:
             # Search for the specific store using free services
-            search_query = f"{store_name} {location}"
-            places = FreeMapServices.search_nearby_places(location, store_name)
+            places = FreeMapServices.search_nearby_places(location, store_name, name=store_name)
             
             if places:
                 place = places[0]  # Get the first result
@@ -554,25 +1228,57 @@ def make_web_search_tools():
             'location': location,
             'products': {},
             'store_comparison': {},
-            'best_deals': []
+            'best_deals': [],
+            'unavailable': []
         }
         
-        # Get nearby stores
-        stores = search_nearby_stores(location)
-        
+        # 1. Deduplicate products, keeping the first spelling
+        products = []
+        seen = set()
         for product in product_list:
+            key = product.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                products.append(product.strip())
+        
+        # 2. Map nearby stores to the chains we can price, geocoding only once
+        chains = {}
+        for place in FreeMapServices.search_nearby_places(location, "supermarket"):
+            chain = _store_chain(place['name'], place.get('brand'))
+            if chain:
+                chains.setdefault(chain, []).append({'name': place['name'], 'distance': place['distance']})
+        if not chains:
+            # No nearby chain store found: compare the chains' online prices anyway
+            chains = {chain: [] for chain in STORE_SEARCH_URLS}
+        
+        # 3. Price every unique (product, chain) pair from the price store, fetching
+        #    only the pairs never seen before, concurrently
+        outcomes = web_tools.lookup_prices(products, list(chains), deadline=COMPARISON_DEADLINE)
+        
+        # 4. Assemble the comparison matrix
+        for chain, nearby in chains.items():
+            comparison_results['store_comparison'][chain] = {
+                'nearby_stores': nearby,
+                'products_found': 0,
+                'total_price': 0.0
+            }
+        for product in products:
             comparison_results['products'][product] = {}
-            
-            # Search for product in each store
-            for store in stores[:5]:  # Top 5 stores
-                if isinstance(store, dict) and 'name' in store:
-                    store_name = store['name']
-                    products = search_product_prices(product)
-                    
-                    for product_info in products:
-                        if isinstance(product_info, dict) and product_info.get('store') == store_name:
-                            comparison_results['products'][product][store_name] = product_info
-                            break
+        
+        for (product, chain), outcome in outcomes.items():
+            if outcome['status'] != 'ok':
+                comparison_results['unavailable'].append({
+                    'product': product,
+                    'store': chain,
+                    **outcome,
+                    'breaker': web_tools.breaker_state(STORE_SEARCH_URLS[chain])
+                })
+                continue
+            if outcome['value']:
+                comparison_results['products'][product][chain] = outcome['value']
+                summary = comparison_results['store_comparison'][chain]
+                summary['products_found'] += 1
+                summary['total_price'] += outcome['value'].get('price', 0.0)
         
         # Find best deals
         for product, store_prices in comparison_results['products'].items():
@@ -590,6 +1296,7 @@ def make_web_search_tools():
         'search_nearby_stores': search_nearby_stores,
         'search_product_prices': search_product_prices,
         'search_coupons': search_coupons,
+        'match_coupons_to_shopping_list': match_coupons_to_shopping_list,
         'search_recipes': search_recipes,
         'scrape_store_website': scrape_store_website,
         'get_store_hours_and_location': get_store_hours_and_location,
@@ -598,9 +1305,11 @@ def make_web_search_tools():
 
 def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
     """Create a comprehensive report generation tool."""
+    plan_cache = shared_plan_cache() if PLAN_CACHE_ENABLED else None
     
     @tool
-    def generate_diet_report(user_preferences: dict, location: str = "Germany") -> Dict[str, Any]:
+    def generate_diet_report(user_preferences: dict, location: str = "Germany",
+                             config: RunnableConfig = None) -> Dict[str, Any]:
         """
         Generate a comprehensive diet report with meal plan, nutritional breakdown, costs, and shopping list.
         
@@ -635,8 +1344,7 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                         "meals": {{
                             "breakfast": {{
                                 "name": "meal name",
-                                "ingredients": ["ingredient 1", "ingredient 2"],
-                                "nutrition": {{"calories": 300, "protein": 15, "carbs": 30, "fat": 10}},
+                                "ingredients": ["60 g oats", "200 ml milk", "1 banana"],
                                 "cost": 2.50,
                                 "prep_time": "10 minutes"
                             }},
@@ -644,65 +1352,49 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                             "dinner": {{...}},
                             "snacks": [{{...}}]
                         }},
-                        "total_nutrition": {{"calories": 1800, "protein": 80, "carbs": 200, "fat": 60}},
                         "total_cost": 12.50
                     }}
                 ]
             }}
             
+            Give every ingredient with its quantity (grams, ml or pieces); nutrition is computed from the quantities.
             Ensure the plan meets the user's dietary restrictions, budget, and cooking time constraints.
             """
             
-            meal_plan_response = llm.invoke(meal_plan_prompt)
-            meal_plan_content = meal_plan_response.content
-            
-            # Parse meal plan
-            if isinstance(meal_plan_content, list):
-                meal_plan_content = meal_plan_content[0] if meal_plan_content else ""
-            meal_plan_content = str(meal_plan_content).strip()
-            
-            # Extract JSON from response
-            if "```json" in meal_plan_content:
-                start = meal_plan_content.find("```json") + 7
-                end = meal_plan_content.find("```", start)
-                meal_plan_content = meal_plan_content[start:end].strip()
-            
-            try:
-                meal_plan_data = json.loads(meal_plan_content)
-            except json.JSONDecodeError:
-                # Fallback meal plan
-                meal_plan_data = {
-                    "meal_plan": [
-                        {
-                            "day": "Monday",
-                            "meals": {
-                                "breakfast": {
-                                    "name": "Oatmeal with Berries",
-                                    "ingredients": ["oats", "berries", "honey", "milk"],
-                                    "nutrition": {"calories": 300, "protein": 12, "carbs": 45, "fat": 8},
-                                    "cost": 2.50,
-                                    "prep_time": "10 minutes"
-                                },
-                                "lunch": {
-                                    "name": "Vegetarian Pasta",
-                                    "ingredients": ["pasta", "tomatoes", "basil", "olive oil"],
-                                    "nutrition": {"calories": 450, "protein": 15, "carbs": 70, "fat": 12},
-                                    "cost": 3.20,
-                                    "prep_time": "20 minutes"
-                                },
-                                "dinner": {
-                                    "name": "Grilled Chicken Salad",
-                                    "ingredients": ["chicken breast", "lettuce", "tomatoes", "cucumber"],
-                                    "nutrition": {"calories": 350, "protein": 35, "carbs": 15, "fat": 18},
-                                    "cost": 4.80,
-                                    "prep_time": "25 minutes"
-                                }
-                            },
-                            "total_nutrition": {"calories": 1100, "protein": 62, "carbs": 130, "fat": 38},
-                            "total_cost": 10.50
-                        }
-                    ]
-                }
+            # The chat UI passes a callback that renders each day as soon as it is complete,
+            # with its nutrition computed from the food database
+            configurable = (config or {}).get("configurable", {})
+            show_day = configurable.get("on_meal_plan_day")
+            on_day = (lambda day, index: show_day(fill_nutrition([day])[0], index)) if show_day else None
+            # Nearly identical profiles share a cached plan and its recommendations
+            cached = plan_cache.get("diet_report", user_preferences) if plan_cache else None
+            if cached:
+                days = cached["meal_plan"]
+                if on_day is not None:
+                    for day in days:
+                        on_day(day, day_index(day))
+            elif MEAL_PLAN_MODE == "parallel":
+                days = generate_week(
+                    llm, user_preferences,
+                    max_concurrency=MEAL_PLAN_CONCURRENCY,
+                    max_rounds=MEAL_PLAN_REPAIR_ROUNDS,
+                    on_day=on_day,
+                )
+                # Days that could not be generated at all are written by one repair call
+                days = salvage_meal_plan(llm, user_preferences, days, on_day=on_day)
+            elif MEAL_PLAN_MODE == "stream":
+                stream = stream_meal_plan(llm, meal_plan_prompt, on_day)
+                streamed = stream.days + stream.invalid
+                if not streamed:
+                    # The response never reached a day array; read it as a whole
+                    try:
+                        streamed = extract_json(stream.text)
+                    except ValueError:
+                        streamed = []
+                days = salvage_meal_plan(llm, user_preferences, streamed, on_day=on_day)
+            else:
+                days = generate_meal_plan(llm, meal_plan_prompt, user_preferences, on_day=on_day)
+            meal_plan_data = {"meal_plan": fill_nutrition(days)}
             
             # Generate shopping list
             shopping_list = []
@@ -715,37 +1407,14 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                             all_ingredients.add(ingredient.lower())
             
             # Categorize ingredients and estimate prices
-            ingredient_categories = {
-                "proteins": ["chicken", "fish", "eggs", "tofu", "beans", "lentils"],
-                "vegetables": ["tomatoes", "lettuce", "cucumber", "carrots", "onions", "garlic"],
-                "fruits": ["berries", "apples", "bananas", "oranges"],
-                "grains": ["oats", "pasta", "rice", "bread"],
-                "dairy": ["milk", "cheese", "yogurt"],
-                "pantry": ["olive oil", "honey", "salt", "pepper", "basil"]
-            }
-            
+            categories = categorize_ingredients(all_ingredients)
             for ingredient in all_ingredients:
-                category = "other"
-                for cat, items in ingredient_categories.items():
-                    if ingredient in items:
-                        category = cat
-                        break
-                
-                # Estimate price based on category
-                price_estimates = {
-                    "proteins": 3.50,
-                    "vegetables": 1.20,
-                    "fruits": 2.00,
-                    "grains": 1.50,
-                    "dairy": 2.50,
-                    "pantry": 1.00,
-                    "other": 1.50
-                }
+                category = categories[ingredient]
                 
                 shopping_item = ShoppingItem(
                     name=ingredient.title(),
                     quantity="1 unit",
-                    estimated_price=price_estimates.get(category, 1.50),
+                    estimated_price=ESTIMATED_PRICES[category],
                     store="Rewe",
                     category=category,
                     notes=f"Category: {category}"
@@ -757,12 +1426,20 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
             total_shopping_cost = sum(item["estimated_price"] for item in shopping_list)
             
             # Generate nutritional summary
+            nutrition = summarize_nutrition(meal_plan_data.get("meal_plan", []), goals=user_preferences)
             weekly_nutrition = {
-                "total_calories": sum(day.get("total_nutrition", {}).get("calories", 0) for day in meal_plan_data.get("meal_plan", [])),
-                "avg_daily_calories": sum(day.get("total_nutrition", {}).get("calories", 0) for day in meal_plan_data.get("meal_plan", [])) / 7,
-                "total_protein": sum(day.get("total_nutrition", {}).get("protein", 0) for day in meal_plan_data.get("meal_plan", [])),
-                "total_carbs": sum(day.get("total_nutrition", {}).get("carbs", 0) for day in meal_plan_data.get("meal_plan", [])),
-                "total_fat": sum(day.get("total_nutrition", {}).get("fat", 0) for day in meal_plan_data.get("meal_plan", []))
+                "total_calories": nutrition["totals"]["calories"],
+                "avg_daily_calories": nutrition["daily_average"]["calories"],
+                "total_protein": nutrition["totals"]["protein"],
+                "total_carbs": nutrition["totals"]["carbs"],
+                "total_fat": nutrition["totals"]["fat"],
+                "total_fiber": nutrition["totals"]["fiber"],
+                "total_sugar": nutrition["totals"]["sugar"],
+                "total_sodium": nutrition["totals"]["sodium"],
+                "days": nutrition["days"],
+                "daily_averages": nutrition["daily_average"],
+                "meal_averages": nutrition["meal_average"],
+                "goal_deviation": nutrition.get("goal_deviation", {}),
             }
             
             # Generate recommendations
@@ -776,35 +1453,30 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
             3. Time management
             4. Shopping tips
             
-            Return as a JSON array of strings.
+            Return them as {{"recommendations": ["...", "..."]}}.
             """
             
-            recommendations_response = llm.invoke(recommendations_prompt)
-            recommendations_content = recommendations_response.content
-            
-            if isinstance(recommendations_content, list):
-                recommendations_content = recommendations_content[0] if recommendations_content else ""
-            recommendations_content = str(recommendations_content).strip()
-            
-            try:
-                if "[" in recommendations_content and "]" in recommendations_content:
-                    start = recommendations_content.find("[")
-                    end = recommendations_content.rfind("]") + 1
-                    recommendations = json.loads(recommendations_content[start:end])
+            if cached:
+                recommendations = cached["recommendations"]
+            else:
+                try:
+                    parsed, raw = invoke_structured(llm, RecommendationsSchema, recommendations_prompt)
+                except Exception:
+                    parsed, raw = None, None
+                if parsed is not None:
+                    recommendations = parsed.recommendations
+                elif isinstance(raw, list) and raw and all(isinstance(item, str) for item in raw):
+                    recommendations = raw
                 else:
-                    recommendations = [
-                        "Consider meal prepping on weekends to save time during the week",
-                        "Buy ingredients in bulk when possible to reduce costs",
-                        "Plan meals around seasonal produce for better prices",
-                        "Use leftovers creatively to minimize food waste"
-                    ]
-            except json.JSONDecodeError:
-                recommendations = [
-                    "Consider meal prepping on weekends to save time during the week",
-                    "Buy ingredients in bulk when possible to reduce costs",
-                    "Plan meals around seasonal produce for better prices",
-                    "Use leftovers creatively to minimize food waste"
-                ]
+                    recommendations = None
+                # Only a full week with the model's own recommendations is worth reusing
+                complete = {str(day.get("day")).lower() for day in days} == {day.lower() for day in WEEKDAYS}
+                if plan_cache and recommendations and complete:
+                    plan_cache.set("diet_report", user_preferences, {
+                        "meal_plan": meal_plan_data["meal_plan"],
+                        "recommendations": recommendations,
+                    })
+                recommendations = recommendations or list(DEFAULT_RECOMMENDATIONS)
             
             # Create final report
             report = DietReport(
@@ -816,11 +1488,11 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                 recommendations=recommendations,
                 generated_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             )
-
-            response_placeholder = st.empty()
-     
-            
-            return  response_placeholder.markdown("\n\n".join(report.__dict__))
+            # The chat UI renders the report to HTML and PDF in the background
+            on_report = configurable.get("on_diet_report")
+            if on_report is not None:
+                on_report(report)
+            return report.__dict__
 
             
         except Exception as e:
@@ -855,38 +1527,16 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                                 }
             
             # Categorize ingredients
-            ingredient_categories = {
-                "proteins": ["chicken", "fish", "eggs", "tofu", "beans", "lentils", "beef", "pork"],
-                "vegetables": ["tomatoes", "lettuce", "cucumber", "carrots", "onions", "garlic", "spinach", "broccoli"],
-                "fruits": ["berries", "apples", "bananas", "oranges", "grapes", "strawberries"],
-                "grains": ["oats", "pasta", "rice", "bread", "quinoa", "couscous"],
-                "dairy": ["milk", "cheese", "yogurt", "butter", "cream"],
-                "pantry": ["olive oil", "honey", "salt", "pepper", "basil", "oregano", "flour", "sugar"]
-            }
-            
+            categories = categorize_ingredients(all_ingredients)
             for ingredient, info in all_ingredients.items():
-                for category, items in ingredient_categories.items():
-                    if ingredient in items:
-                        info["category"] = category
-                        break
-            
-            # Estimate prices and create shopping list
-            price_estimates = {
-                "proteins": 3.50,
-                "vegetables": 1.20,
-                "fruits": 2.00,
-                "grains": 1.50,
-                "dairy": 2.50,
-                "pantry": 1.00,
-                "other": 1.50
-            }
+                info["category"] = categories[ingredient]
             
             shopping_list = []
             total_cost = 0
             
             for ingredient, info in all_ingredients.items():
                 category = info["category"]
-                price = price_estimates.get(category, 1.50) * info["quantity"]
+                price = ESTIMATED_PRICES[category] * info["quantity"]
                 total_cost += price
                 
                 shopping_item = ShoppingItem(
@@ -928,34 +1578,10 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
             meal_plan: List of daily meal plans
         """
         try:
-            daily_nutrition = []
-            weekly_totals = {
-                "calories": 0,
-                "protein": 0,
-                "carbs": 0,
-                "fat": 0,
-                "fiber": 0,
-                "sugar": 0,
-                "sodium": 0
-            }
-            
-            for day in meal_plan:
-                day_nutrition = day.get("total_nutrition", {})
-                daily_nutrition.append({
-                    "day": day.get("day", "Unknown"),
-                    "nutrition": day_nutrition
-                })
-                
-                for nutrient, value in day_nutrition.items():
-                    if nutrient in weekly_totals:
-                        weekly_totals[nutrient] += value
-            
-            # Calculate averages
-            num_days = len(daily_nutrition)
-            weekly_averages = {
-                nutrient: total / num_days if num_days > 0 else 0
-                for nutrient, total in weekly_totals.items()
-            }
+            nutrition = summarize_nutrition(fill_nutrition(meal_plan))
+            daily_nutrition = nutrition["daily"]
+            weekly_totals = nutrition["totals"]
+            weekly_averages = nutrition["daily_average"]
             
             # Generate recommendations based on nutrition
             recommendations = []
@@ -975,6 +1601,7 @@ def make_report_generation_tool(llm: ChatGoogleGenerativeAI):
                 "daily_nutrition": daily_nutrition,
                 "weekly_totals": weekly_totals,
                 "weekly_averages": weekly_averages,
+                "meal_averages": nutrition["meal_average"],
                 "recommendations": recommendations,
                 "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
@@ -1010,27 +1637,27 @@ def make_extract_preferences_tool(llm: ChatGoogleGenerativeAI):
         """Extract structured diet preferences from user input."""
         prompt = (
             f"Extract structured diet preferences from this: '{user_input}'. "
-            "Return ONLY a JSON object with keys: calories, protein, allergies, likes, dislikes, budget."
+            "Fill in calories, protein, allergies, likes, dislikes and budget; leave out what is not mentioned."
         )
-        response = llm.invoke(prompt)
-        content = response.content
-
-        # Handle both string and list responses
-        if isinstance(content, list):
-            content = content[0] if content else ""
-        content = str(content).strip()
-
-        # strip markdown fences and leading 'json' if present
-        if content.startswith("```"):
-            content = content.strip("`")
-            if content.lower().startswith("json"):
-                content = content[4:].strip()
-
         try:
-            return json.loads(content)
-        except json.JSONDecodeError as e:
-            st.error(f"Failed to parse preferences JSON: {e}")
+            parsed, raw = invoke_structured(llm, PreferencesSchema, prompt)
+        except Exception as e:
+            st.error(f"Failed to extract preferences: {e}")
             return {}
+        if parsed is not None:
+            return parsed.model_dump(exclude_none=True)
+
+        # Keep the fields that are valid on their own
+        preferences = {}
+        for key, value in (raw.items() if isinstance(raw, dict) else ()):
+            try:
+                field = PreferencesSchema.model_validate({key: value})
+            except ValidationError:
+                continue
+            preferences.update(field.model_dump(include={key}, exclude_none=True))
+        if not preferences:
+            st.error("Failed to parse preferences")
+        return preferences
 
     return extract_preferences
 
@@ -1038,9 +1665,15 @@ def make_extract_preferences_tool(llm: ChatGoogleGenerativeAI):
 def make_plan_diet_tool(llm: ChatGoogleGenerativeAI):
     """Create a tool to plan a diet based on user preferences."""
 
+    plan_cache = shared_plan_cache() if PLAN_CACHE_ENABLED else None
+
     @tool
     def plan_diet(preferences: dict) -> str:
         """Plan a diet based on user preferences."""
+        cached = plan_cache.get("plan_diet", preferences) if plan_cache else None
+        if cached:
+            return cached
+
         prompt = (
             f"Create a diet plan that meets these preferences: {preferences}. "
             "Include meals, snacks, and drinks."
@@ -1051,6 +1684,9 @@ def make_plan_diet_tool(llm: ChatGoogleGenerativeAI):
         # Handle both string and list responses
         if isinstance(content, list):
             content = content[0] if content else ""
-        return str(content)
+        content = str(content)
+        if plan_cache and content.strip():
+            plan_cache.set("plan_diet", preferences, content)
+        return content
 
     return plan_diet
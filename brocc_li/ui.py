@@ -7,8 +7,13 @@ from streamlit_chat import message
 from streamlit_extras.bottom_container import bottom
 
 from brocc_li.agent import process_agent_response
+from brocc_li.plan_cache import shared_plan_cache
 from brocc_li.schemas import Chat
 from brocc_li.state import get_initial_chat_state
+from brocc_li.tools import PLAN_CACHE_ENABLED
+
+# Seconds between checks of the sidebar for reports that are still rendering
+REPORT_POLL_INTERVAL = 2
 
 
 def setup_page(title: str, icon_path: str | Path) -> None:
@@ -92,10 +97,59 @@ def render_sidebar() -> None:
         on_click=on_clear_chat_btn_click,
     )
 
+    with st.sidebar:
+        if collect_report_jobs():
+            wait_for_report()
+    report_error = st.session_state.pop("report_error", None)
+    if report_error:
+        st.sidebar.warning(f"The report could not be rendered: {report_error}")
+
+    report_files = st.session_state.get("report_files") or {}
+    if any(report_files.values()):
+        st.sidebar.markdown("### Diet Report")
+        for fmt, mime in (("html", "text/html"), ("pdf", "application/pdf")):
+            path = report_files.get(fmt)
+            if path:
+                st.sidebar.download_button(
+                    f"Download {fmt.upper()}",
+                    Path(path).read_bytes(),
+                    file_name=f"brocc_li_report.{fmt}",
+                    mime=mime,
+                    use_container_width=True,
+                )
+
     # current conversation stats
     if st.session_state.get("agent_messages"):
         st.sidebar.markdown("### Conversation Stats")
         st.sidebar.write(f"Messages: {len(st.session_state.agent_messages)}")
+        if PLAN_CACHE_ENABLED:
+            plan_cache = shared_plan_cache().stats()
+            if plan_cache["hits"] + plan_cache["misses"]:
+                st.sidebar.write(
+                    f"Plan cache: {plan_cache['hits']} hits / {plan_cache['misses']} misses "
+                    f"({plan_cache['hit_rate']:.0%})"
+                )
+
+
+def collect_report_jobs() -> bool:
+    """Move the files of finished report renders into the session; True while some are still rendering."""
+    jobs = st.session_state.get("report_jobs") or []
+    for job in [job for job in jobs if job.done()]:
+        jobs.remove(job)
+        try:
+            st.session_state["report_files"] = job.result()
+        except Exception as e:
+            st.session_state["report_error"] = str(e)
+    return bool(jobs)
+
+
+@st.fragment(run_every=REPORT_POLL_INTERVAL)
+def wait_for_report() -> None:
+    if collect_report_jobs():
+        st.caption("📄 Rendering your report...")
+    else:
+        # Rerun the whole page to show the download buttons and stop polling
+        st.rerun()
 
 
 def submit_user_input(user_input: str) -> None:
@@ -113,6 +167,8 @@ def submit_user_input(user_input: str) -> None:
 def on_clear_chat_btn_click() -> None:
     del st.session_state["chat"]
     del st.session_state["agent_messages"]
+    st.session_state.pop("report_files", None)
+    st.session_state.pop("report_jobs", None)
 
     st.session_state["chat"] = get_initial_chat_state()
     st.session_state["agent_messages"] = []
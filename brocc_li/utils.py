@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 from typing import Any, Dict
 
@@ -12,3 +13,8 @@ def get_config(path: Path = Path(".env/config.json")) -> Dict[str, Any]:
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in configuration file: {e}")
     return data
+
+
+def get_cache_dir() -> Path:
+    """Directory for on-disk caches, overridable with BROCC_LI_CACHE_DIR."""
+    return Path(os.getenv("BROCC_LI_CACHE_DIR", ".cache/brocc_li"))
@@ -69,11 +69,12 @@ def demo_recipe_search():
     print(f"Max cooking time: {max_time} minutes")
     
     try:
-        recipes = search_tool.invoke({
+        result = search_tool.invoke({
             "query": query,
             "dietary_restrictions": dietary_restrictions,
             "max_time": max_time
         })
+        recipes = result['recipes']
         
         print(f"✅ Found {len(recipes)} recipes:")
         for i, recipe in enumerate(recipes[:3], 1):  # Show top 3
@@ -83,6 +84,9 @@ def demo_recipe_search():
             print(f"     Cook time: {recipe.get('cook_time', 'N/A')}")
             print(f"     Servings: {recipe.get('servings', 'N/A')}")
             print()
+        
+        for site in result['sites']:
+            print(f"  {site['site']}: {site['status']} ({site['recipes']} recipes)")
             
     except Exception as e:
         print(f"❌ Error during recipe search: {e}")
@@ -141,6 +145,9 @@ def demo_price_comparison():
             "location": location
         })
         
+        unavailable = [p for p in products if p.get('status') != 'ok']
+        products = [p for p in products if p.get('status') == 'ok']
+        
         print(f"✅ Found {len(products)} products:")
         for i, product in enumerate(products, 1):
             print(f"  {i}. {product['name']}")
@@ -149,6 +156,9 @@ def demo_price_comparison():
             print(f"     Unit: {product['unit']}")
             print(f"     Available: {'Yes' if product['availability'] else 'No'}")
             print()
+        
+        for store in unavailable:
+            print(f"  ⚠️ {store['store']}: {store['status']}")
             
     except Exception as e:
         print(f"❌ Error during price search: {e}")
@@ -0,0 +1,37 @@
+import json
+
+from brocc_li.batch import completed_ids, run_batch
+
+
+def write_lines(path, records, tail=""):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + tail, encoding="utf-8")
+
+
+def test_completed_ids_drops_only_a_cut_off_tail(tmp_path):
+    output = tmp_path / "reports.jsonl"
+    write_lines(output, [
+        {"id": "a", "status": "ok", "report": {}},
+        {"id": "b", "status": "error", "error": "timeout"},
+        {"id": "line-3", "status": "error", "error": "a profile must be a JSON object", "invalid_input": True},
+    ], tail='{"id": "c", "status": "o')
+
+    assert completed_ids(output) == {"a", "line-3"}
+    assert output.read_text(encoding="utf-8").endswith('"invalid_input": true}\n')
+
+
+def test_invalid_lines_are_not_reported_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "brocc_li.batch.make_report_generation_tool",
+        lambda llm: {"generate_diet_report": type("Tool", (), {"invoke": staticmethod(lambda args: {"ok": True})})},
+    )
+    monkeypatch.setattr("brocc_li.batch.PLAN_CACHE_ENABLED", False)
+    profiles = tmp_path / "profiles.jsonl"
+    profiles.write_text('{"id": "a", "budget": 10}\nnot json\n[1, 2]\n', encoding="utf-8")
+    output = tmp_path / "reports.jsonl"
+
+    first = run_batch(profiles, output, llm=None, workers=1, progress_every=0)
+    second = run_batch(profiles, output, llm=None, workers=1, progress_every=0)
+
+    assert (first["generated"], first["failed"]) == (1, 2)
+    assert (second["generated"], second["failed"], second["skipped"]) == (0, 0, 3)
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 3
@@ -0,0 +1,149 @@
+from pathlib import Path
+
+import pytest
+
+from brocc_li.extractors import (
+    AldiExtractor,
+    ChefkochExtractor,
+    RabattcodeExtractor,
+    ReweExtractor,
+    extract_coupons,
+    extract_products,
+    extract_recipes,
+    get_extractor,
+    parse_duration,
+    parse_price,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,99 €", 1.99),
+    ("€2.49", 2.49),
+    ("1.299,00 €", 1299.0),
+    ("1,299.00", 1299.0),
+    ("ab 3 €", 3.0),
+    ("0,5\xa0€", 0.5),
+    ("1 kg = 1,38 €", 1.38),
+    ("0,5 l = 0,89 €", 0.89),
+    ("2,99 € (1 kg = 5,98 €)", 2.99),
+    ("Preis auf Anfrage", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("PT15M", "15 minutes"),
+    ("PT1H5M", "65 minutes"),
+    ("P1DT2H", "1560 minutes"),
+    ("20 Min.", "20 Min."),
+    (None, None),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == expected
+
+
+def test_plugins_are_registered_per_domain():
+    assert isinstance(get_extractor("https://shop.rewe.de/productList?search=milch"), ReweExtractor)
+    assert isinstance(get_extractor("https://www.aldi-sued.de/de/suchergebnis.html"), AldiExtractor)
+    assert isinstance(get_extractor("https://www.chefkoch.de/rs/s0/linsen/Rezepte.html"), ChefkochExtractor)
+    assert isinstance(get_extractor("https://www.rabattcode.de/rewe"), RabattcodeExtractor)
+    assert get_extractor("https://example.com/") is None
+
+
+def test_rewe_product_tiles():
+    products = extract_products("https://shop.rewe.de/productList?search=milch", fixture("rewe_search.html"), "REWE")
+
+    # The tile without a price is skipped
+    assert [product['name'] for product in products] == [
+        "REWE Bio Frische Vollmilch 3,8% 1l",
+        "Weihenstephan H-Milch 1,5% 1l",
+    ]
+    first, second = products
+    assert first['price'] == 1.29
+    assert first['store'] == "REWE"
+    assert first['unit'] == "1l (1 l = 1,29 €)"
+    assert first['availability'] is True
+    assert first['brand'] is None
+    assert second['price'] == 1.49
+    assert second['availability'] is False
+
+
+def test_aldi_product_tiles():
+    products = extract_products("https://www.aldi-sued.de/de/suchergebnis.html?search=hafer",
+                                fixture("aldi_search.html"), "Aldi")
+
+    assert len(products) == 2
+    first, second = products
+    assert first['name'] == "Haferflocken zart"
+    assert first['price'] == 0.69
+    assert first['brand'] == "Golden Bridge"
+    assert first['unit'] == "500 g"
+    assert first['store'] == "Aldi"
+    assert second['name'] == "Bio Haferflocken kernig"
+    assert second['price'] == 1.09
+    assert second['unit'] == "piece"
+    assert second['brand'] is None
+
+
+def test_json_ld_recipe():
+    url = "https://www.example.com/recipes/red-lentil-soup?utm=x"
+    recipes = extract_recipes(url, fixture("recipe_jsonld.html"), "example.com")
+
+    assert len(recipes) == 1
+    recipe = recipes[0]
+    assert recipe['title'] == "Red Lentil Soup"
+    assert recipe['url'] == "https://www.example.com/recipes/red-lentil-soup"
+    assert recipe['ingredients'] == ["200 g red lentils", "1 onion", "1 l vegetable stock"]
+    assert recipe['instructions'] == ["Chop the onion.", "Simmer everything for 20 minutes."]
+    assert recipe['prep_time'] == "15 minutes"
+    assert recipe['cook_time'] == "65 minutes"
+    assert recipe['servings'] == 4
+    assert recipe['source'] == "example.com"
+
+
+def test_chefkoch_cards():
+    url = "https://www.chefkoch.de/rs/s0/linsensuppe/Rezepte.html"
+    recipes = extract_recipes(url, fixture("chefkoch_search.html"), "chefkoch.de")
+
+    # The ad card has no title and is skipped
+    assert [(recipe['title'], recipe['url']) for recipe in recipes] == [
+        ("Linsensuppe mit Würstchen", "https://www.chefkoch.de/rezepte/1234567/Linsensuppe-mit-Wuerstchen.html"),
+        ("Rote Linsen Dal", "https://www.chefkoch.de/rezepte/7654321/Rote-Linsen-Dal.html"),
+    ]
+    assert recipes[0]['cook_time'] == "45 Min."
+    assert recipes[1]['cook_time'] is None
+    assert all(recipe['ingredients'] == [] and recipe['source'] == "chefkoch.de" for recipe in recipes)
+
+
+def test_rabattcode_coupons():
+    coupons = extract_coupons("https://www.rabattcode.de/rewe", fixture("rabattcode_coupons.html"))
+
+    # The card without a description is skipped
+    assert len(coupons) == 2
+    first, second = coupons
+    assert first == {
+        'code': "REWE5START",
+        'description': "5 € Rabatt auf den ersten Lieferservice-Einkauf",
+        'discount': "5 €",
+        'expiry_date': "31.12.2026",
+        'store': "REWE",
+        'conditions': "Mindestbestellwert 50 €",
+    }
+    assert second['code'] == ""
+    assert second['discount'] == "10%"
+    assert second['store'] == "Lidl"
+    assert second['expiry_date'] is None
+    assert second['conditions'] is None
+
+
+def test_coupons_need_a_coupon_plugin():
+    assert extract_coupons("https://shop.rewe.de/", fixture("rabattcode_coupons.html")) == []
@@ -0,0 +1,90 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from brocc_li.meal_plan import DayStreamParser, day_index, salvage_meal_plan, stream_meal_plan
+
+
+def make_day(name, meal="Porridge"):
+    meal = {"name": meal, "ingredients": ["60 g oats"], "cost": 1.5}
+    return {"day": name, "meals": {"breakfast": meal, "lunch": meal, "dinner": meal}, "total_cost": 4.5}
+
+
+def feed_all(text, size=None):
+    parser = DayStreamParser()
+    size = size or len(text)
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return parser, completed
+
+
+def test_fenced_plan_with_prose():
+    plan = json.dumps({"meal_plan": [make_day("Monday"), make_day("Tuesday")]}, indent=2)
+    parser, completed = feed_all(f"Here is your plan:\n```json\n{plan}\n```\nEnjoy!")
+
+    assert [day["day"] for day in completed] == ["Monday", "Tuesday"]
+    assert parser.done
+
+
+@pytest.mark.parametrize("size", [1, 3, 17])
+def test_chunked_bare_array(size):
+    parser, completed = feed_all(json.dumps([make_day("Monday"), make_day("Tuesday")]), size)
+
+    assert [day["day"] for day in completed] == ["Monday", "Tuesday"]
+    assert parser.days == completed
+
+
+def test_escaped_quotes_and_braces_in_strings():
+    day = make_day("Monday", meal='Toast "Hawaii" {mit} [Ananas] \\ extra')
+    parser, completed = feed_all(json.dumps({"meal_plan": [day]}), 5)
+
+    assert completed == [day]
+    assert not parser.invalid
+
+
+def test_nested_arrays_and_objects_stay_inside_their_day():
+    day = make_day("Monday")
+    day["meals"]["snacks"] = [{"name": "Apfel", "ingredients": ["1 apple"], "nested": {"days": [{"day": "x"}]}}]
+    parser, completed = feed_all(json.dumps({"notes": {"days": []}, "meal_plan": [day]}), 4)
+
+    assert completed == [day]
+
+
+def test_broken_day_is_kept_as_fragment():
+    text = '{"meal_plan": [{"day": "Monday", "total_cost": 4,5}, ' + json.dumps(make_day("Tuesday")) + ']}'
+    parser, completed = feed_all(text)
+
+    assert [day["day"] for day in completed] == ["Tuesday"]
+    assert parser.invalid == ['{"day": "Monday", "total_cost": 4,5}']
+
+
+def test_stream_shows_only_valid_days_at_their_weekday():
+    text = json.dumps({"meal_plan": [{"day": "Monday", "meals": {}}, make_day("Wednesday")]})
+    chunks = [SimpleNamespace(content=text[i:i + 7]) for i in range(0, len(text), 7)]
+    llm = SimpleNamespace(stream=lambda prompt: iter(chunks))
+    shown = []
+
+    parser = stream_meal_plan(llm, "prompt", lambda day, index: shown.append((day["day"], index)))
+
+    assert shown == [("Wednesday", 2)]
+    assert len(parser.days) == 2
+
+
+def test_day_index():
+    assert day_index({"day": " sunday"}) == 6
+    assert day_index({"day": "Day 8"}) == 7
+
+
+def test_repaired_days_are_shown_at_their_weekday(monkeypatch):
+    monkeypatch.setattr("brocc_li.meal_plan.repair_days", lambda *args: [make_day("Wednesday")])
+    shown = []
+
+    days = salvage_meal_plan(
+        None, {}, [make_day("Monday"), make_day("Tuesday")], days=("Monday", "Tuesday", "Wednesday"),
+        on_day=lambda day, index: shown.append((day["day"], index)),
+    )
+
+    assert shown == [("Wednesday", 2)]
+    assert [day["day"] for day in days] == ["Monday", "Tuesday", "Wednesday"]
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from brocc_li.osm_index import OfflineStoreIndex, build_index
+
+
+@pytest.fixture
+def index(tmp_path):
+    extract = tmp_path / "extract.json"
+    extract.write_text(json.dumps({"elements": [
+        {"type": "node", "lat": 52.520, "lon": 13.405, "tags": {"place": "city", "name": "Berlin"}},
+        {"type": "node", "lat": 52.531, "lon": 13.385, "tags": {"place": "suburb", "name": "Mitte"}},
+        {"type": "node", "lat": 52.480, "lon": 13.440,
+         "tags": {"place": "suburb", "name": "Neukölln", "is_in": "Berlin;Deutschland"}},
+        {"type": "node", "lat": 48.137, "lon": 11.575, "tags": {"place": "city", "name": "München"}},
+        {"type": "node", "lat": 52.521, "lon": 13.410, "tags": {"shop": "supermarket", "name": "Rewe"}},
+    ]}))
+    build_index([extract], tmp_path / "index")
+    return OfflineStoreIndex(tmp_path / "index")
+
+
+@pytest.mark.parametrize("location", ["Berlin", "berlin, Germany", "Mitte", "Mitte, Berlin", "Mitte, Berlin, DE"])
+def test_geocode_places_of_the_index(index, location):
+    expected = (52.520, 13.405) if location.lower().startswith("berlin") else (52.531, 13.385)
+    assert index.geocode(location) == {"lat": expected[0], "lon": expected[1]}
+
+
+@pytest.mark.parametrize("location", ["Mitte, Hamburg", "Mitte, München", "Berlin, France", "Hamburg"])
+def test_geocode_leaves_other_places_to_the_online_geocoder(index, location):
+    assert index.geocode(location) is None
+
+
+def test_area_tags_are_kept(index):
+    assert index.places["neukölln"]["area"] == ["berlin", "deutschland"]
+    assert index.places["münchen"]["area"] == ["münchen"]
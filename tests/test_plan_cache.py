@@ -0,0 +1,16 @@
+from brocc_li.plan_cache import PlanCache
+
+
+def test_plan_is_not_served_to_a_smaller_budget(tmp_path):
+    cache = PlanCache(path=tmp_path / "plans.sqlite3")
+    profile = {"dietary_restrictions": ["vegetarian"], "goal": "weight loss"}
+    cache.set("diet_report", {**profile, "budget": 19.99}, {"meal_plan": ["19.99"]})
+
+    assert cache.get("diet_report", {**profile, "budget": "15 €"}) is None
+    assert cache.get("diet_report", {**profile, "budget": 19.99}) == {"meal_plan": ["19.99"]}
+
+    # The plan made for the smaller budget replaces the entry and fits the whole bucket
+    cache.set("diet_report", {**profile, "budget": 15}, {"meal_plan": ["15"]})
+    assert cache.get("diet_report", {**profile, "budget": 19.99}) == {"meal_plan": ["15"]}
+    assert cache.get("diet_report", {**profile, "budget": 15}) == {"meal_plan": ["15"]}
+    assert cache.stats()["kinds"]["diet_report"] == {"hits": 3, "misses": 1, "hit_rate": 0.75}
@@ -0,0 +1,34 @@
+import sqlite3
+
+from brocc_li.price_store import PriceStore
+
+
+def test_units_are_kept_apart(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite3")
+    store.record('Rewe', 'Tomaten', {'name': 'Tomaten', 'price': 2.99, 'unit': 'kg'}, observed_at=100)
+    store.record('Rewe', 'Tomaten', {'name': 'Tomaten', 'price': 0.49, 'unit': 'Stück'}, observed_at=200)
+
+    assert store.stats()['series'] == 2
+    assert store.latest('Rewe', 'Tomaten')['product']['unit'] == 'Stück'
+    assert store.stale(max_age=0) == [('Rewe', 'tomaten')]
+
+
+def test_old_store_is_migrated(tmp_path):
+    path = tmp_path / "prices.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.executescript(
+        """
+        CREATE TABLE latest (
+            chain TEXT NOT NULL, product TEXT NOT NULL, unit TEXT NOT NULL, name TEXT, price REAL,
+            availability INTEGER, brand TEXT, observed_at REAL NOT NULL, PRIMARY KEY (product, chain)
+        );
+        CREATE INDEX latest_observed ON latest (observed_at);
+        INSERT INTO latest VALUES ('Aldi', 'milch', 'l', 'Milch', 0.99, 1, NULL, 100);
+        """
+    )
+    conn.close()
+
+    store = PriceStore(path)
+    store.record('Aldi', 'Milch', {'name': 'Milch', 'price': 1.19, 'unit': 'Packung'}, observed_at=200)
+    assert store.stats()['series'] == 2
+    assert store.latest('Aldi', 'Milch')['product']['price'] == 1.19
@@ -0,0 +1,76 @@
+import pytest
+
+from brocc_li.recipe_index import RecipeIndex, allergens, diets, matches_filters
+
+
+@pytest.mark.parametrize("ingredients, allergen", [
+    (["500 g Weizenmehl", "2 Eier"], 'gluten'),
+    (["500 g Weizenmehl", "2 Eier"], 'eggs'),
+    (["200 g Lachsfilet"], 'fish'),
+    (["2 anchovies"], 'fish'),
+    (["1 l Vollmilch"], 'dairy'),
+    (["200 g Schlagsahne"], 'dairy'),
+    (["2 EL Erdnussbutter"], 'peanuts'),
+    (["100 g gehackte Haselnüsse"], 'nuts'),
+    (["300 g Garnelen"], 'shellfish'),
+])
+def test_allergens_fold_plurals_and_compounds(ingredients, allergen):
+    assert allergen in allergens(ingredients)
+    assert f"{allergen}free" not in diets(ingredients)
+
+
+@pytest.mark.parametrize("line", [
+    "400 g Hähnchenbrustfilet",
+    "4 Würstchen",
+    "2 sausages",
+    "2 steaks",
+    "200 g chorizo",
+    "500 g minced meat",
+    "200 g Rinderhackfleisch",
+    "100 g Speckwürfel",
+])
+def test_meat_is_neither_vegetarian_nor_vegan(line):
+    tags = diets([line, "1 onion"])
+    assert 'vegetarian' not in tags
+    assert 'vegan' not in tags
+
+
+def test_fish_and_animal_products():
+    assert not {'vegetarian', 'vegan'} & diets(["200 g Lachsfilet"])
+    tags = diets(["1 l Vollmilch", "2 EL Honig"])
+    assert 'vegetarian' in tags
+    assert 'vegan' not in tags
+
+
+def test_plant_based_lines_keep_their_tags():
+    ingredients = ["400 ml coconut milk", "200 g red lentils", "1 butternut squash", "Buchweizenmehl"]
+    assert allergens(ingredients) == set()
+    assert {'vegan', 'vegetarian', 'dairyfree', 'glutenfree', 'nutfree'} <= diets(ingredients)
+
+
+def test_filters_drop_unsafe_recipes(tmp_path):
+    index = RecipeIndex(tmp_path / "recipes.sqlite3")
+    index.add([
+        {'url': 'https://example.com/pancakes', 'title': 'Pancakes',
+         'ingredients': ['500 g Weizenmehl', '2 Eier', '1 l Vollmilch']},
+        {'url': 'https://example.com/sausage-stew', 'title': 'Lentil stew with sausages',
+         'ingredients': ['4 Würstchen', '200 g lentils']},
+        {'url': 'https://example.com/dal', 'title': 'Lentil dal',
+         'ingredients': ['200 g red lentils', '400 ml coconut milk', '1 onion']},
+    ])
+
+    assert [r['title'] for r in index.search('lentil', ['vegetarian'])] == ['Lentil dal']
+    assert [r['title'] for r in index.search('', ['gluten-free', 'vegan'])] == ['Lentil dal']
+    assert not matches_filters({'ingredients': ['500 g Weizenmehl']}, ['glutenfrei'])
+    assert not matches_filters({'ingredients': ['200 g Lachsfilet']}, ['vegan'])
+
+
+def test_older_indexes_are_retagged(tmp_path):
+    path = tmp_path / "recipes.sqlite3"
+    index = RecipeIndex(path)
+    index.add([{'url': 'https://example.com/hotdog', 'title': 'Hot dogs', 'ingredients': ['4 Würstchen']}])
+    with index._conn:
+        index._conn.execute("UPDATE recipes SET tags = 'vegan vegetarian'")
+        index._conn.execute("PRAGMA user_version = 0")
+
+    assert RecipeIndex(path).search('hot dogs', ['vegetarian']) == []